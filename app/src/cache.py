@@ -0,0 +1,138 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+log = logging.getLogger("cache")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key        TEXT PRIMARY KEY,
+    value      TEXT,
+    expires_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class TTLCache:
+    """
+    Two-tier cache for upstream lookups: an in-memory LRU in front of an
+    optional on-disk SQLite store, with a TTL per entry.
+
+    A fetch that returns None is cached as a miss for `negative_ttl` seconds,
+    so titles an upstream doesn't know are not re-queried every cycle.
+    Concurrent `get_or_fetch` calls for the same key share one fetch.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 20000,
+                 ttl: float = 7 * 86400, negative_ttl: float = 86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    return True, entry[1]
+                del self._memory[key]
+            if self._db is None:
+                return False, None
+            row = self._db.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                return False, None
+            value = json.loads(row[0]) if row[0] is not None else None
+            self._remember(key, row[1], value)
+            return True, value
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value); a cached miss is (True, None)."""
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return found, value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                with self._db:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, json.dumps(value) if value is not None else None, expires_at),
+                    )
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]],
+                           ttl: Optional[float] = None) -> Any:
+        found, value = self.get(key)
+        if found:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            value = await fetch()
+        except BaseException as e:
+            # Not cached: errors are transient, unlike a clean "not found"
+            if isinstance(e, asyncio.CancelledError):
+                fut.cancel()
+            else:
+                fut.set_exception(e)
+                fut.exception()  # mark retrieved when nobody else was waiting
+            raise
+        else:
+            self.set(key, value, ttl)
+            fut.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def purge_expired(self) -> int:
+        """Drop expired rows from the disk store."""
+        if self._db is None:
+            return 0
+        with self._lock, self._db:
+            cur = self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        return cur.rowcount
+
+    def close(self) -> None:
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
@@ -8,6 +8,10 @@ class Settings:
     csv_path: str = os.getenv("CSV_PATH", "/data/letterboxd_diary_queue.csv")
     dedupe_days: int = int(os.getenv("DEDUPE_DAYS", "2"))
     min_percent: float = float(os.getenv("MIN_PERCENT", "85"))
+    # ingestion: bounded queue in front of a single batched CSV writer
+    queue_size: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+    batch_size: int = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
+    flush_interval: float = float(os.getenv("WEBHOOK_FLUSH_INTERVAL", "0.5"))
 
 def get_settings() -> Settings:
     return Settings()
@@ -25,6 +25,16 @@ def _env_int(name: str, default: int) -> int:
         return default
 
 
+def _env_float(name: str, default: float) -> float:
+    val = os.getenv(name)
+    if val is None:
+        return default
+    try:
+        return float(val)
+    except ValueError:
+        return default
+
+
 def generate_config_from_env() -> dict:
     """Builds an in-memory config structure from environment variables."""
     config = {
@@ -35,12 +45,59 @@ def generate_config_from_env() -> dict:
                 "SYNC_DIRECTION",
                 "plex->trakt,letterboxd,imdb",
             ),
+            # sync state (watermarks, ledgers, caches) lives here
+            "state_dir": os.getenv("STATE_DIR", "/config/state").strip(),
+            # per-destination push budget; override with <service>.timeout_seconds
+            "destination_timeout_seconds": _env_int("DESTINATION_TIMEOUT_SECONDS", 900),
+            # startup: per-service budget (override with <service>.init_timeout_seconds)
+            # and the services the scheduler waits for; empty means the sync source
+            "service_init_timeout_seconds": _env_int("SERVICE_INIT_TIMEOUT_SECONDS", 60),
+            "critical_services": os.getenv("CRITICAL_SERVICES", "").strip() or None,
+            # multi-user mode: profiles synced at once (see `profiles` below)
+            "profile_concurrency": _env_int("PROFILE_CONCURRENCY", 2),
+            # Plex history pages buffered between sync stages (fetch, enrich,
+            # each destination); a slow destination stalls the fetch instead
+            "pipeline_queue_pages": _env_int("PIPELINE_QUEUE_PAGES", 4),
+        },
+        "scheduler": {
+            # with the webhook on, plays trigger a sync once events go quiet for
+            # debounce_seconds (at most max_delay_seconds after the first); a full
+            # reconciliation runs every reconcile_interval_minutes. Without it,
+            # general.sync_interval_minutes is the only trigger.
+            "debounce_seconds": _env_int("SYNC_DEBOUNCE_SECONDS", 10),
+            "max_delay_seconds": _env_int("SYNC_MAX_DELAY_SECONDS", 60),
+            "reconcile_interval_minutes": _env_int("RECONCILE_INTERVAL_MINUTES", 360),
+            # each destination retries due failures on its own timer
+            # (override with <service>.retry_interval_minutes), plus random jitter
+            "retry_interval_minutes": _env_int("RETRY_INTERVAL_MINUTES", 10),
+            "jitter_seconds": _env_int("SYNC_JITTER_SECONDS", 30),
+        },
+        "http": {
+            # shared keep-alive pools (one per upstream host) used by all integrations
+            "max_connections": _env_int("HTTP_MAX_CONNECTIONS", 20),
+            "max_keepalive_connections": _env_int("HTTP_MAX_KEEPALIVE", 10),
+            "timeout_seconds": _env_int("HTTP_TIMEOUT_SECONDS", 20),
+            "http2": _env_bool("HTTP2_ENABLED", False),
         },
         "plex": {
             "enabled": _env_bool("PLEX_ENABLED", True),
             "server_url": os.getenv("PLEX_SERVER_URL", "").strip(),
             "token": os.getenv("PLEX_TOKEN", "").strip(),
             "username": os.getenv("PLEX_USERNAME", "").strip(),
+            "history_page_size": _env_int("PLEX_HISTORY_PAGE_SIZE", 500),
+        },
+        "server": {
+            # HTTP listener for /health, /metrics and the webhook
+            "host": os.getenv("SERVER_HOST", "0.0.0.0").strip(),
+            "port": _env_int("PORT", 8089),
+        },
+        "webhook": {
+            # Tautulli playback_stopped webhook -> Letterboxd diary CSV
+            "enabled": _env_bool("WEBHOOK_ENABLED", False),
+        },
+        "metrics": {
+            # Prometheus-style /metrics on the server port
+            "enabled": _env_bool("METRICS_ENABLED", True),
         },
         "tautulli": {
             "enabled": _env_bool("TAUTULLI_ENABLED", False),
@@ -53,6 +110,9 @@ def generate_config_from_env() -> dict:
             "client_secret": os.getenv("TRAKT_CLIENT_SECRET", "").strip(),
             "access_token": os.getenv("TRAKT_ACCESS_TOKEN", "").strip(),
             "refresh_token": os.getenv("TRAKT_REFRESH_TOKEN", "").strip(),
+            # watched-history push: plays per /sync/history call, batches in flight
+            "batch_size": _env_int("TRAKT_BATCH_SIZE", 100),
+            "max_concurrency": _env_int("TRAKT_MAX_CONCURRENCY", 2),
         },
         "letterboxd": {
             "enabled": _env_bool("LETTERBOXD_ENABLED", False),
@@ -60,6 +120,11 @@ def generate_config_from_env() -> dict:
             "password": os.getenv("LETTERBOXD_PASSWORD", "").strip(),
             # if true, we only log what would be sent; no real diary writes
             "dry_run": _env_bool("LETTERBOXD_DRY_RUN", False),
+            # diary posting: worker count and starting pace (adapts to 429s)
+            "max_concurrency": _env_int("LETTERBOXD_MAX_CONCURRENCY", 2),
+            "rate_per_second": _env_float("LETTERBOXD_RATE_PER_SECOND", 0.5),
+            # saved login cookies; empty means <state_dir>/letterboxd_session.json
+            "session_path": os.getenv("LETTERBOXD_SESSION_PATH", "").strip(),
         },
         "imdb": {
             "enabled": _env_bool("IMDB_ENABLED", False),
@@ -82,10 +147,32 @@ def generate_config_from_env() -> dict:
         "tmdb": {
             "enabled": _env_bool("TMDB_ENABLED", False),
             "api_key": os.getenv("TMDB_API_KEY", "").strip(),
+            "max_concurrency": _env_int("TMDB_MAX_CONCURRENCY", 8),
+            "rate_per_second": _env_int("TMDB_RATE_PER_SECOND", 40),
+        },
+        "enrichment": {
+            # TMDb/TVDB lookups are cached in memory and in state_dir/metadata_cache.db
+            "cache_ttl_hours": _env_int("ENRICH_CACHE_TTL_HOURS", 168),
+            "negative_cache_ttl_hours": _env_int("ENRICH_NEGATIVE_TTL_HOURS", 24),
+            "max_concurrency": _env_int("ENRICH_MAX_CONCURRENCY", 8),
+        },
+        "retry": {
+            # failed destination writes are retried with exponential backoff + jitter
+            "max_attempts": _env_int("RETRY_MAX_ATTEMPTS", 8),
+            "base_delay_seconds": _env_int("RETRY_BASE_DELAY_SECONDS", 60),
+            "max_delay_seconds": _env_int("RETRY_MAX_DELAY_SECONDS", 21600),
         },
         "custom_lists": {
             "enabled": _env_bool("CUSTOM_LISTS_ENABLED", False),
         },
+        # Multi-user mode (config.yml only): one entry per Plex user, e.g.
+        #   - name: alice
+        #     plex_account_id: 1
+        #     sync_direction: "plex->trakt,letterboxd"   # optional
+        #     trakt: {access_token: ..., refresh_token: ...}
+        #     letterboxd: {username: ..., password: ...}
+        # Plex, TMDb and TVDB stay shared; empty means single-user mode.
+        "profiles": [],
     }
 
     return config
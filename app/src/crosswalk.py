@@ -0,0 +1,164 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Crosswalk column -> id field on normalized items
+ID_FIELDS = {
+    "plex": "guid",           # Plex ratingKey
+    "plex_guid": "plex_guid",  # plex://movie/... (stable across servers)
+    "imdb": "imdb_id",
+    "tmdb": "tmdb_id",
+    "tvdb": "tvdb_id",
+    "trakt": "trakt_id",
+}
+COLUMNS = tuple(ID_FIELDS)
+_NUMERIC = ("tmdb", "tvdb", "trakt")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ids (
+    id         INTEGER PRIMARY KEY,
+    kind       TEXT NOT NULL,
+    plex       TEXT,
+    plex_guid  TEXT,
+    imdb       TEXT,
+    tmdb       TEXT,
+    tvdb       TEXT,
+    trakt      TEXT,
+    updated_at REAL NOT NULL
+);
+""" + "".join(
+    f"CREATE INDEX IF NOT EXISTS ids_{c} ON ids (kind, {c}) WHERE {c} IS NOT NULL;\n" for c in COLUMNS
+)
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _clean(ids: Dict[str, object]) -> Dict[str, str]:
+    return {c: str(v) for c, v in ids.items() if c in ID_FIELDS and v not in (None, "")}
+
+
+class IdCrosswalk:
+    """
+    Local table of every id seen for an item across Plex, IMDb, TMDb, TheTVDB
+    and Trakt, one row per (kind, item). `kind` is movie/show/episode.
+
+    Rows are filled lazily (`record`) from Plex metadata and enrichment
+    results, and merged when a new id links to an existing row. Every id
+    column is indexed, so any matcher can go from one id to the others
+    locally instead of searching an upstream API.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _find(self, kind: str, ids: Dict[str, str]) -> Optional[sqlite3.Row]:
+        for col, value in ids.items():
+            row = self._db.execute(
+                f"SELECT * FROM ids WHERE kind = ? AND {col} = ?", (kind, value)
+            ).fetchone()
+            if row is not None:
+                return row
+        return None
+
+    def _record(self, kind: str, ids: Dict[str, str], now: float) -> None:
+        row = self._find(kind, ids)
+        if row is None:
+            cols = ", ".join(ids)
+            self._db.execute(
+                f"INSERT INTO ids (kind, {cols}, updated_at) VALUES (?, {', '.join('?' * len(ids))}, ?)",
+                (kind, *ids.values(), now),
+            )
+            return
+        # Known ids win; new ones fill the gaps
+        new = {c: v for c, v in ids.items() if row[c] is None}
+        if new:
+            sets = ", ".join(f"{c} = ?" for c in new)
+            self._db.execute(f"UPDATE ids SET {sets}, updated_at = ? WHERE id = ?",
+                             (*new.values(), now, row["id"]))
+
+    def record(self, kind: str, **ids) -> None:
+        """Remember that these ids (plex=, imdb=, tmdb=, ...) name the same item."""
+        self.record_many([(kind, ids)])
+
+    def record_many(self, entries: Iterable[tuple]) -> int:
+        """Bulk `record` for (kind, {column: id}) pairs; returns how many were usable."""
+        now = time.time()
+        n = 0
+        with self._lock, self._db:
+            for kind, ids in entries:
+                ids = _clean(ids)
+                if kind and ids:
+                    self._record(kind, ids, now)
+                    n += 1
+        return n
+
+    def lookup(self, kind: str, column: str, value) -> Optional[Dict[str, str]]:
+        """All known ids for the item whose `column` id is `value`."""
+        return self.lookup_many(kind, column, [value]).get(str(value))
+
+    def lookup_many(self, kind: str, column: str, values: Iterable) -> Dict[str, Dict[str, str]]:
+        """{value: {column: id, ...}} for every value with a crosswalk row."""
+        if column not in ID_FIELDS:
+            raise ValueError(f"unknown id column: {column}")
+        wanted = list({str(v) for v in values if v not in (None, "")})
+        out: Dict[str, Dict[str, str]] = {}
+        with self._lock:
+            for i in range(0, len(wanted), _CHUNK):
+                chunk = wanted[i:i + _CHUNK]
+                rows = self._db.execute(
+                    f"SELECT * FROM ids WHERE kind = ? AND {column} IN ({', '.join('?' * len(chunk))})",
+                    (kind, *chunk),
+                ).fetchall()
+                for row in rows:
+                    out[row[column]] = {c: row[c] for c in COLUMNS if row[c] is not None}
+        return out
+
+    def unknown(self, kind: str, column: str, values: Iterable) -> Set[str]:
+        """The values that have no crosswalk row yet."""
+        wanted = {str(v) for v in values if v not in (None, "")}
+        return wanted - set(self.lookup_many(kind, column, wanted))
+
+    def attach(self, items: List[dict]) -> int:
+        """
+        Fill missing id fields on normalized Plex items from the crosswalk,
+        matching on ratingKey (and the show's ratingKey for episode show ids).
+        Returns how many items gained an id.
+        """
+        by_kind: Dict[str, List[dict]] = {}
+        for item in items:
+            by_kind.setdefault(item.get("type"), []).append(item)
+
+        touched = set()
+        for kind, group in by_kind.items():
+            if not kind:
+                continue
+            known = self.lookup_many(kind, "plex", (i.get("guid") for i in group))
+            for item in group:
+                for col, value in known.get(str(item.get("guid")), {}).items():
+                    field = ID_FIELDS[col]
+                    if col != "plex" and not item.get(field):
+                        item[field] = int(value) if col in _NUMERIC and value.isdigit() else value
+                        touched.add(id(item))
+
+        episodes = by_kind.get("episode", [])
+        shows = self.lookup_many("show", "plex", (i.get("show_key") for i in episodes))
+        for item in episodes:
+            tvdb = shows.get(str(item.get("show_key")), {}).get("tvdb")
+            if tvdb and not item.get("show_tvdb_id"):
+                item["show_tvdb_id"] = int(tvdb) if tvdb.isdigit() else tvdb
+                touched.add(id(item))
+        return len(touched)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
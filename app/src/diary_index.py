@@ -0,0 +1,124 @@
+import csv, os, threading
+from bisect import insort
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+def diary_key(title: str | None, year: str | int | None) -> Key:
+    """Normalized (title, year) key used for dedupe and rewatch checks."""
+    t = " ".join((title or "").split()).casefold()
+    y = str(year).strip() if year else ""
+    return t, y
+
+
+def _parse_date(value: str | None) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        # Diary rows are written as YYYY-MM-DD; skip dateutil for the common case
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        pass
+    try:
+        from dateutil import parser as dtparse
+        return dtparse.parse(value).replace(tzinfo=None)
+    except Exception:
+        return None
+
+
+class DiaryIndex:
+    """
+    In-memory index over a Letterboxd diary CSV: normalized (title, year) ->
+    sorted watch dates.
+
+    The index is built on first use and rebuilt whenever the file's mtime or
+    size no longer match what we last saw (i.e. it was edited outside this
+    process). Rows appended through `appending()` update it in place.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries: Dict[Key, List[datetime]] = {}
+        self._stamp: Optional[Tuple[int, int]] = None
+
+    def _current_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _add_row(self, row: dict) -> None:
+        dates = self._entries.setdefault(diary_key(row.get("Name"), row.get("Year")), [])
+        d = _parse_date(row.get("Date"))
+        if d is not None:
+            insort(dates, d)
+
+    def _rebuild(self, stamp: Optional[Tuple[int, int]]) -> None:
+        self._entries = {}
+        if stamp is not None:
+            with open(self.path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self._add_row(row)
+        self._stamp = stamp
+
+    def _ensure_fresh(self) -> None:
+        stamp = self._current_stamp()
+        if stamp != self._stamp:
+            self._rebuild(stamp)
+
+    def contains(self, title: str | None, year: str | int | None) -> bool:
+        """True if the title/year has been logged at least once."""
+        with self._lock:
+            self._ensure_fresh()
+            return diary_key(title, year) in self._entries
+
+    def last_watched(self, title: str | None, year: str | int | None) -> Optional[datetime]:
+        with self._lock:
+            self._ensure_fresh()
+            dates = self._entries.get(diary_key(title, year))
+            return dates[-1] if dates else None
+
+    def logged_since(self, title: str | None, year: str | int | None, cutoff: datetime) -> bool:
+        last = self.last_watched(title, year)
+        return last is not None and last >= cutoff
+
+    @contextmanager
+    def appending(self) -> Iterator[List[dict]]:
+        """
+        Hold the index while rows are appended to the CSV. The caller adds the
+        CSV row dicts it wrote to the yielded list; if the index was current
+        before the write, those rows are merged in place instead of triggering
+        a full rebuild on the next lookup.
+        """
+        with self._lock:
+            fresh = self._stamp is not None and self._stamp == self._current_stamp()
+            written: List[dict] = []
+            yield written
+            if fresh:
+                for row in written:
+                    self._add_row(row)
+                self._stamp = self._current_stamp()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._stamp = None
+
+
+_indexes: Dict[str, DiaryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(path: str) -> DiaryIndex:
+    """Process-wide index for a diary CSV path."""
+    key = os.path.abspath(path)
+    with _indexes_lock:
+        idx = _indexes.get(key)
+        if idx is None:
+            idx = _indexes[key] = DiaryIndex(key)
+        return idx
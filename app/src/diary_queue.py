@@ -0,0 +1,158 @@
+import asyncio, logging, threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from .diary_index import diary_key, get_index
+from .letterboxd_csv import DiaryRow
+from .utils import DiaryWriter
+
+log = logging.getLogger("webhook")
+
+
+class DiaryIngestQueue:
+    """
+    Bounded hand-off between the webhook endpoint and a single writer task.
+
+    The endpoint only validates and `offer()`s rows, so requests return
+    immediately. `run()` is the only code that touches the CSV: it drains the
+    queue in batches (up to `batch_size` rows, or whatever arrived within
+    `flush_interval` seconds), drops rows inside the dedupe window (against
+    the diary and earlier rows of the same batch), marks rewatches and writes
+    the batch with one open/fsync. With one writer, lines never interleave.
+
+    A batch that fails to write is held and retried (backing off from
+    `retry_delay` up to `max_retry_delay` seconds) before any new rows are
+    taken, so a full disk or a locked file delays rows instead of losing them.
+    """
+
+    def __init__(self, csv_path: str, dedupe_days: int, maxsize: int = 10000,
+                 batch_size: int = 500, flush_interval: float = 0.5,
+                 retry_delay: float = 1.0, max_retry_delay: float = 60.0):
+        self.csv_path = csv_path
+        self.dedupe_days = dedupe_days
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # The batch being written, until it lands; shared with flush() under the lock
+        self._held: List[DiaryRow] = []
+        self._write_lock = threading.Lock()
+        self.written = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, row: DiaryRow) -> bool:
+        """Enqueue without waiting; False when the queue is full (caller should 503)."""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+
+    async def _next_batch(self) -> List[DiaryRow]:
+        batch = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # Take what's already queued, then linger briefly for stragglers
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _write(self, batch: List[DiaryRow]) -> int:
+        index = get_index(self.csv_path)
+        cutoff = datetime.utcnow() - timedelta(days=self.dedupe_days)
+        seen = set()
+        rows: List[dict] = []
+        for row in batch:
+            key = diary_key(row.Name, row.Year)
+            if key in seen or index.logged_since(row.Name, row.Year, cutoff):
+                continue
+            seen.add(key)
+            row.Rewatch = "Yes" if index.contains(row.Name, row.Year) else ""
+            rows.append(row.as_csv_row())
+        if rows:
+            with DiaryWriter(self.csv_path) as w:
+                w.write_all(rows)
+        # Counted once the batch landed, so a retried batch isn't counted twice
+        self.duplicates += len(batch) - len(rows)
+        return len(rows)
+
+    def _write_held(self) -> int:
+        """Write the held batch and let go of it only once it landed."""
+        with self._write_lock:
+            n = self._write(self._held) if self._held else 0
+            self._held = []
+            return n
+
+    async def run(self) -> None:
+        """Writer loop; run exactly one per CSV path."""
+        while True:
+            batch = await self._next_batch()
+            self._held = batch
+            delay = self.retry_delay
+            while True:
+                try:
+                    n = await asyncio.to_thread(self._write_held)
+                    break
+                except Exception as e:
+                    log.exception(f"Diary batch write failed; retrying its {len(batch)} rows "
+                                  f"in {delay:.0f}s: {e}")
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+            self.written += n
+            log.info(f"Diary batch: {n} written, {len(batch) - n} duplicates skipped")
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> int:
+        """
+        Write the held batch and everything still queued, here and now (the
+        last resort on shutdown). Waits for a write already in progress.
+        """
+        rows: List[DiaryRow] = []
+        while True:
+            try:
+                rows.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+            self._queue.task_done()
+        with self._write_lock:
+            batch, self._held = self._held + rows, []
+            if not batch:
+                return 0
+            try:
+                n = self._write(batch)
+            except Exception as e:
+                log.exception(f"Shutting down with {len(batch)} diary rows unwritten: {e}")
+                return 0
+        self.written += n
+        log.info(f"Diary flush: {n} written, {len(batch) - n} duplicates skipped")
+        return n
+
+    async def drain(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Wait for queued rows to be written (used on shutdown). What the writer
+        has not got to by `timeout`, including a batch it is still retrying,
+        is written synchronously instead of dropped.
+        """
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Writer still busy at shutdown; flushing {self.depth} queued diary rows")
+            self.flush()
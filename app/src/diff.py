@@ -0,0 +1,173 @@
+from bisect import bisect_left, bisect_right
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# id fields an item can be matched on; the item's own first, then its show's
+_ID_FIELDS = ("imdb_id", "tmdb_id", "tvdb_id", "trakt_id")
+_SHOW_ID_FIELDS = ("show_imdb_id", "show_tmdb_id", "show_tvdb_id", "show_trakt_id")
+# Everything the diff reads, fetched in one call per item
+_FIELDS = ("type", "season", "episode", "watched_at") + _ID_FIELDS + _SHOW_ID_FIELDS
+_read_attrs = attrgetter(*_FIELDS)
+
+
+def _read(item) -> tuple:
+    # WatchEvents are read with one C-level attrgetter; dicts key by key
+    if isinstance(item, dict):
+        return tuple(map(item.get, _FIELDS))
+    return _read_attrs(item)
+
+
+def _keys(row: tuple) -> Tuple[str, ...]:
+    kind, season, episode = row[0] or "", row[1], row[2]
+    keys = [f"{kind}:{f[:-3]}:{v}" for f, v in zip(_ID_FIELDS, row[4:8]) if v]
+    if kind == "episode" and season is not None and episode is not None:
+        se = f"s{int(season)}e{int(episode)}"
+        keys += [f"episode:show_{f[5:-3]}:{v}:{se}" for f, v in zip(_SHOW_ID_FIELDS, row[8:]) if v]
+    return tuple(keys)
+
+
+def match_keys(item) -> Tuple[str, ...]:
+    """
+    Every key an item (WatchEvent or dict) can be matched on, namespaced by
+    kind and source, e.g. ("movie:imdb:tt0113277", "movie:tmdb:949").
+    Episodes also match on <show id> + season/episode, since services rarely
+    agree on episode ids.
+    """
+    return _keys(_read(item))
+
+
+def _ts(v) -> Optional[int]:
+    if isinstance(v, datetime):
+        return int(v.timestamp())
+    if isinstance(v, (int, float)):
+        return int(v)
+    return None
+
+
+@dataclass
+class Changeset:
+    add: List[dict] = field(default_factory=list)
+    remove: List[dict] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.add or self.remove)
+
+
+@dataclass
+class Diff:
+    only_a: List[dict] = field(default_factory=list)    # plays in A with no matching play in B
+    only_b: List[dict] = field(default_factory=list)
+    unseen_in_b: List[dict] = field(default_factory=list)  # A items B has never seen at all
+    unseen_in_a: List[dict] = field(default_factory=list)
+    matched: int = 0
+    unkeyed: int = 0  # items with no usable id; never matched, never written
+
+    def changeset(self, target: str, by_play: bool = True, mirror: bool = False) -> Changeset:
+        """
+        What to write to `target` ("a" or "b") to bring it in line with the
+        other side. `by_play` syncs individual plays (history); otherwise only
+        titles the target has never seen (watched status). `mirror` also
+        removes what the other side doesn't have.
+        """
+        if target not in ("a", "b"):
+            raise ValueError("target must be 'a' or 'b'")
+        to_b = target == "b"
+        if by_play:
+            add, extra = (self.only_a, self.only_b) if to_b else (self.only_b, self.only_a)
+        else:
+            add, extra = (self.unseen_in_b, self.unseen_in_a) if to_b else (self.unseen_in_a, self.unseen_in_b)
+        return Changeset(add=list(add), remove=list(extra) if mirror else [])
+
+
+def _take(bucket: list, ts: Optional[int], tolerance: int) -> Optional[list]:
+    """
+    Take an unused B play from one key's bucket that matches a play at `ts`:
+    the earliest timed play within `tolerance` (found by bisecting the sorted
+    times), else an untimed one. Only the tolerance window is scanned; the
+    bucket also remembers where its first unused timed play is, so untimed A
+    plays never rescan the used ones in front of it.
+    """
+    times, timed, untimed, first = bucket
+    if ts is None:
+        lo, hi = first, len(timed)
+    else:
+        lo = bisect_left(times, ts - tolerance, first)
+        hi = bisect_right(times, ts + tolerance, lo)
+    hit = next((timed[i] for i in range(lo, hi) if not timed[i][2]), None)
+    if hit is not None:
+        hit[2] = True
+        while first < len(timed) and timed[first][2]:
+            first += 1
+        bucket[3] = first
+        return hit
+    while untimed:
+        entry = untimed.popleft()
+        if not entry[2]:
+            return entry
+    return None
+
+
+def diff(a: Iterable[dict], b: Iterable[dict], tolerance: int = 60) -> Diff:
+    """
+    Compare two normalized snapshots in one pass over hashed indexes.
+
+    A play in A matches an unused play in B that shares any match key and was
+    watched within `tolerance` seconds (items without a timestamp match any
+    play of the same title). Each play is matched at most once, so rewatches
+    are counted separately. B's plays under each key are sorted by time, so
+    a heavily rewatched title costs a bisect per play, not a scan.
+    """
+    out = Diff()
+    b_entries: List[list] = []
+    by_key: Dict[str, List[list]] = {}
+    for item in b:
+        row = _read(item)
+        keys = _keys(row)
+        if not keys:
+            out.unkeyed += 1
+            continue
+        entry = [item, _ts(row[3]), False, keys]
+        b_entries.append(entry)
+        for k in keys:
+            by_key.setdefault(k, []).append(entry)
+
+    # key -> [sorted watch times, their entries, untimed entries, first unused timed entry]
+    b_index: Dict[str, list] = {}
+    for k, entries in by_key.items():
+        timed = sorted((e for e in entries if e[1] is not None), key=lambda e: e[1])
+        b_index[k] = [[e[1] for e in timed], timed, deque(e for e in entries if e[1] is None), 0]
+    del by_key
+
+    a_keys = set()
+    for item in a:
+        row = _read(item)
+        keys = _keys(row)
+        if not keys:
+            out.unkeyed += 1
+            continue
+        a_keys.update(keys)
+        ts = _ts(row[3])
+        hit = None
+        for k in keys:
+            bucket = b_index.get(k)
+            if bucket is not None:
+                hit = _take(bucket, ts, tolerance)
+                if hit is not None:
+                    break
+        if hit is not None:
+            hit[2] = True
+            out.matched += 1
+        else:
+            out.only_a.append(item)
+            if not any(k in b_index for k in keys):
+                out.unseen_in_b.append(item)
+
+    for item, _, used, keys in b_entries:
+        if not used:
+            out.only_b.append(item)
+            if not any(k in a_keys for k in keys):
+                out.unseen_in_a.append(item)
+    return out
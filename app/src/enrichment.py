@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache import TTLCache
+
+log = logging.getLogger("enrich")
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def _year_of(date_str: Optional[str]) -> Optional[int]:
+    if date_str and len(date_str) >= 4 and date_str[:4].isdigit():
+        return int(date_str[:4])
+    return None
+
+
+class Enricher:
+    """
+    Attaches external ids to normalized Plex items using TMDb (movies) and
+    TheTVDB (shows), through a shared TTLCache so a title is looked up
+    upstream at most once per TTL no matter how many cycles or concurrent
+    callers ask for it.
+    """
+
+    def __init__(self, services: Dict[str, Any], cache: TTLCache, max_concurrency: int = 8):
+        self.svcs = services
+        self.cache = cache
+        self._sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def _limited(self, fn, *args):
+        async with self._sem:
+            return await fn(*args)
+
+    #
+    # Cached upstream lookups
+    #
+    async def search_movie(self, title: str, year: Optional[int]) -> Optional[dict]:
+        """
+        Best TMDb movie match for title/year as {"tmdb_id": ...}, or None.
+        With a year, only a result released that year counts: a same-titled
+        film from another year is a different film, so that caches a miss.
+        """
+        tmdb = self.svcs.get("tmdb")
+        if tmdb is None or not title:
+            return None
+
+        async def fetch():
+            results = await self._limited(tmdb.search_movie, title, int(year) if year else None)
+            if results is None:
+                raise LookupError("TMDb search failed")
+            if year:
+                best = next((r for r in results if _year_of(r.get("release_date")) == int(year)), None)
+            else:
+                best = results[0] if results else None
+            return {"tmdb_id": best.get("id")} if best else None
+
+        return await self.cache.get_or_fetch(f"tmdb:search_movie:{_norm(title)}|{year or ''}", fetch)
+
+    async def search_series(self, name: str) -> Optional[dict]:
+        """First TheTVDB series match for a show name as {"show_tvdb_id": ...}, or None."""
+        tvdb = self.svcs.get("tvdb")
+        if tvdb is None or not name:
+            return None
+
+        async def fetch():
+            data = await self._limited(tvdb.search, name)
+            if not data:
+                # The client returns {}/None on errors; don't cache those as misses
+                raise LookupError("TheTVDB search failed")
+            series = [r for r in data.get("data") or [] if r.get("type") == "series"]
+            if not series:
+                return None
+            return {"show_tvdb_id": series[0].get("tvdb_id")}
+
+        return await self.cache.get_or_fetch(f"tvdb:search:{_norm(name)}", fetch)
+
+    async def get_series(self, tvdb_id: int) -> Optional[dict]:
+        tvdb = self.svcs.get("tvdb")
+        if tvdb is None or not tvdb_id:
+            return None
+
+        async def fetch():
+            data = await self._limited(tvdb.get_series, tvdb_id)
+            if not data:
+                raise LookupError("TheTVDB series fetch failed")
+            return data.get("data") or None
+
+        return await self.cache.get_or_fetch(f"tvdb:series:{tvdb_id}", fetch)
+
+    #
+    # Item enrichment
+    #
+    @staticmethod
+    def _lookup_key(item: dict) -> Optional[Tuple[str, str, Any]]:
+        if item.get("type") == "movie" and not (item.get("tmdb_id") or item.get("imdb_id")):
+            return "movie", item.get("title"), item.get("year")
+        if item.get("type") == "episode" and not item.get("show_tvdb_id"):
+            return "show", item.get("show_title"), None
+        return None
+
+    async def _resolve(self, key: Tuple[str, str, Any]) -> Optional[dict]:
+        kind, title, year = key
+        try:
+            if kind == "movie":
+                return await self.search_movie(title, year)
+            return await self.search_series(title)
+        except Exception as e:
+            log.warning(f"Enrichment lookup failed for {kind} '{title}': {e}")
+            return None
+
+    async def enrich(self, items: List[dict]) -> List[dict]:
+        """Add tmdb_id / show_tvdb_id to items in place; each distinct title is resolved once."""
+        keys = {k for k in map(self._lookup_key, items) if k and k[1]}
+        if not keys:
+            return items
+        ordered = list(keys)
+        resolved = dict(zip(ordered, await asyncio.gather(*(self._resolve(k) for k in ordered))))
+
+        for item in items:
+            ids = resolved.get(self._lookup_key(item))
+            if ids:
+                for name, value in ids.items():
+                    if value and not item.get(name):
+                        item[name] = value
+        log.info(f"Enriched {len(items)} items from {len(keys)} distinct titles "
+                 f"(cache hits={self.cache.hits}, misses={self.cache.misses})")
+        return items
@@ -0,0 +1,90 @@
+import importlib.util
+import logging
+import time
+from typing import TYPE_CHECKING, Dict
+from urllib.parse import urlsplit
+
+from metrics import observe_http
+
+if TYPE_CHECKING:
+    import httpx
+
+log = logging.getLogger("http")
+
+DEFAULTS = {
+    "max_connections": 20,
+    "max_keepalive_connections": 10,
+    "keepalive_expiry_seconds": 30.0,
+    "timeout_seconds": 20.0,
+    "http2": False,
+}
+
+_settings: Dict[str, object] = dict(DEFAULTS)
+_clients: Dict[str, "httpx.AsyncClient"] = {}
+
+
+def configure(cfg: dict | None) -> None:
+    """Apply the `http` config section. Only affects pools created afterwards."""
+    for key in DEFAULTS:
+        if cfg and cfg.get(key) is not None:
+            _settings[key] = cfg[key]
+    if _settings["http2"] and importlib.util.find_spec("h2") is None:
+        log.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+        _settings["http2"] = False
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+async def _start_timer(request) -> None:
+    request.extensions["watchweave_start"] = time.perf_counter()
+
+
+async def _record_response(response) -> None:
+    # Latency to response headers; cheap enough to leave on for every request
+    start = response.request.extensions.get("watchweave_start")
+    if start is not None:
+        observe_http(response.request.url.host, response.status_code, time.perf_counter() - start)
+
+
+def _build_client() -> "httpx.AsyncClient":
+    # Imported on first use so startup doesn't pay for httpx unless a service needs it
+    import httpx
+
+    return httpx.AsyncClient(
+        http2=bool(_settings["http2"]),
+        timeout=float(_settings["timeout_seconds"]),
+        limits=httpx.Limits(
+            max_connections=int(_settings["max_connections"]),
+            max_keepalive_connections=int(_settings["max_keepalive_connections"]),
+            keepalive_expiry=float(_settings["keepalive_expiry_seconds"]),
+        ),
+        event_hooks={"request": [_start_timer], "response": [_record_response]},
+    )
+
+
+def get_client(url: str) -> "httpx.AsyncClient":
+    """
+    Shared keep-alive client for the upstream host of `url`. Every integration
+    should go through this instead of opening its own AsyncClient, so repeated
+    calls reuse TCP/TLS connections.
+    """
+    origin = _origin(url)
+    client = _clients.get(origin)
+    if client is None or client.is_closed:
+        client = _clients[origin] = _build_client()
+        log.debug("Opened HTTP pool for %s", origin)
+    return client
+
+
+async def aclose_all() -> None:
+    """Close every pool; call once at shutdown."""
+    clients = list(_clients.items())
+    _clients.clear()
+    for origin, client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            log.warning("Error closing HTTP pool for %s: %s", origin, e)
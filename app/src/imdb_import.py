@@ -1,33 +1,131 @@
 import csv, os
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Dict, Iterator, List, Optional, Sequence
 
-@dataclass
+# Output field -> header names seen in IMDb exports (first match wins)
+COLUMNS: Dict[str, Sequence[str]] = {
+    "imdb_id": ("Const", "imdbID"),
+    "title": ("Title", "Original Title"),
+    "year": ("Year", "Release Year"),
+    "rating": ("Your Rating", "Rating"),
+    "type": ("Title Type",),
+    "date": ("Date Rated", "Created"),
+}
+FIELDS = tuple(COLUMNS)
+# Any of these in a row marks it as the header
+KNOWN_COLUMNS = frozenset(name for names in COLUMNS.values() for name in names)
+
+# IMDb "Title Type" -> the item types used elsewhere in the app
+TITLE_TYPES = {
+    "movie": "movie", "tvMovie": "movie", "video": "movie", "short": "movie", "tvShort": "movie",
+    "tvSeries": "show", "tvMiniSeries": "show", "tvEpisode": "episode",
+    # older exports spell these out
+    "Feature Film": "movie", "TV Movie": "movie", "Video": "movie", "Short Film": "movie",
+    "TV Series": "show", "TV Mini-Series": "show", "TV Episode": "episode",
+}
+
+
+@dataclass(slots=True)
 class IMDbItem:
     title: str
     year: Optional[int]
     imdb_id: Optional[str]
     rating: Optional[float] = None
     type: str = "movie"
+    date: Optional[str] = None
 
-def load_imdb_csv(path: str) -> List[IMDbItem]:
-    items: List[IMDbItem] = []
+
+def detect_format(header: Sequence[str], path: str = "") -> str:
+    """'ratings', 'watchlist' or 'list' from an export's header (and file name for watchlists)."""
+    cols = set(header)
+    if "Date Rated" in cols or ("Your Rating" in cols and "Position" not in cols):
+        return "ratings"
+    if "Position" in cols:
+        return "watchlist" if "watchlist" in os.path.basename(path).lower() else "list"
+    return "unknown"
+
+
+def _columns(header: Sequence[str], fields: Sequence[str]) -> Dict[str, int]:
+    index = {name.strip(): i for i, name in enumerate(header)}
+    out: Dict[str, int] = {}
+    for field in fields:
+        for name in COLUMNS[field]:
+            if name in index:
+                out[field] = index[name]
+                break
+    return out
+
+
+def _year(v: str) -> Optional[int]:
+    v = v.strip()[:4]
+    return int(v) if v.isdigit() else None
+
+
+def _rating(v: str) -> Optional[float]:
+    try:
+        return float(v) if v else None
+    except ValueError:
+        return None
+
+
+def _rows(path: str, fields: Sequence[str]):
+    """(format, {field: column index}, csv reader positioned after the header)."""
+    f = open(path, newline="", encoding="utf-8-sig")
+    rdr = csv.reader(f)
+    for header in rdr:
+        # Skip any preamble before the real header row
+        if any(name.strip() in KNOWN_COLUMNS for name in header):
+            return f, detect_format(header, path), _columns(header, fields), rdr
+    f.close()
+    return None, "unknown", {}, iter(())
+
+
+def iter_imdb_csv(path: str, fields: Optional[Sequence[str]] = None) -> Iterator[IMDbItem]:
+    """
+    Stream an IMDb ratings/watchlist/list export one IMDbItem at a time.
+    Only the columns in `fields` are parsed (the rest keep their defaults),
+    so memory stays flat regardless of export size.
+    """
     if not path or not os.path.exists(path):
-        return items
-    with open(path, newline="", encoding="utf-8") as f:
-        rdr = csv.DictReader(f)
+        return
+    f, _, cols, rdr = _rows(path, fields or FIELDS)
+    if f is None:
+        return
+    def get(row, field):
+        i = cols.get(field)
+        return row[i] if i is not None and i < len(row) else ""
+
+    with f:
         for row in rdr:
-            imdb_id = row.get("Const") or row.get("imdbID") or ""
-            t = row.get("Title") or ""
-            y = row.get("Year") or row.get("Release Year") or ""
-            r = row.get("Your Rating") or row.get("Rating") or ""
-            try:
-                y_i = int(y) if str(y).isdigit() else None
-            except Exception:
-                y_i = None
-            try:
-                r_f = float(r) if r else None
-            except Exception:
-                r_f = None
-            items.append(IMDbItem(title=t, year=y_i, imdb_id=imdb_id if imdb_id else None, rating=r_f))
-    return items
+            if not row:
+                continue
+            imdb_id = get(row, "imdb_id")
+            yield IMDbItem(
+                title=get(row, "title"),
+                year=_year(get(row, "year")),
+                imdb_id=imdb_id or None,
+                rating=_rating(get(row, "rating")),
+                type=TITLE_TYPES.get(get(row, "type"), "movie"),
+                date=get(row, "date") or None,
+            )
+
+
+def iter_imdb_columns(path: str, chunk_size: int = 5000,
+                      fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, list]]:
+    """Columnar mode for bulk work: yields {field: [values...]} chunks of up to `chunk_size` rows."""
+    fields = tuple(fields or FIELDS)
+    chunk: Dict[str, list] = {f: [] for f in fields}
+    n = 0
+    for item in iter_imdb_csv(path, fields):
+        for f in fields:
+            chunk[f].append(getattr(item, f))
+        n += 1
+        if n >= chunk_size:
+            yield chunk
+            chunk, n = {f: [] for f in fields}, 0
+    if n:
+        yield chunk
+
+
+def load_imdb_csv(path: str) -> List[IMDbItem]:
+    return list(iter_imdb_csv(path))
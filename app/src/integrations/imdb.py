@@ -1,5 +1,7 @@
 import logging
-import pandas as pd
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from imdb_import import IMDbItem, iter_imdb_columns, iter_imdb_csv
 
 log = logging.getLogger("imdb")
 
@@ -7,11 +9,21 @@ class IMDbClient:
     def __init__(self, csv_path: str):
         self.csv_path = csv_path
 
-    def load_ratings(self):
-        """Load IMDb ratings CSV (exported from IMDb)."""
+    def iter_ratings(self, fields: Optional[Sequence[str]] = None) -> Iterator[IMDbItem]:
+        """Stream the IMDb ratings CSV (exported from IMDb) without loading it whole."""
+        try:
+            yield from iter_imdb_csv(self.csv_path, fields)
+        except Exception as e:
+            log.exception(f"IMDb CSV load error: {e}")
+
+    def iter_rating_columns(self, chunk_size: int = 5000,
+                            fields: Optional[Sequence[str]] = None) -> Iterator[Dict[str, list]]:
+        """Columnar chunks of the ratings CSV, for bulk operations."""
         try:
-            df = pd.read_csv(self.csv_path)
-            return df
+            yield from iter_imdb_columns(self.csv_path, chunk_size, fields)
         except Exception as e:
             log.exception(f"IMDb CSV load error: {e}")
-            return pd.DataFrame()
+
+    def load_ratings(self) -> List[IMDbItem]:
+        """Load IMDb ratings CSV (exported from IMDb)."""
+        return list(self.iter_ratings())
@@ -1,14 +1,33 @@
+import asyncio
+import json
 import logging
+import os
+import re
+import threading
 import time
+from dataclasses import dataclass
 from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Set
+from urllib.parse import urlsplit
 
 import requests
-from bs4 import BeautifulSoup
+
+from metrics import observe_http
+from ratelimit import AdaptiveTokenBucket
+from watch_event import WatchEvent
 
 log = logging.getLogger("letterboxd")
 
 LOGIN_URL = "https://letterboxd.com/sign-in/"
 DIARY_POST_URL = "https://letterboxd.com/ajax/post-entry"
+# Redirects to the sign-in page unless the session is logged in
+SESSION_PROBE_URL = "https://letterboxd.com/settings/"
+CSRF_COOKIE = "com.xk72.webparts.csrf"
+CSRF_INPUT_RE = re.compile(
+    r'<input[^>]*name=["\']__csrf["\'][^>]*value=["\']([^"\']+)["\']'
+    r'|<input[^>]*value=["\']([^"\']+)["\'][^>]*name=["\']__csrf["\']'
+)
 
 DEFAULT_HEADERS = {
     "User-Agent": (
@@ -27,17 +46,101 @@ class LetterboxdClient:
       It may break if Letterboxd changes their HTML or endpoints.
     """
 
-    def __init__(self, username: str, password: str, enabled: bool = False, dry_run: bool = False):
+    def __init__(self, username: str, password: str, enabled: bool = False, dry_run: bool = False,
+                 session_path: Optional[str] = None):
         self.username = username
         self.password = password
         self.enabled = enabled
         self.dry_run = dry_run
+        self.session_path = Path(session_path) if session_path else None
+        self.csrf: Optional[str] = None
 
         self.session = requests.Session()
         self.session.headers.update(DEFAULT_HEADERS)
+        self.session.hooks["response"].append(
+            lambda r, *args, **kwargs: observe_http(urlsplit(r.url).hostname, r.status_code, r.elapsed.total_seconds()))
+        self._login_lock = threading.Lock()
+        self._session_generation = 0
 
         if self.enabled:
-            self._login()
+            if self._restore_session() and self._session_is_valid():
+                log.info("✔ Reusing saved Letterboxd session for %s", self.username)
+            else:
+                self.session.cookies.clear()
+                self._login()
+
+    #
+    # Session persistence
+    #
+    def _restore_session(self) -> bool:
+        if not self.session_path or not self.session_path.exists():
+            return False
+        try:
+            with self.session_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("username") != self.username:
+                return False
+            for c in data.get("cookies", []):
+                self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"),
+                                         path=c.get("path", "/"), expires=c.get("expires"),
+                                         secure=c.get("secure", False))
+            self.csrf = data.get("csrf") or self.session.cookies.get(CSRF_COOKIE)
+            return True
+        except Exception as e:
+            log.warning("Could not read saved Letterboxd session (%s); logging in again.", e)
+            self.session.cookies.clear()
+            return False
+
+    def _save_session(self) -> None:
+        if not self.session_path:
+            return
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+             "expires": c.expires, "secure": c.secure}
+            for c in self.session.cookies
+        ]
+        try:
+            self.session_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.session_path.with_suffix(self.session_path.suffix + ".tmp")
+            # Session cookies are credentials: owner-only
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"username": self.username, "csrf": self.csrf,
+                           "cookies": cookies, "saved_at": int(time.time())}, f)
+            os.replace(tmp, self.session_path)
+        except Exception as e:
+            log.warning("Could not save Letterboxd session: %s", e)
+
+    def _session_is_valid(self) -> bool:
+        """Cheap probe: a logged-in session gets the settings page, not a redirect."""
+        try:
+            r = self.session.get(SESSION_PROBE_URL, timeout=15, allow_redirects=False)
+            return r.status_code == 200
+        except Exception as e:
+            log.warning("Letterboxd session probe failed: %s", e)
+            return False
+
+    def reauthenticate(self, generation: int) -> bool:
+        """
+        Log in again after a 401/403. `generation` is the session generation the
+        caller saw; if another worker already re-logged in since, this is a no-op.
+        """
+        with self._login_lock:
+            if generation == self._session_generation:
+                log.info("🔐 Letterboxd session expired; logging in again")
+                self.session.cookies.clear()
+                self._login()
+            return self.enabled
+
+    @staticmethod
+    def _find_csrf(html: str) -> Optional[str]:
+        m = CSRF_INPUT_RE.search(html)
+        if m:
+            return m.group(1) or m.group(2)
+        # Markup changed? fall back to a real parser
+        from bs4 import BeautifulSoup
+        token_input = BeautifulSoup(html, "html.parser").find("input", {"name": "__csrf"})
+        return token_input.get("value") if token_input else None
 
     def _login(self) -> None:
         """Perform form-based login and establish a session."""
@@ -47,15 +150,12 @@ class LetterboxdClient:
             r = self.session.get(LOGIN_URL, timeout=15)
             r.raise_for_status()
 
-            soup = BeautifulSoup(r.text, "html.parser")
-            token_input = soup.find("input", {"name": "__csrf"})
-            if not token_input or not token_input.get("value"):
+            csrf_token = self._find_csrf(r.text)
+            if not csrf_token:
                 log.error("❌ Could not locate CSRF token on Letterboxd login page.")
                 self.enabled = False
                 return
 
-            csrf_token = token_input["value"]
-
             payload = {
                 "__csrf": csrf_token,
                 "username": self.username,
@@ -77,24 +177,19 @@ class LetterboxdClient:
                 self.enabled = False
                 return
 
+            self.csrf = self.session.cookies.get(CSRF_COOKIE) or csrf_token
+            self.enabled = True
+            self._session_generation += 1
+            self._save_session()
             log.info("✔ Logged into Letterboxd successfully")
 
         except Exception as e:
             log.error("❌ Letterboxd login error: %s", e, exc_info=True)
             self.enabled = False
 
-    def _post_diary_entry(self, movie_title: str, watched_at: datetime, tmdb_id=None) -> bool:
-        """Post a single diary entry."""
-        if not self.enabled:
-            return False
-
-        date_str = watched_at.strftime("%Y-%m-%d")
-
-        if self.dry_run:
-            log.info("🧪 DRY-RUN Letterboxd: would log %s (%s)", movie_title, date_str)
-            return True
-
+    def _diary_payload(self, date_str: str, tmdb_id=None) -> dict:
         payload = {
+            "__csrf": self.csrf or "",
             "diary-entry-watchedDate": date_str,
             "diary-entry-date": date_str,
             "diary-entry-time": "",
@@ -105,13 +200,34 @@ class LetterboxdClient:
 
         if tmdb_id:
             payload["tmdbId"] = tmdb_id
+        return payload
+
+    def _send_diary_entry(self, payload: dict) -> requests.Response:
+        """One POST, no retry/sleep; callers decide how to pace and retry."""
+        return self.session.post(DIARY_POST_URL, data=payload, timeout=15)
+
+    def _post_diary_entry(self, movie_title: str, watched_at: datetime, tmdb_id=None) -> bool:
+        """Post a single diary entry (blocking; async callers use DiaryPostQueue)."""
+        if not self.enabled:
+            return False
+
+        date_str = watched_at.strftime("%Y-%m-%d")
+
+        if self.dry_run:
+            log.info("🧪 DRY-RUN Letterboxd: would log %s (%s)", movie_title, date_str)
+            return True
+
+        payload = self._diary_payload(date_str, tmdb_id)
+        generation = self._session_generation
 
         try:
-            r = self.session.post(DIARY_POST_URL, data=payload, timeout=15)
+            r = self._send_diary_entry(payload)
             if r.status_code == 429:
                 log.warning("⏳ Rate-limited by Letterboxd; sleeping 10 seconds and retrying once…")
                 time.sleep(10)
-                r = self.session.post(DIARY_POST_URL, data=payload, timeout=15)
+                r = self._send_diary_entry(payload)
+            if r.status_code in (401, 403) and self.reauthenticate(generation):
+                r = self._send_diary_entry(self._diary_payload(date_str, tmdb_id))
 
             if r.status_code != 200:
                 log.error("❌ Failed to post diary entry (%s) for %s", r.status_code, movie_title)
@@ -124,24 +240,16 @@ class LetterboxdClient:
             log.error("❌ Diary posting error for %s: %s", movie_title, e, exc_info=True)
             return False
 
-    def sync_watched(self, items) -> None:
+    def sync_watched(self, items: List[WatchEvent]) -> None:
         """
-        Takes a list of watched items from Plex and posts movies as diary entries.
-
-        Expected item shape:
-        {
-            "title": str,
-            "type": "movie" | "episode",
-            "watched_at": datetime,
-            "tmdb_id": Optional[int],
-            ...
-        }
+        Takes watch events from Plex and posts the movies as diary entries
+        (uses title, type, watched_at and tmdb_id).
         """
         if not self.enabled:
             log.info("Letterboxd disabled — skipping Letterboxd sync.")
             return
 
-        movies = [i for i in items if i.get("type") == "movie"]
+        movies = [i for i in items if i.type == "movie"]
 
         if not movies:
             log.info("ℹ No movies to sync to Letterboxd.")
@@ -150,15 +258,138 @@ class LetterboxdClient:
         log.info("📤 Syncing %d films → Letterboxd (dry_run=%s)", len(movies), self.dry_run)
 
         for m in movies:
-            title = m.get("title", "Unknown title")
-            watched_at = m.get("watched_at")
-            tmdb_id = m.get("tmdb_id")
+            self._post_diary_entry(m.title or "Unknown title", _as_datetime(m.watched_at), tmdb_id=m.tmdb_id)
+
+
+def _as_datetime(watched_at) -> datetime:
+    if isinstance(watched_at, datetime):
+        return watched_at
+    # fallback if we ever get strings
+    try:
+        return datetime.fromisoformat(str(watched_at))
+    except Exception:
+        return datetime.utcnow()
+
+
+@dataclass
+class DiaryQueueStats:
+    total: int = 0
+    posted: int = 0
+    failed: int = 0
+    throttled: int = 0
 
-            if not isinstance(watched_at, datetime):
-                # fallback if we ever get strings
-                try:
-                    watched_at = datetime.fromisoformat(str(watched_at))
-                except Exception:
-                    watched_at = datetime.utcnow()
 
-            self._post_diary_entry(title, watched_at, tmdb_id=tmdb_id)
+class DiaryPostQueue:
+    """
+    Drains diary entries to Letterboxd without blocking the event loop.
+
+    A small pool of workers pulls from an asyncio queue; each POST runs in a
+    thread on the client's session, paced by an adaptive token bucket that
+    backs off on 429s and slow responses and creeps back up on success.
+    Throttled entries go back on the queue (up to `max_attempts`).
+
+    An expired session is re-logged in at most once per session generation
+    per run. If that login fails, or the session it made is refused too,
+    the rest of the run fails fast instead of logging in again for every
+    entry.
+    """
+
+    def __init__(self, client: LetterboxdClient, workers: int = 2, rate_per_second: float = 0.5,
+                 max_rate_per_second: float = 2.0, max_attempts: int = 5, progress_every: int = 25):
+        self.client = client
+        self.workers = max(1, workers)
+        self.bucket = AdaptiveTokenBucket(rate_per_second, min_rate=0.05, max_rate=max_rate_per_second)
+        self.max_attempts = max_attempts
+        self.progress_every = max(1, progress_every)
+        # Per run: session generations logged in during it, and whether one was refused
+        self._fresh: Set[int] = set()
+        self._refused = False
+
+    async def _post(self, item: WatchEvent, stats: DiaryQueueStats) -> Optional[bool]:
+        """True on success, False on a permanent failure, None to retry later."""
+        title = item.title or "Unknown title"
+        date_str = _as_datetime(item.watched_at).strftime("%Y-%m-%d")
+        if self.client.dry_run:
+            log.info("🧪 DRY-RUN Letterboxd: would log %s (%s)", title, date_str)
+            return True
+
+        await self.bucket.acquire()
+        started = time.monotonic()
+        generation = self.client._session_generation
+        try:
+            r = await asyncio.to_thread(self.client._send_diary_entry,
+                                        self.client._diary_payload(date_str, item.tmdb_id))
+        except Exception as e:
+            log.warning("Diary posting error for %s: %s", title, e)
+            self.bucket.on_throttled()
+            return None
+
+        if r.status_code in (401, 403):
+            if generation in self._fresh:
+                if not self._refused:
+                    log.error("❌ Letterboxd refused a fresh session (%s); failing the rest of this run",
+                              r.status_code)
+                self._refused = True
+                return False
+            # Saved session expired mid-run: log in again (once per generation) and retry the entry
+            if await asyncio.to_thread(self.client.reauthenticate, generation):
+                self._fresh.add(self.client._session_generation)
+                return None
+            log.error("❌ Letterboxd re-login failed; failing the rest of this run")
+            self._refused = True
+            return False
+
+        if r.status_code == 429:
+            stats.throttled += 1
+            retry_after = r.headers.get("Retry-After")
+            self.bucket.on_throttled(float(retry_after) if retry_after and retry_after.isdigit() else None)
+            log.warning("⏳ Letterboxd throttled; now pacing at %.2f req/s", self.bucket.rate)
+            return None
+        if r.status_code >= 500:
+            self.bucket.on_throttled()
+            return None
+        if r.status_code != 200:
+            log.error("❌ Failed to post diary entry (%s) for %s", r.status_code, title)
+            return False
+
+        self.bucket.on_success(time.monotonic() - started)
+        log.info("📘 Logged on Letterboxd → %s (%s)", title, date_str)
+        return True
+
+    async def run(self, items: List[WatchEvent],
+                  on_posted: Optional[Callable[[List[WatchEvent]], None]] = None,
+                  on_progress: Optional[Callable[[DiaryQueueStats], None]] = None) -> DiaryQueueStats:
+        stats = DiaryQueueStats(total=len(items))
+        self._fresh, self._refused = set(), False
+        queue: asyncio.Queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait((item, 1))
+
+        def report():
+            if on_progress is not None:
+                on_progress(stats)
+            done = stats.posted + stats.failed
+            if done % self.progress_every == 0 or done == stats.total:
+                log.info("Letterboxd diary: %d/%d done (%d failed, %.2f req/s)",
+                         done, stats.total, stats.failed, self.bucket.rate)
+
+        async def worker():
+            while True:
+                try:
+                    item, attempt = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                ok = False if self._refused else await self._post(item, stats)
+                if ok is None and attempt < self.max_attempts:
+                    queue.put_nowait((item, attempt + 1))
+                    continue
+                if ok:
+                    stats.posted += 1
+                    if on_posted is not None:
+                        on_posted([item])
+                else:
+                    stats.failed += 1
+                report()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(items)) or 1)))
+        return stats
@@ -1,5 +1,6 @@
 import logging
-import httpx
+
+from http_pool import get_client
 
 log = logging.getLogger("musicboard")
 
@@ -13,10 +14,9 @@ class MusicboardClient:
     async def get_profile(self):
         url = f"{self.BASE}/users/{self.username}"
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                r = await client.get(url, headers={"Authorization": f"Bearer {self.api_key}"})
-                r.raise_for_status()
-                return r.json()
+            r = await get_client(url).get(url, headers={"Authorization": f"Bearer {self.api_key}"})
+            r.raise_for_status()
+            return r.json()
         except Exception as e:
             log.exception(f"Musicboard error: {e}")
             return {}
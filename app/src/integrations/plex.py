@@ -1,8 +1,26 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterator, List, Optional
+
 from plexapi.server import PlexServer
+from plexapi.utils import joinArgs
+
+from integrations.utils import parse_plex_guids
+from watch_event import WatchEvent
 
 log = logging.getLogger("plex")
 
+HISTORY_KEY = "/status/sessions/history/all"
+METADATA_KEY = "/library/metadata"
+SCROBBLE_KEY = "/:/scrobble"
+
+
+def normalize_history_entry(entry) -> WatchEvent:
+    """A Plex history row as a normalized watch event."""
+    return WatchEvent.from_plex(entry)
+
+
 class PlexClient:
     def __init__(self, server_url: str, token: str, username: str = ""):
         self.server_url = server_url
@@ -16,13 +34,109 @@ class PlexClient:
         except Exception as e:
             log.exception(f"Failed to connect to Plex: {e}")
 
-    def get_watched(self):
-        """Return Plex watch history (list of Video objects)."""
+    def get_watched(self, mindate: Optional[datetime] = None, maxresults: Optional[int] = None):
+        """
+        Return Plex watch history (list of Video objects), newest first.
+        `mindate` limits the result to rows viewed strictly after it.
+        """
         if not self.plex:
             log.warning("Plex client not initialized")
             return []
         try:
-            return self.plex.history() or []
+            return self.plex.history(maxresults=maxresults, mindate=mindate) or []
         except Exception as e:
             log.exception(f"Plex history error: {e}")
             return []
+
+    def iter_history_pages(self, page_size: int = 500,
+                           mindate: Optional[datetime] = None) -> Iterator[List]:
+        """
+        Yield watch history oldest-first, one container page per request.
+        Used for the initial backfill so a huge history is never held at once.
+        """
+        if not self.plex:
+            log.warning("Plex client not initialized")
+            return
+        args = {"sort": "viewedAt:asc"}
+        if mindate:
+            args["viewedAt>"] = int(mindate.timestamp())
+        key = f"{HISTORY_KEY}{joinArgs(args)}"
+
+        start = 0
+        while True:
+            page = self.plex.fetchItems(key, container_start=start,
+                                        container_size=page_size, maxresults=page_size)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            start += len(page)
+
+    def fetch_guids(self, rating_keys, chunk_size: int = 100) -> List[dict]:
+        """
+        Guids for many library items, `chunk_size` ratingKeys per request:
+        [{"rating_key", "type", "guids": [...], "show_key"}]. Items that are no
+        longer in the library are simply missing from the result.
+        """
+        if not self.plex:
+            return []
+        keys = [str(k) for k in rating_keys if k]
+        out = []
+        for i in range(0, len(keys), chunk_size):
+            chunk = keys[i:i + chunk_size]
+            try:
+                items = self.plex.fetchItems(f"{METADATA_KEY}/{','.join(chunk)}{joinArgs({'includeGuids': 1})}")
+            except Exception as e:
+                log.warning(f"Plex metadata lookup failed for {len(chunk)} items: {e}")
+                continue
+            for it in items:
+                guids = [g.id for g in getattr(it, "guids", None) or []]
+                if getattr(it, "guid", None):
+                    guids.append(it.guid)
+                out.append({
+                    "rating_key": str(it.ratingKey),
+                    "type": getattr(it, "type", None),
+                    "guids": guids,
+                    "show_key": getattr(it, "grandparentRatingKey", None),
+                })
+        return out
+
+    def resolve_ids(self, items: List[dict], crosswalk) -> None:
+        """
+        Attach external ids to normalized items from the crosswalk; items it
+        doesn't know yet get their guids from Plex in bulk, recorded for next time.
+        """
+        crosswalk.attach(items)
+        missing = set()
+        for kind in {i.get("type") for i in items} - {None}:
+            missing |= crosswalk.unknown(kind, "plex", (i.get("guid") for i in items if i.get("type") == kind))
+        missing |= crosswalk.unknown("show", "plex", (i.get("show_key") for i in items
+                                                       if i.get("type") == "episode"))
+        if not missing:
+            return
+        entries = [(m["type"], dict(parse_plex_guids(m["guids"]), plex=m["rating_key"]))
+                   for m in self.fetch_guids(sorted(missing))]
+        crosswalk.record_many(entries)
+        log.info(f"Crosswalk: looked up {len(missing)} Plex items, {len(entries)} found")
+        crosswalk.attach(items)
+
+    def mark_watched(self, rating_keys, concurrency: int = 4) -> List[str]:
+        """
+        Mark library items as played. Plex has no bulk endpoint, so requests
+        run `concurrency` at a time; returns the keys that were marked.
+        """
+        if not self.plex:
+            return []
+
+        def scrobble(key):
+            try:
+                self.plex.query(f"{SCROBBLE_KEY}{joinArgs({'key': key, 'identifier': 'com.plexapp.plugins.library'})}")
+                return key
+            except Exception as e:
+                log.warning(f"Plex mark-watched failed for {key}: {e}")
+                return None
+
+        keys = [str(k) for k in rating_keys if k]
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            return [k for k in pool.map(scrobble, keys) if k]
@@ -0,0 +1,128 @@
+import importlib
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass
+class Integration:
+    """
+    One service, declared by name. The module is only imported when the
+    service's config section is enabled, so disabled integrations cost nothing
+    at startup (no plexapi/trakt/bs4/httpx import).
+    """
+    name: str
+    label: str
+    module: str
+    cls: str
+    build: Callable[[Any, dict, dict], Any]  # (client class, section, full config) -> client
+    authenticate: bool = False
+    blocking: bool = False  # constructor does network I/O; run it in a thread
+
+    def enabled(self, config: dict) -> bool:
+        return bool((config.get(self.name) or {}).get("enabled"))
+
+    def load(self):
+        return getattr(importlib.import_module(self.module), self.cls)
+
+
+@dataclass
+class StartupTiming:
+    name: str
+    import_s: float = 0.0
+    construct_s: float = 0.0
+    auth_s: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def total_s(self) -> float:
+        return self.import_s + self.construct_s + self.auth_s
+
+
+@dataclass
+class StartupReport:
+    timings: List[StartupTiming] = field(default_factory=list)
+
+    def add(self, timing: StartupTiming) -> None:
+        self.timings.append(timing)
+
+    def lines(self) -> List[str]:
+        out = [f"{'service':<12} {'import':>8} {'construct':>10} {'auth':>8} {'total':>8}"]
+        for t in self.timings:
+            row = (f"{t.name:<12} {t.import_s:>7.2f}s {t.construct_s:>9.2f}s "
+                   f"{t.auth_s:>7.2f}s {t.total_s:>7.2f}s")
+            out.append(row + (f"  ✖ {t.error}" if t.error else ""))
+        return out
+
+
+class Timer:
+    """`with Timer() as t: ...; t.elapsed`"""
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self._start
+        return False
+
+
+def _plex(cls, c, config):
+    return cls(c["server_url"], c["token"], c["username"])
+
+
+def _trakt(cls, c, config):
+    return cls(client_id=c["client_id"], client_secret=c["client_secret"],
+               access_token=c["access_token"], refresh_token=c["refresh_token"])
+
+
+def _letterboxd(cls, c, config):
+    state_dir = config["general"].get("state_dir", "/config/state")
+    return cls(c["username"], c["password"], enabled=True, dry_run=c.get("dry_run", False),
+               session_path=c.get("session_path") or os.path.join(state_dir, "letterboxd_session.json"))
+
+
+def _tmdb(cls, c, config):
+    return cls(api_key=c["api_key"], max_concurrency=c.get("max_concurrency", 8),
+               rate_per_second=c.get("rate_per_second", 40))
+
+
+INTEGRATIONS: List[Integration] = [
+    Integration("plex", "Plex", "integrations.plex", "PlexClient", _plex, blocking=True),
+    Integration("trakt", "Trakt", "integrations.trakt", "TraktClient", _trakt, authenticate=True),
+    Integration("letterboxd", "Letterboxd", "integrations.letterboxd", "LetterboxdClient", _letterboxd,
+                blocking=True),
+    Integration("imdb", "IMDb", "integrations.imdb", "IMDbClient",
+                lambda cls, c, config: cls(c["csv_path"])),
+    Integration("tvdb", "TheTVDB", "integrations.thetvdb", "TheTVDBClient",
+                lambda cls, c, config: cls(api_key=c["api_key"], pin=c["pin"]), authenticate=True),
+    Integration("serializd", "Serializd", "integrations.serializd", "SerializdClient",
+                lambda cls, c, config: cls(c["api_key"])),
+    Integration("musicboard", "Musicboard", "integrations.musicboard", "MusicboardClient",
+                lambda cls, c, config: cls(username=c["username"], api_key=c["api_key"])),
+    Integration("tmdb", "TMDb", "integrations.tmdb", "TMDbClient", _tmdb),
+]
+
+REGISTRY: Dict[str, Integration] = {i.name: i for i in INTEGRATIONS}
+
+
+def enabled_integrations(config: dict) -> List[Integration]:
+    return [i for i in INTEGRATIONS if i.enabled(config)]
+
+
+def init_timeout(spec: Integration, config: dict) -> float:
+    default = config.get("general", {}).get("service_init_timeout_seconds", 60)
+    return float((config.get(spec.name) or {}).get("init_timeout_seconds", default))
+
+
+def critical_services(config: dict) -> List[str]:
+    """Services the scheduler waits for; defaults to the sync source."""
+    general = config.get("general", {})
+    names = general.get("critical_services")
+    if names is None:
+        names = general.get("sync_direction", "plex").split("->")[0]
+    if isinstance(names, str):
+        names = names.split(",")
+    return [n.strip().lower() for n in names if n.strip()]
@@ -1,21 +1,95 @@
+import asyncio
 import logging
-from . import plex, trakt, letterboxd, imdb
-from .utils import extract_imdb_id_from_guid
-
-def run_sync_cycle(config)->dict:
-    summary={'plex->trakt_updated':0,'plex_count':0,'trakt_count':0,'imdb_ratings':0,'letterboxd_items':0}
-    direction=(config.get('sync',{}).get('direction') or '').lower()
-    plex_watched=plex.get_plex_watched(config)
-    trakt_watched=trakt.get_trakt_watched(config)
-    imdb_ratings=imdb.get_imdb_ratings(config.get('imdb',{}).get('import_csv_path'))
-    lboxd=letterboxd.get_letterboxd_watchlist(config)
-    summary['plex_count']=len(plex_watched); summary['trakt_count']=len(trakt_watched); summary['imdb_ratings']=len(imdb_ratings); summary['letterboxd_items']=len(lboxd)
-    trakt_imdb_ids={m['ids']['imdb'] for m in trakt_watched if m.get('ids',{}).get('imdb')}
-    if 'plex->trakt' in direction or 'bidirectional' in direction:
-        for p in plex_watched:
-            imdb_id=p.get('imdb') or extract_imdb_id_from_guid(p.get('guid','') if 'guid' in p else '')
-            if imdb_id and imdb_id not in trakt_imdb_ids:
-                if trakt.mark_trakt_watched_imdb(config, imdb_id): summary['plex->trakt_updated']+=1
-    if 'trakt->plex' in direction or 'bidirectional' in direction: logging.info('Trakt->Plex watched sync placeholder.')
-    logging.info('✅ Cycle complete. Plex->Trakt updates=%s', summary['plex->trakt_updated'])
+
+from diff import diff
+from metrics import STAGE_SECONDS
+
+log = logging.getLogger("reconcile")
+
+
+def _direction(config) -> str:
+    return (config.get('sync', {}).get('direction')
+            or config.get('general', {}).get('sync_direction') or '').lower()
+
+
+async def plex_snapshot(plex, crosswalk, page_size=500) -> list:
+    """Every Plex play, normalized and carrying the external ids the crosswalk knows."""
+    from integrations.plex import normalize_history_entry
+
+    def fetch():
+        items = [normalize_history_entry(e) for page in plex.iter_history_pages(page_size) for e in page]
+        if items:
+            plex.resolve_ids(items, crosswalk)
+        return items
+
+    return await asyncio.to_thread(fetch)
+
+
+def _plex_keys(crosswalk, items) -> set:
+    """Plex ratingKeys for items, via bulk crosswalk lookups on each id column."""
+    keys = set()
+    for kind in ('movie', 'episode'):
+        for col in ('imdb', 'tmdb', 'tvdb'):
+            ids = [i[f'{col}_id'] for i in items if i.get('type') == kind and i.get(f'{col}_id')]
+            if ids:
+                keys.update(v['plex'] for v in crosswalk.lookup_many(kind, col, ids).values() if v.get('plex'))
+    return keys
+
+
+async def run_sync_cycle(config, services, crosswalk, ledger, retry_queue) -> dict:
+    """
+    Reconcile Plex and Trakt watched history in the configured direction(s).
+
+    Both sides are snapshotted once and compared by `diff.diff` in a single
+    linear pass; the resulting changesets go to batched writers (Trakt
+    /sync/history batches, concurrent Plex scrobbles) instead of one API call
+    per item.
+
+    Trakt adds go through the sync engine's delivery `ledger`, so plays it
+    has already delivered aren't pushed twice; plays delivered here are
+    recorded there and dropped from its `retry_queue`.
+    """
+    summary = {'plex->trakt_updated': 0, 'trakt->plex_updated': 0, 'plex_count': 0,
+               'trakt_count': 0, 'matched': 0, 'unmatched': 0}
+    direction = _direction(config)
+    to_trakt = 'plex->trakt' in direction or 'bidirectional' in direction
+    to_plex = 'trakt->plex' in direction or 'bidirectional' in direction
+    plex, trakt = services.get('plex'), services.get('trakt')
+    if not (plex and trakt) or not (to_trakt or to_plex):
+        return summary
+
+    plex_items, trakt_items = await asyncio.gather(plex_snapshot(plex, crosswalk), trakt.get_history())
+    if trakt_items is None:
+        log.warning('Trakt history unavailable; skipping reconcile.')
+        return summary
+    summary['plex_count'], summary['trakt_count'] = len(plex_items), len(trakt_items)
+
+    with STAGE_SECONDS.time(stage='diff', destination='reconcile'):
+        d = diff(plex_items, trakt_items)
+    summary['matched'], summary['unmatched'] = d.matched, d.unkeyed
+
+    if to_trakt:
+        # Plays Trakt is missing (history is per play)
+        adds = await asyncio.to_thread(ledger.undelivered, 'trakt', d.changeset('b').add)
+        if adds:
+            def record(delivered):
+                ledger.mark_delivered('trakt', delivered)
+                retry_queue.resolve('trakt', delivered)
+
+            trakt_cfg = config.get('trakt', {})
+            res = await trakt.add_to_history(adds, batch_size=int(trakt_cfg.get('batch_size', 100)),
+                                             concurrency=int(trakt_cfg.get('max_concurrency', 2)),
+                                             on_delivered=record)
+            summary['plex->trakt_updated'] = len(res.delivered)
+
+    if to_plex:
+        # Plex tracks watched status, not plays: only titles it has never played,
+        # and only those the crosswalk can map to a library item
+        keys = await asyncio.to_thread(_plex_keys, crosswalk, d.changeset('a', by_play=False).add)
+        if keys:
+            marked = await asyncio.to_thread(plex.mark_watched, sorted(keys))
+            summary['trakt->plex_updated'] = len(marked)
+
+    log.info('✅ Reconcile complete. Plex->Trakt=%s, Trakt->Plex=%s (matched %s plays)',
+             summary['plex->trakt_updated'], summary['trakt->plex_updated'], summary['matched'])
     return summary
@@ -1,5 +1,7 @@
 import logging
-import httpx
+from urllib.parse import urlencode
+
+from http_pool import get_client
 
 log = logging.getLogger("tvdb")
 
@@ -15,10 +17,9 @@ class TheTVDBClient:
         url = f"{self.BASE}/login"
         payload = {"apikey": self.api_key, "pin": self.pin}
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                r = await client.post(url, json=payload)
-                r.raise_for_status()
-                data = r.json()
+            r = await get_client(url).post(url, json=payload)
+            r.raise_for_status()
+            data = r.json()
             self.token = data.get("data", {}).get("token")
             if not self.token:
                 log.error(f"TheTVDB auth error: {data}")
@@ -35,14 +36,13 @@ class TheTVDBClient:
             return None
         headers = {"Authorization": f"Bearer {self.token}"}
         url = f"{self.BASE}{endpoint}"
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(url, headers=headers)
-            r.raise_for_status()
-            return r.json()
+        r = await get_client(url).get(url, headers=headers)
+        r.raise_for_status()
+        return r.json()
 
     async def search(self, query: str):
         try:
-            return await self._get(f"/search?query={query}")
+            return await self._get(f"/search?{urlencode({'query': query})}")
         except Exception as e:
             log.exception(f"TheTVDB search error: {e}")
             return {}
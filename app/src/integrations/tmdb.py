@@ -1,18 +1,107 @@
+import asyncio
 import logging
-import tmdbsimple as tmdb
+from typing import List, Optional
+
+import httpx
+
+from http_pool import get_client
+from ratelimit import AsyncTokenBucket
 
 log = logging.getLogger("tmdb")
 
+API_URL = "https://api.themoviedb.org/3"
+MAX_RETRIES = 3
+
+
 class TMDbClient:
-    def __init__(self, api_key: str):
-        tmdb.API_KEY = api_key
+    """
+    Async TMDb v3 client on the shared HTTP pool.
+
+    Lookup methods return None when the request failed (so callers can tell
+    an outage from "no match") and an empty result when TMDb has nothing.
+    All requests share one token bucket of `rate_per_second` and at most
+    `max_concurrency` of them are in flight at once.
+    """
+
+    def __init__(self, api_key: str, max_concurrency: int = 8, rate_per_second: float = 40):
+        self.api_key = api_key
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._bucket = AsyncTokenBucket(rate_per_second, burst=max(1, int(rate_per_second)))
+        self._in_flight = asyncio.Semaphore(self.max_concurrency)
         log.info("TMDb client initialized")
 
-    def search_movie(self, query: str):
+    def _auth(self) -> tuple[dict, dict]:
+        # v4 read-access tokens are JWTs sent as a bearer header; v3 keys go in the query
+        if self.api_key.count(".") == 2:
+            return {"Authorization": f"Bearer {self.api_key}"}, {}
+        return {}, {"api_key": self.api_key}
+
+    async def _get(self, path: str, **params) -> Optional[dict]:
+        headers, auth_params = self._auth()
+        params = {k: v for k, v in params.items() if v is not None}
+        params.update(auth_params)
+        url = f"{API_URL}{path}"
+        for attempt in range(MAX_RETRIES):
+            await self._bucket.acquire()
+            try:
+                async with self._in_flight:
+                    r = await get_client(url).get(url, params=params, headers=headers)
+            except httpx.HTTPError as e:
+                log.warning(f"TMDb request error for {path}: {e}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if r.status_code == 429:
+                try:
+                    delay = float(r.headers.get("Retry-After", "1"))
+                except ValueError:
+                    delay = 1.0
+                self._bucket.pause(delay)
+                continue
+            if r.status_code == 404:
+                return {}
+            if r.status_code >= 500:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            r.raise_for_status()
+            return r.json()
+        log.error(f"TMDb request for {path} gave up after {MAX_RETRIES} attempts")
+        return None
+
+    async def _results(self, path: str, **params) -> Optional[List[dict]]:
+        try:
+            data = await self._get(path, **params)
+        except Exception as e:
+            log.exception(f"TMDb error for {path}: {e}")
+            return None
+        return None if data is None else data.get("results", [])
+
+    async def search_movie(self, query: str, year: Optional[int] = None) -> Optional[List[dict]]:
+        return await self._results("/search/movie", query=query, year=year)
+
+    async def search_tv(self, query: str, year: Optional[int] = None) -> Optional[List[dict]]:
+        return await self._results("/search/tv", query=query, first_air_date_year=year)
+
+    async def find_by_external_id(self, external_id: str, source: str = "imdb_id") -> Optional[dict]:
+        """
+        Map an IMDb/TVDB id to TMDb. `source` is TMDb's external_source name
+        (imdb_id, tvdb_id, ...). Returns the raw {movie_results, tv_results, ...}.
+        """
+        try:
+            return await self._get(f"/find/{external_id}", external_source=source)
+        except Exception as e:
+            log.exception(f"TMDb find error for {source}={external_id}: {e}")
+            return None
+
+    async def movie_details(self, tmdb_id: int) -> Optional[dict]:
+        try:
+            return await self._get(f"/movie/{tmdb_id}", append_to_response="external_ids")
+        except Exception as e:
+            log.exception(f"TMDb movie details error for {tmdb_id}: {e}")
+            return None
+
+    async def tv_details(self, tmdb_id: int) -> Optional[dict]:
         try:
-            s = tmdb.Search()
-            result = s.movie(query=query) or {}
-            return result.get("results", [])
+            return await self._get(f"/tv/{tmdb_id}", append_to_response="external_ids")
         except Exception as e:
-            log.exception(f"TMDb search error: {e}")
-            return []
+            log.exception(f"TMDb TV details error for {tmdb_id}: {e}")
+            return None
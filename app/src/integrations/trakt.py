@@ -1,10 +1,166 @@
 import logging
 import asyncio
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
 from trakt import Trakt
 import httpx
 
+from http_pool import get_client
+from ratelimit import AsyncTokenBucket
+from watch_event import WatchEvent
+
 log = logging.getLogger("trakt")
 
+API_URL = "https://api.trakt.tv"
+
+# Trakt allows one authenticated POST per second
+POST_RATE_PER_SECOND = 1.0
+MAX_BATCH_RETRIES = 5
+
+
+def _trakt_time(dt) -> Optional[str]:
+    if isinstance(dt, datetime):
+        return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return None
+
+
+def _ids(imdb, tmdb, tvdb, trakt) -> Dict[str, object]:
+    ids = {}
+    if imdb:
+        ids["imdb"] = imdb
+    for name, val in (("tmdb", tmdb), ("tvdb", tvdb), ("trakt", trakt)):
+        if val:
+            ids[name] = int(val)
+    return ids
+
+
+def normalize_history_entry(row: dict) -> Optional[WatchEvent]:
+    """A /sync/history row as a watch event (same shape as Plex events, plus trakt ids)."""
+    kind = row.get("type")
+    try:
+        watched_at = datetime.fromisoformat(row["watched_at"].replace("Z", "+00:00"))
+    except (KeyError, AttributeError, ValueError):
+        watched_at = None
+    if kind == "movie":
+        movie = row.get("movie") or {}
+        ids = movie.get("ids") or {}
+        return WatchEvent(type="movie", title=movie.get("title"), year=movie.get("year"),
+                          watched_at=watched_at, history_id=row.get("id"),
+                          imdb_id=ids.get("imdb"), tmdb_id=ids.get("tmdb"),
+                          tvdb_id=ids.get("tvdb"), trakt_id=ids.get("trakt"))
+    if kind == "episode":
+        ep, show = row.get("episode") or {}, row.get("show") or {}
+        ids, show_ids = ep.get("ids") or {}, show.get("ids") or {}
+        return WatchEvent(type="episode", title=ep.get("title"), show_title=show.get("title"),
+                          year=show.get("year"), season=ep.get("season"), episode=ep.get("number"),
+                          watched_at=watched_at, history_id=row.get("id"),
+                          imdb_id=ids.get("imdb"), tmdb_id=ids.get("tmdb"),
+                          tvdb_id=ids.get("tvdb"), trakt_id=ids.get("trakt"),
+                          show_imdb_id=show_ids.get("imdb"), show_tmdb_id=show_ids.get("tmdb"),
+                          show_tvdb_id=show_ids.get("tvdb"), show_trakt_id=show_ids.get("trakt"))
+    return None
+
+
+def _match_key(ids: dict, title, year) -> Tuple:
+    """How Trakt tells posted objects apart: by ids, or by title/year without any."""
+    return tuple(sorted(ids.items())) or (title, year)
+
+
+def _show_key(item: WatchEvent) -> Tuple:
+    return _match_key(_ids(item.show_imdb_id, item.show_tmdb_id, item.show_tvdb_id, item.show_trakt_id),
+                      item.show_title, None)
+
+
+def build_history_payload(items: List[WatchEvent]) -> Tuple[dict, List[WatchEvent]]:
+    """
+    Turn watch events into a /sync/history body. Movies are matched by ids
+    (or title/year); episodes are grouped under their show by season/episode
+    number. Returns the body and the items it had to leave out (episodes
+    without a season or episode number).
+    """
+    movies = []
+    shows: Dict[Tuple, dict] = {}
+    skipped: List[WatchEvent] = []
+    for item in items:
+        watched_at = _trakt_time(item.watched_at)
+        if item.type == "movie":
+            movie = {"title": item.title, "year": item.year,
+                     "ids": _ids(item.imdb_id, item.tmdb_id, item.tvdb_id, item.trakt_id)}
+            if watched_at:
+                movie["watched_at"] = watched_at
+            movies.append(movie)
+        elif item.type == "episode":
+            if item.season is None or item.episode is None:
+                skipped.append(item)
+                continue
+            show_ids = _ids(item.show_imdb_id, item.show_tmdb_id, item.show_tvdb_id, item.show_trakt_id)
+            show = shows.setdefault(_show_key(item), {"title": item.show_title, "ids": show_ids, "seasons": {}})
+            episode = {"number": int(item.episode)}
+            if watched_at:
+                episode["watched_at"] = watched_at
+            show["seasons"].setdefault(int(item.season), []).append(episode)
+
+    payload = {}
+    if movies:
+        payload["movies"] = movies
+    if shows:
+        payload["shows"] = [
+            {"title": s["title"], "ids": s["ids"],
+             "seasons": [{"number": n, "episodes": eps} for n, eps in sorted(s["seasons"].items())]}
+            for s in shows.values()
+        ]
+    return payload, skipped
+
+
+def not_found_items(batch: List[WatchEvent], not_found: dict) -> List[WatchEvent]:
+    """
+    The items of `batch` behind a response's not_found movies and shows
+    (every play of a show Trakt could not match). Trakt echoes the objects
+    as posted, so they are matched the way build_history_payload keyed them.
+    """
+    movies = {_match_key(m.get("ids") or {}, m.get("title"), m.get("year"))
+              for m in not_found.get("movies") or []}
+    shows = {_match_key(s.get("ids") or {}, s.get("title"), None) for s in not_found.get("shows") or []}
+    if not (movies or shows):
+        return []
+    missing = []
+    for item in batch:
+        if item.type == "movie":
+            key = _match_key(_ids(item.imdb_id, item.tmdb_id, item.tvdb_id, item.trakt_id), item.title, item.year)
+            if key in movies:
+                missing.append(item)
+        elif item.type == "episode" and _show_key(item) in shows:
+            missing.append(item)
+    return missing
+
+
+@dataclass
+class HistoryPushResult:
+    delivered: List[WatchEvent] = field(default_factory=list)
+    added: Dict[str, int] = field(default_factory=dict)
+    not_found: Dict[str, int] = field(default_factory=dict)
+    skipped: int = 0
+    batches: int = 0
+    failed_batches: int = 0
+
+    def merge(self, batch: List[WatchEvent], response: dict,
+              skipped: List[WatchEvent] = ()) -> List[WatchEvent]:
+        """Count an accepted batch; returns its items Trakt took (not skipped, not not_found)."""
+        not_found = response.get("not_found") or {}
+        left_out = {id(i) for i in skipped} | {id(i) for i in not_found_items(batch, not_found)}
+        delivered = [i for i in batch if id(i) not in left_out]
+        self.delivered.extend(delivered)
+        self.skipped += len(skipped)
+        for kind, n in (response.get("added") or {}).items():
+            self.added[kind] = self.added.get(kind, 0) + int(n or 0)
+        for kind, missing in not_found.items():
+            if missing:
+                self.not_found[kind] = self.not_found.get(kind, 0) + len(missing)
+        return delivered
+
 class TraktClient:
     """
     Works with the modern trakt.py client.
@@ -16,6 +172,7 @@ class TraktClient:
         self.client_secret = client_secret
         self.access_token = access_token
         self.refresh_token = refresh_token
+        self._post_bucket = AsyncTokenBucket(POST_RATE_PER_SECOND)
 
         # Set client defaults
         Trakt.configuration.defaults.client(
@@ -59,17 +216,16 @@ class TraktClient:
         log.info("🔄 Refreshing Trakt OAuth token…")
         try:
             # Raw HTTP call required (Trakt API token endpoint)
-            async with httpx.AsyncClient(timeout=10) as client:
-                r = await client.post(
-                    "https://api.trakt.tv/oauth/token",
-                    json={
-                        "refresh_token": self.refresh_token,
-                        "client_id": self.client_id,
-                        "client_secret": self.client_secret,
-                        "redirect_uri": "urn:ietf:wg:oauth:2.0:oob",
-                        "grant_type": "refresh_token"
-                    }
-                )
+            r = await get_client(API_URL).post(
+                f"{API_URL}/oauth/token",
+                json={
+                    "refresh_token": self.refresh_token,
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "redirect_uri": "urn:ietf:wg:oauth:2.0:oob",
+                    "grant_type": "refresh_token"
+                }
+            )
 
             if r.status_code != 200:
                 log.error(f"❌ Trakt token refresh failed: {r.text}")
@@ -102,3 +258,133 @@ class TraktClient:
         except Exception as e:
             log.error(f"Trakt history fetch failed: {e}")
             return []
+
+    async def get_history(self, page_size: int = 1000) -> Optional[List[WatchEvent]]:
+        """
+        Full watched history (every play), normalized; None if a page could
+        not be fetched, so callers never diff against a partial snapshot.
+        """
+        url = f"{API_URL}/sync/history"
+        items: List[WatchEvent] = []
+        page, pages = 1, 1
+        while page <= pages:
+            for attempt in range(MAX_BATCH_RETRIES):
+                try:
+                    r = await get_client(url).get(url, params={"page": page, "limit": page_size},
+                                                  headers=self._headers())
+                except httpx.HTTPError as e:
+                    log.warning(f"Trakt history page {page} error ({e}); retry {attempt + 1}")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                if r.status_code == 429 or r.status_code >= 500:
+                    try:
+                        delay = float(r.headers.get("Retry-After", 2 ** attempt))
+                    except ValueError:
+                        delay = 2 ** attempt
+                    await asyncio.sleep(delay)
+                    continue
+                if r.status_code != 200:
+                    log.error(f"❌ Trakt history page {page} failed ({r.status_code})")
+                    return None
+                break
+            else:
+                log.error(f"❌ Trakt history page {page} gave up after retries")
+                return None
+            items.extend(i for i in map(normalize_history_entry, r.json()) if i)
+            pages = int(r.headers.get("X-Pagination-Page-Count", page))
+            page += 1
+        return items
+
+    #
+    # Watched history push (raw API; trakt.py has no batching/rate-limit hooks)
+    #
+    def _headers(self) -> dict:
+        return {
+            "Content-Type": "application/json",
+            "trakt-api-version": "2",
+            "trakt-api-key": self.client_id,
+            "Authorization": f"Bearer {self.access_token}",
+        }
+
+    def _apply_rate_limit_headers(self, r: httpx.Response) -> None:
+        """Pause all workers when Trakt reports an exhausted window."""
+        if r.status_code == 429:
+            try:
+                delay = float(r.headers.get("Retry-After", "1"))
+            except ValueError:
+                delay = 1.0
+            log.warning(f"⏳ Trakt rate limit hit; pausing {delay:.0f}s")
+            self._post_bucket.pause(delay)
+            return
+        raw = r.headers.get("X-Ratelimit")
+        if not raw:
+            return
+        try:
+            info = json.loads(raw)
+            if int(info.get("remaining", 1)) <= 0 and info.get("until"):
+                until = datetime.fromisoformat(info["until"].replace("Z", "+00:00"))
+                self._post_bucket.pause((until - datetime.now(timezone.utc)).total_seconds())
+        except (ValueError, TypeError):
+            pass
+
+    async def _post_history_batch(self, payload: dict) -> Optional[dict]:
+        if not payload:
+            return {}
+        refreshed = False
+        for attempt in range(MAX_BATCH_RETRIES):
+            await self._post_bucket.acquire()
+            try:
+                r = await get_client(API_URL).post(f"{API_URL}/sync/history", json=payload,
+                                                   headers=self._headers())
+            except httpx.HTTPError as e:
+                log.warning(f"Trakt history batch error ({e}); retry {attempt + 1}/{MAX_BATCH_RETRIES}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            self._apply_rate_limit_headers(r)
+            if r.status_code in (200, 201):
+                return r.json()
+            if r.status_code == 401 and not refreshed:
+                refreshed = True
+                if await self._refresh_token():
+                    continue
+            if r.status_code == 429:
+                continue
+            if r.status_code >= 500:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            log.error(f"❌ Trakt history batch rejected ({r.status_code}): {r.text[:200]}")
+            return None
+        log.error("❌ Trakt history batch gave up after retries")
+        return None
+
+    async def add_to_history(self, items: List[WatchEvent], batch_size: int = 100,
+                             concurrency: int = 2,
+                             on_delivered: Optional[Callable[[List[WatchEvent]], None]] = None
+                             ) -> HistoryPushResult:
+        """
+        Push watched items to /sync/history in batches of `batch_size`, with at
+        most `concurrency` batches in flight. Items in accepted batches are
+        returned as delivered (and passed to `on_delivered` as each batch
+        lands), except those the payload had to skip and those Trakt lists
+        as not_found; Trakt's per-batch added/not_found counts are summed.
+        """
+        result = HistoryPushResult()
+        batches = [items[i:i + batch_size] for i in range(0, len(items), max(1, batch_size))]
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def run(batch: List[WatchEvent]):
+            payload, skipped = build_history_payload(batch)
+            async with sem:
+                return batch, skipped, await self._post_history_batch(payload)
+
+        for coro in asyncio.as_completed([run(b) for b in batches]):
+            batch, skipped, response = await coro
+            result.batches += 1
+            if response is None:
+                result.failed_batches += 1
+            else:
+                delivered = result.merge(batch, response, skipped)
+                if on_delivered is not None and delivered:
+                    on_delivered(delivered)
+        return result
@@ -4,3 +4,44 @@ IMDB_RE = re.compile(r'(tt\d{7,8})')
 def extract_imdb_id_from_guid(guid: str):
     if not guid: return None
     m = IMDB_RE.search(guid); return m.group(1) if m else None
+
+# Legacy agent guids: com.plexapp.agents.<agent>://<id>[/season/episode][?lang=..]
+LEGACY_AGENTS = {"imdb": "imdb", "themoviedb": "tmdb", "thetvdb": "tvdb"}
+
+def parse_plex_guids(guids) -> dict:
+    """
+    External ids from Plex guid strings, as crosswalk columns:
+    ["imdb://tt0113277", "tmdb://949"] -> {"imdb": "tt0113277", "tmdb": "949"}.
+    Understands the new agents' Guid list, legacy agent guids and plex:// guids.
+    """
+    out = {}
+    for g in guids or ():
+        g = str(g)
+        scheme, _, rest = g.partition("://")
+        if not rest:
+            continue
+        if scheme == "plex":
+            out.setdefault("plex_guid", g)
+            continue
+        if scheme.startswith("com.plexapp.agents.") and "/" in rest.split("?", 1)[0]:
+            continue  # thetvdb://<show>/<season>/<episode>: the show's id, not this item's
+        agent = scheme.rsplit(".", 1)[-1] if scheme.startswith("com.plexapp.agents.") else scheme
+        col = LEGACY_AGENTS.get(agent, agent if agent in ("imdb", "tmdb", "tvdb") else None)
+        value = rest.split("?", 1)[0].split("/", 1)[0]
+        if col == "imdb":
+            value = extract_imdb_id_from_guid(value)
+        if col and value:
+            out.setdefault(col, value)
+    return out
+
+def canonical_id(item: dict):
+    """
+    Stable key for a normalized watch item. Plex items keep their ratingKey so
+    the key doesn't change once enrichment attaches external ids.
+    """
+    if item.get("guid") and str(item["guid"]).isdigit(): return f"plex:{item['guid']}"
+    for k in ("imdb_id", "tmdb_id", "tvdb_id"):
+        if item.get(k): return f"{k[:-3]}:{item[k]}"
+    imdb_id = extract_imdb_id_from_guid(str(item.get("guid") or ""))
+    if imdb_id: return f"imdb:{imdb_id}"
+    return f"plex:{item['guid']}" if item.get("guid") else None
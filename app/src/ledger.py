@@ -0,0 +1,88 @@
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+log = logging.getLogger("ledger")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deliveries (
+    destination  TEXT    NOT NULL,
+    item_id      TEXT    NOT NULL,
+    watched_at   INTEGER NOT NULL,
+    delivered_at INTEGER NOT NULL,
+    PRIMARY KEY (destination, item_id, watched_at)
+) WITHOUT ROWID;
+"""
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+_CHUNK = 500
+
+
+def _watched_ts(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    return 0
+
+
+class DeliveryLedger:
+    """
+    SQLite record of what has already been delivered to each destination,
+    keyed by (destination, canonical item id, watched_at).
+
+    `key_fn` maps a normalized item to its canonical id; items it cannot key
+    are always treated as undelivered.
+    """
+
+    def __init__(self, path: str, key_fn: Callable[[dict], Optional[str]]):
+        self.path = Path(path)
+        self.key_fn = key_fn
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def _keys(self, items: Iterable[dict]):
+        for item in items:
+            yield item, self.key_fn(item), _watched_ts(item.get("watched_at"))
+
+    def undelivered(self, destination: str, items: List[dict]) -> List[dict]:
+        """Return the subset of `items` not yet recorded for `destination`."""
+        keyed = list(self._keys(items))
+        ids = sorted({k for _, k, _ in keyed if k})
+        seen = set()
+        with self._lock:
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i:i + _CHUNK]
+                rows = self._db.execute(
+                    "SELECT item_id, watched_at FROM deliveries "
+                    f"WHERE destination = ? AND item_id IN ({','.join('?' * len(chunk))})",
+                    (destination, *chunk),
+                )
+                seen.update(rows)
+        return [item for item, k, ts in keyed if not k or (k, ts) not in seen]
+
+    def mark_delivered(self, destination: str, items: Iterable[dict]) -> int:
+        """Record confirmed deliveries; returns the number of rows written."""
+        now = int(time.time())
+        rows = [(destination, k, ts, now) for _, k, ts in self._keys(items) if k]
+        if not rows:
+            return 0
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO deliveries (destination, item_id, watched_at, delivered_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -1,19 +1,19 @@
 import asyncio
 import logging
+import os
+import sys
 from rich.console import Console
 
 from config_loader import load_config, generate_config_from_env
-
-# Integration clients
-from integrations.plex import PlexClient
-from integrations.trakt import TraktClient
-from integrations.letterboxd import LetterboxdClient
-from integrations.imdb import IMDbClient
-from integrations.thetvdb import TheTVDBClient
-from integrations.serializd import SerializdClient
-from integrations.musicboard import MusicboardClient
-from integrations.tmdb import TMDbClient
-
+import http_pool
+import metrics
+
+from integrations.registry import (
+    StartupReport, StartupTiming, Timer, critical_services, enabled_integrations, init_timeout,
+)
+from integrations.sync_engine import run_sync_cycle
+from profiles import ProfileSync
+from scheduler import SyncScheduler
 from sync_engine import SyncEngine
 
 console = Console()
@@ -21,87 +21,108 @@ log = logging.getLogger("watchweave")
 services = {}  # active clients
 
 
-async def initialize_services(config):
-    """Init enabled integrations and stash in the global `services` dict."""
-    # Plex
-    if config["plex"]["enabled"]:
-        services["plex"] = PlexClient(
-            config["plex"]["server_url"],
-            config["plex"]["token"],
-            config["plex"]["username"]
-        )
-        console.print("[green]✔ Plex enabled")
-
-    # Trakt
-    if config["trakt"]["enabled"]:
-        trakt = TraktClient(
-            client_id=config["trakt"]["client_id"],
-            client_secret=config["trakt"]["client_secret"],
-            access_token=config["trakt"]["access_token"],
-            refresh_token=config["trakt"]["refresh_token"]
-        )
-        await trakt.authenticate()
-        services["trakt"] = trakt
-        console.print("[green]✔ Trakt enabled")
-
-    # Letterboxd
-    if config["letterboxd"]["enabled"]:
-        services["letterboxd"] = LetterboxdClient(
-            config["letterboxd"]["username"],
-            config["letterboxd"]["password"]
-        )
-        console.print("[green]✔ Letterboxd enabled")
-
-    # IMDb
-    if config["imdb"]["enabled"]:
-        services["imdb"] = IMDbClient(config["imdb"]["csv_path"])
-        console.print("[green]✔ IMDb enabled")
-
-    # TheTVDB
-    if config["tvdb"]["enabled"]:
-        tvdb = TheTVDBClient(
-            api_key=config["tvdb"]["api_key"],
-            pin=config["tvdb"]["pin"]
-        )
-        await tvdb.authenticate()
-        services["tvdb"] = tvdb
-        console.print("[green]✔ TheTVDB enabled")
-
-    # Serializd
-    if config["serializd"]["enabled"]:
-        services["serializd"] = SerializdClient(config["serializd"]["api_key"])
-        console.print("[green]✔ Serializd enabled")
-
-    # Musicboard
-    if config["musicboard"]["enabled"]:
-        services["musicboard"] = MusicboardClient(
-            username=config["musicboard"]["username"],
-            api_key=config["musicboard"]["api_key"]
-        )
-        console.print("[green]✔ Musicboard enabled")
-
-    # TMDb
-    if config["tmdb"]["enabled"]:
-        services["tmdb"] = TMDbClient(api_key=config["tmdb"]["api_key"])
-        console.print("[green]✔ TMDb enabled")
-
-    console.print("[bold green]All enabled integrations initialized.\n")
-
-
-async def run_scheduler(config):
-    """Simple interval loop that triggers SyncEngine.sync_all()."""
-    interval = int(config["general"]["sync_interval_minutes"])
-    engine = SyncEngine(services, config)
-
-    console.print(f"[cyan]🔁 Sync interval: every {interval} minutes")
-    while True:
-        console.print("[yellow]▶ Running sync cycle…")
-        try:
-            await engine.sync_all()
-            console.print("[green]✓ Sync cycle finished")
-        except Exception as e:
-            log.exception(f"Sync cycle failed: {e}")
-        await asyncio.sleep(interval * 60)
+async def _start_service(spec, config, timing: StartupTiming):
+    # Imports and blocking constructors (Plex, Letterboxd login) run in threads
+    # so one slow upstream doesn't stall the others or the event loop
+    with Timer() as t:
+        cls = await asyncio.to_thread(spec.load)
+    timing.import_s = t.elapsed
+    with Timer() as t:
+        if spec.blocking:
+            client = await asyncio.to_thread(spec.build, cls, config[spec.name], config)
+        else:
+            client = spec.build(cls, config[spec.name], config)
+    timing.construct_s = t.elapsed
+    if spec.authenticate:
+        with Timer() as t:
+            await client.authenticate()
+        timing.auth_s = t.elapsed
+    return client
+
+
+async def _init_service(spec, config, report: StartupReport) -> None:
+    timing = StartupTiming(spec.name)
+    report.add(timing)
+    timeout = init_timeout(spec, config)
+    try:
+        client = await asyncio.wait_for(_start_service(spec, config, timing), timeout)
+    except asyncio.TimeoutError:
+        timing.error = f"timed out after {timeout:.0f}s"
+        log.error(f"{spec.label} initialization {timing.error}")
+        console.print(f"[red]✖ {spec.label} {timing.error}; continuing without it")
+        return
+    except Exception as e:
+        timing.error = str(e) or type(e).__name__
+        log.exception(f"{spec.label} failed to initialize: {e}")
+        console.print(f"[red]✖ {spec.label} failed to initialize")
+        return
+    services[spec.name] = client
+    console.print(f"[green]✔ {spec.label} enabled")
+
+
+async def initialize_services(config) -> asyncio.Task:
+    """
+    Init enabled integrations concurrently and stash them in the global
+    `services` dict. Integration modules are imported here, only for enabled
+    services. Returns once the critical services are up (or failed); the rest
+    keep initializing in the returned task and join `services` when ready.
+    """
+    report = StartupReport()
+    tasks = {spec.name: asyncio.create_task(_init_service(spec, config, report))
+             for spec in enabled_integrations(config)}
+    critical = [tasks[n] for n in critical_services(config) if n in tasks]
+    if critical:
+        await asyncio.wait(critical)
+        missing = [n for n in critical_services(config) if n in tasks and n not in services]
+        if missing:
+            console.print(f"[yellow]⚠ Critical services unavailable: {', '.join(missing)}")
+
+    async def finish():
+        await asyncio.gather(*tasks.values())
+        console.print("[bold green]All enabled integrations initialized.\n")
+        console.print("[dim]Startup timings:")
+        for line in report.lines():
+            console.print(f"[dim]  {line}")
+
+    return asyncio.create_task(finish())
+
+
+async def serve_http(config, on_play=None):
+    """Run the HTTP app (health, metrics, Tautulli webhook) with uvicorn on this event loop."""
+    # The app lives in the `src` package; make it importable from here
+    app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if app_root not in sys.path:
+        sys.path.insert(0, app_root)
+    import uvicorn
+    from src.tautulli_webhook import create_app
+
+    server_cfg = config.get("server", {})
+    port = int(server_cfg.get("port", 8089))
+    app = create_app(
+        registry=metrics.REGISTRY if config.get("metrics", {}).get("enabled", True) else None,
+        webhook=bool(config.get("webhook", {}).get("enabled")),
+        on_play=on_play,
+    )
+    server = uvicorn.Server(uvicorn.Config(
+        app, host=server_cfg.get("host", "0.0.0.0"), port=port,
+        log_level="warning", access_log=False,
+    ))
+    console.print(f"[cyan]🌐 HTTP server listening on :{port}")
+    try:
+        await server.serve()
+    except (Exception, SystemExit) as e:
+        # e.g. port already in use; syncing carries on without it
+        log.error(f"HTTP server stopped: {e!r}")
+
+
+async def run_scheduler(config, scheduler: SyncScheduler):
+    """Run syncs on play events, per-destination retry timers and periodic reconciliation."""
+    if scheduler.events:
+        console.print(f"[cyan]🔁 Syncing on play events (debounce {scheduler.debounce:.0f}s); "
+                      f"reconciling every {scheduler.reconcile_interval / 60:.0f} minutes")
+    else:
+        console.print(f"[cyan]🔁 Sync interval: every {scheduler.reconcile_interval / 60:.0f} minutes")
+    await scheduler.run()
 
 
 async def main():
@@ -115,8 +136,33 @@ async def main():
     )
 
     console.print("[bold blue]🚀 Starting WatchWeave...\n")
-    await initialize_services(cfg)
-    await run_scheduler(cfg)
+    http_pool.configure(cfg.get("http"))
+    init_rest = http = None
+    try:
+        # Tautulli play events drive syncs when the webhook is on; otherwise
+        # the reconciliation interval is the only trigger
+        events = bool(cfg.get("webhook", {}).get("enabled"))
+        multi_user = bool(cfg.get("profiles"))
+        if multi_user:
+            # One engine per Plex user; the Plex/Trakt reconcile is single-account only
+            engine, reconcile = ProfileSync(services, cfg), None
+        else:
+            engine = SyncEngine(services, cfg)
+            # Full Plex/Trakt history diff, only as the slow safety net in event mode
+            reconcile = (lambda: run_sync_cycle(cfg, services, engine.crosswalk, engine.ledger,
+                                                engine.retry_queue)) if events else None
+        scheduler = SyncScheduler(engine, cfg, events=events, reconcile=reconcile)
+        if events or cfg.get("metrics", {}).get("enabled", True):
+            http = asyncio.create_task(serve_http(cfg, on_play=scheduler.notify if events else None))
+        init_rest = await initialize_services(cfg)
+        if multi_user:
+            await engine.start()
+        await run_scheduler(cfg, scheduler)
+    finally:
+        for task in (init_rest, http):
+            if task is not None:
+                task.cancel()
+        await http_pool.aclose_all()
 
 
 if __name__ == "__main__":
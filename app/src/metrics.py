@@ -0,0 +1,223 @@
+import math
+import threading
+from bisect import bisect_left
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers a fast cache hit up to a long backfill cycle
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+LabelKey = Tuple[str, ...]
+
+
+def _fmt(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _labels(self, key: LabelKey, extra: str = "") -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = list(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{self._labels(key)} {_fmt(v)}"
+
+
+class Gauge(_Metric):
+    """Set directly, or bound to a callback that is read at scrape time."""
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelKey, float] = {}
+        self._functions: Dict[LabelKey, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def set_function(self, fn: Callable[[], float], **labels) -> None:
+        with self._lock:
+            self._functions[self._key(labels)] = fn
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = list(self._functions.items())
+        for key, fn in functions:
+            try:
+                values[key] = float(fn())
+            except Exception:
+                continue  # a broken callback must not break the scrape
+        for key, v in values.items():
+            yield f"{self.name}{self._labels(key)} {_fmt(v)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [bucket counts..., sum, count]
+        self._values: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        n = len(self.buckets)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (n + 2)
+            i = bisect_left(self.buckets, value)
+            if i < n:
+                row[i] += 1
+            row[n] += value
+            row[n + 1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> Iterator[str]:
+        n = len(self.buckets)
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        for key, row in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, row):
+                cumulative += c
+                le = f'le="{_fmt(bound)}"'
+                yield f"{self.name}_bucket{self._labels(key, le)} {cumulative}"
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{self._labels(key, le)} {_fmt(row[n + 1])}"
+            yield f"{self.name}_sum{self._labels(key)} {_fmt(row[n])}"
+            yield f"{self.name}_count{self._labels(key)} {_fmt(row[n + 1])}"
+
+
+class Registry:
+    """
+    Minimal Prometheus-style registry. Recording is a dict update under a
+    lock, so metrics can stay on in the hot path; `render()` produces the
+    text exposition format for a /metrics endpoint.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name} already registered as {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets or DEFAULT_BUCKETS)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CYCLE_SECONDS = REGISTRY.histogram(
+    "watchweave_cycle_seconds", "Duration of a full sync cycle")
+SYNC_RUNS = REGISTRY.counter(
+    "watchweave_sync_runs_total", "Sync runs by trigger (startup, webhook, reconcile, retry)", ("trigger",))
+SYNC_EVENTS = REGISTRY.counter(
+    "watchweave_sync_events_total", "Play events received; bursts are coalesced into one run")
+STAGE_SECONDS = REGISTRY.histogram(
+    "watchweave_stage_seconds", "Duration of a sync stage (fetch, enrich, diff, push)",
+    ("stage", "destination"))
+ITEMS = REGISTRY.counter(
+    "watchweave_items_total", "Items handled per destination by outcome (delivered, skipped, failed)",
+    ("destination", "outcome"))
+HTTP_SECONDS = REGISTRY.histogram(
+    "watchweave_http_request_seconds", "Upstream HTTP latency until response headers", ("host",))
+HTTP_RESPONSES = REGISTRY.counter(
+    "watchweave_http_responses_total", "Upstream HTTP responses by status code", ("host", "status"))
+QUEUE_DEPTH = REGISTRY.gauge(
+    "watchweave_queue_depth", "Items waiting in internal queues", ("queue",))
+CACHE_HITS = REGISTRY.gauge("watchweave_cache_hits", "Cache hits since start", ("cache",))
+CACHE_MISSES = REGISTRY.gauge("watchweave_cache_misses", "Cache misses since start", ("cache",))
+CACHE_HIT_RATIO = REGISTRY.gauge("watchweave_cache_hit_ratio", "Cache hits / lookups since start", ("cache",))
+
+
+def observe_http(host: str, status: int, seconds: float) -> None:
+    HTTP_SECONDS.observe(seconds, host=host)
+    HTTP_RESPONSES.inc(host=host, status=status)
+
+
+def watch_cache(name: str, cache) -> None:
+    """Expose a cache's hit/miss counters (anything with .hits and .misses)."""
+    CACHE_HITS.set_function(lambda: cache.hits, cache=name)
+    CACHE_MISSES.set_function(lambda: cache.misses, cache=name)
+    CACHE_HIT_RATIO.set_function(
+        lambda: cache.hits / (cache.hits + cache.misses) if cache.hits + cache.misses else 0.0,
+        cache=name)
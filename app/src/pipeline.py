@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Set
+
+_DONE = object()
+
+
+class _Raised:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iter_in_thread(make_iter: Callable[[], Iterable], maxsize: int = 4,
+                         poll: float = 0.5) -> AsyncIterator:
+    """
+    Items of a blocking iterator (e.g. paged HTTP fetches), produced in a
+    worker thread. The thread runs at most `maxsize` items ahead of the
+    consumer and then waits, so a slow consumer slows the source down
+    instead of buffering without bound. Errors raised by the iterator are
+    re-raised here; closing this generator stops the thread at its next item.
+    """
+    loop = asyncio.get_running_loop()
+    ready: asyncio.Queue = asyncio.Queue()
+    slots = threading.Semaphore(max(1, maxsize))
+    stop = threading.Event()
+
+    def hand_over(item) -> None:
+        try:
+            loop.call_soon_threadsafe(ready.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # the loop is gone
+
+    def produce() -> None:
+        try:
+            for item in make_iter():
+                while not slots.acquire(timeout=poll):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                hand_over(item)
+            hand_over(_DONE)
+        except BaseException as e:
+            hand_over(_Raised(e))
+
+    threading.Thread(target=produce, name="pipeline-source", daemon=True).start()
+    try:
+        while True:
+            item = await ready.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            slots.release()
+            yield item
+    finally:
+        stop.set()
+
+
+class Fanout:
+    """
+    Hands every batch to one bounded queue per sink. `put` waits for room in
+    all of them, so the slowest sink sets the pace of everything upstream.
+
+    Counts the batches each sink has finished (a sink is done with a batch
+    when it asks for the next one), so the producer can commit progress only
+    for batches every sink is through with. A sink that fails can be
+    detached so it no longer blocks the others, but its count stays where
+    it stopped: nothing past it is ever reported as completed.
+    """
+
+    def __init__(self, names: Iterable[str], maxsize: int = 4):
+        self.queues: Dict[str, asyncio.Queue] = {n: asyncio.Queue(max(1, maxsize)) for n in names}
+        self.done: Dict[str, int] = {n: 0 for n in self.queues}
+        self.detached: Set[str] = set()
+        self.sent = 0
+
+    async def put(self, batch: List) -> None:
+        for name, q in list(self.queues.items()):
+            if name not in self.detached:
+                await q.put(batch)
+        self.sent += 1
+
+    async def close(self) -> None:
+        for name, q in list(self.queues.items()):
+            if name not in self.detached:
+                await q.put(_DONE)
+
+    async def batches(self, name: str) -> AsyncIterator[List]:
+        """The batches for sink `name`, until the producer closes the fan-out."""
+        q = self.queues[name]
+        while True:
+            batch = await q.get()
+            if batch is _DONE:
+                return
+            yield batch
+            self.done[name] += 1
+
+    def detach(self, name: str) -> None:
+        """Stop feeding a failed sink, and unblock a producer waiting on its queue."""
+        if name in self.detached:
+            return
+        self.detached.add(name)
+        q = self.queues[name]
+        while not q.empty():
+            q.get_nowait()
+
+    @property
+    def completed(self) -> int:
+        """Batches every sink has finished; 0 without sinks, since nothing took them."""
+        return min(self.done.values(), default=0)
@@ -1,5 +1,9 @@
 import os, requests
-from typing import List, Dict
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import quote
+
+# Rating keys per bulk edit; keeps each PUT's query string well within Plex's URL limit
+BULK_EDIT_CHUNK = 500
 
 class PlexAPI:
     def __init__(self):
@@ -8,20 +12,89 @@ class PlexAPI:
         if not self.token:
             raise ValueError("PLEX_TOKEN missing")
         self.session = requests.Session()
-        self.session.headers.update({"X-Plex-Token": self.token})
+        # Without Accept, Plex answers in XML
+        self.session.headers.update({"X-Plex-Token": self.token, "Accept": "application/json"})
+        # Section/collection listings by path, reused until clear_cache() (once per sync cycle)
+        self._listings: Dict[str, List[Dict]] = {}
+        self.request_count = 0
 
     def _url(self, path: str) -> str:
         return f"{self.base}{path}"
 
-    def get_collections(self, library_key: str) -> List[Dict]:
-        r = self.session.get(self._url(f"/library/sections/{library_key}/collections"), timeout=30)
+    def _request(self, method: str, path: str, params: Optional[Dict] = None) -> requests.Response:
+        self.request_count += 1
+        r = self.session.request(method, self._url(path), params=params, timeout=30)
         r.raise_for_status()
-        if r.headers.get("Content-Type","").startswith("application/json"):
-            return r.json()
-        return []
+        return r
+
+    def _listing(self, path: str, key: str = "Metadata") -> List[Dict]:
+        if path not in self._listings:
+            r = self._request("GET", path)
+            if not r.headers.get("Content-Type", "").startswith("application/json"):
+                raise ValueError(f"Plex returned {r.headers.get('Content-Type') or 'no content type'} for {path}")
+            self._listings[path] = (r.json().get("MediaContainer") or {}).get(key) or []
+        return self._listings[path]
+
+    def clear_cache(self):
+        self._listings.clear()
+
+    def get_sections(self) -> List[Dict]:
+        return self._listing("/library/sections", "Directory")
+
+    def get_collections(self, library_key: str) -> List[Dict]:
+        return self._listing(f"/library/sections/{library_key}/collections")
+
+    def find_collection(self, library_key: str, collection: str) -> Optional[Dict]:
+        return next((c for c in self.get_collections(library_key) if c.get("title") == collection), None)
+
+    def collection_members(self, library_key: str, collection: str) -> Set[str]:
+        coll = self.find_collection(library_key, collection)
+        if coll is None:
+            return set()
+        return {str(m["ratingKey"]) for m in self._listing(f"/library/collections/{coll['ratingKey']}/children")}
+
+    def edit_collection(self, library_key: str, rating_keys: Iterable, collection: str,
+                        remove: bool = False, media_type: int = 1) -> int:
+        """Tag (or untag) many items with `collection` using Plex's multi-id edit; returns the PUTs made."""
+        keys = [str(k) for k in rating_keys]
+        # Removal takes a comma-separated tag list, so the name itself is quoted
+        tag = {"collection[].tag.tag-": quote(collection)} if remove else {"collection[0].tag.tag": collection}
+        puts = 0
+        for i in range(0, len(keys), BULK_EDIT_CHUNK):
+            params = {"type": media_type, "id": ",".join(keys[i:i + BULK_EDIT_CHUNK]), **tag}
+            self._request("PUT", f"/library/sections/{library_key}/all", params=params)
+            puts += 1
+        if puts:
+            # Re-read only what changed: the collection's members, or, if the
+            # section didn't list it yet (adding creates it), the listings too
+            section = f"/library/sections/{library_key}/collections"
+            coll = next((c for c in self._listings.get(section, ()) if c.get("title") == collection), None)
+            if coll is not None:
+                self._listings.pop(f"/library/collections/{coll['ratingKey']}/children", None)
+            else:
+                for path in [p for p in self._listings if p.startswith("/library/collections/") or p == section]:
+                    del self._listings[path]
+        return puts
 
     def add_collection_to_item(self, rating_key: str, collection: str):
         params = {"type": 1, "id": rating_key, "collection[0].tag.tag": collection}
-        r = self.session.put(self._url("/library/sections/all"), params=params, timeout=30)
-        r.raise_for_status()
+        self._request("PUT", "/library/sections/all", params=params)
         return True
+
+    def sync_collection(self, library_key: str, collection: str, rating_keys: Iterable,
+                        remove: bool = True, media_type: int = 1) -> Dict:
+        """
+        Make `collection` contain exactly `rating_keys`: reads the current
+        members once, then bulk-adds what is missing and (unless remove=False)
+        bulk-removes the rest.
+        """
+        target = {str(k) for k in rating_keys}
+        current = self.collection_members(library_key, collection)
+        adds = sorted(target - current)
+        removes = sorted(current - target) if remove else []
+        puts = self.edit_collection(library_key, adds, collection, media_type=media_type)
+        puts += self.edit_collection(library_key, removes, collection, remove=True, media_type=media_type)
+        if removes and not target:
+            # Plex deletes a collection once it is empty
+            self._listings.pop(f"/library/sections/{library_key}/collections", None)
+        return {"added": len(adds), "removed": len(removes), "unchanged": len(target & current), "requests": puts}
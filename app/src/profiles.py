@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import os
+import re
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from crosswalk import IdCrosswalk
+from integrations.registry import REGISTRY
+from metrics import CYCLE_SECONDS, watch_cache
+from pipeline import Fanout
+from sync_engine import DestinationResult, SyncEngine, open_metadata_cache, stream_plex_history
+
+log = logging.getLogger("profiles")
+
+# Built once and used by every profile; the rest are per-profile accounts
+SHARED_SERVICES = ("plex", "tmdb", "tvdb")
+# Never inherited from the top-level section: each profile brings its own
+_ACCOUNT_KEYS = ("username", "password", "access_token", "refresh_token", "session_path")
+
+
+def _slug(name) -> str:
+    return re.sub(r"[^a-z0-9_-]+", "-", str(name).strip().lower()).strip("-") or "profile"
+
+
+def profile_config(config: dict, profile: dict) -> dict:
+    """
+    The config as one profile sees it: its own state dir, sync direction and
+    destination accounts. App-level settings of a service section (Trakt
+    client id, batch sizes, ...) carry over from the top level.
+    """
+    general = dict(config.get("general", {}))
+    general["state_dir"] = os.path.join(general.get("state_dir", "/config/state"),
+                                        "profiles", _slug(profile["name"]))
+    if profile.get("sync_direction"):
+        general["sync_direction"] = profile["sync_direction"]
+    out = {**config, "general": general}
+    for name in REGISTRY:
+        if name in SHARED_SERVICES:
+            continue
+        base = {k: v for k, v in (config.get(name) or {}).items() if k not in _ACCOUNT_KEYS}
+        own = profile.get(name)
+        out[name] = {**base, **own, "enabled": True} if own else {**base, "enabled": False}
+    return out
+
+
+@dataclass
+class Profile:
+    name: str
+    account_id: str
+    config: dict
+    services: Dict[str, Any] = field(default_factory=dict)
+    engine: Optional[SyncEngine] = None
+
+
+class ProfileSync:
+    """
+    Multi-user mode: one SyncEngine per profile (a Plex account plus its own
+    destination accounts), with everything that doesn't depend on the user
+    shared.
+
+    Each cycle streams Plex history once, page by page from the oldest
+    profile watermark, and splits every page by `accountID`. Ids are
+    resolved and enriched once for all profiles (one crosswalk, one metadata
+    cache, the shared TMDb/TVDB clients and HTTP pools), then each profile's
+    share of the page goes into that profile's delivery pipeline. Profiles
+    run side by side, with at most `profile_concurrency` pushes in flight.
+    Ledgers, retry queues and watermarks stay per profile under
+    <state_dir>/profiles/<name>/.
+
+    Exposes the same sync_all/retry_destination/destinations surface as
+    SyncEngine, so SyncScheduler drives either.
+    """
+
+    def __init__(self, services: Dict[str, Any], config: dict):
+        self.svcs = services
+        self.cfg = config
+        general = config.get("general", {})
+        state_dir = general.get("state_dir", "/config/state")
+        self.crosswalk = IdCrosswalk(os.path.join(state_dir, "crosswalk.db"))
+        self.metadata_cache = open_metadata_cache(config)
+        watch_cache("metadata", self.metadata_cache)
+        self.max_concurrency = max(1, int(general.get("profile_concurrency", 2)))
+        self.history_page_size = int(config.get("plex", {}).get("history_page_size", 500))
+        self.profiles = [Profile(name=_slug(p["name"]), account_id=str(p["plex_account_id"]),
+                                 config=profile_config(config, p))
+                         for p in config.get("profiles") or []]
+        for p in self.profiles:
+            p.engine = SyncEngine(p.services, p.config, profile=p.name,
+                                  crosswalk=self.crosswalk, metadata_cache=self.metadata_cache)
+        log.info(f"👥 {len(self.profiles)} sync profiles, {self.max_concurrency} at a time")
+
+    @property
+    def destinations(self) -> List[str]:
+        out: List[str] = []
+        for p in self.profiles:
+            out += [d for d in p.engine.destinations if d not in out]
+        return out
+
+    async def _build(self, profile: Profile, name: str) -> None:
+        spec = REGISTRY[name]
+        section = profile.config[name]
+        try:
+            cls = await asyncio.to_thread(spec.load)
+            if spec.blocking:
+                client = await asyncio.to_thread(spec.build, cls, section, profile.config)
+            else:
+                client = spec.build(cls, section, profile.config)
+            if spec.authenticate:
+                await client.authenticate()
+        except Exception as e:
+            log.exception(f"❌ {spec.label} for profile {profile.name} failed to initialize: {e}")
+            return
+        profile.services[name] = client
+        log.info(f"✔ {spec.label} enabled for profile {profile.name}")
+
+    async def start(self) -> None:
+        """
+        Log in every profile's own destination accounts that aren't up yet,
+        concurrently. Runs again each cycle, so a login that failed is retried;
+        until it succeeds, that destination's items wait in the retry queue.
+        """
+        await asyncio.gather(*(self._build(p, name) for p in self.profiles for name in REGISTRY
+                               if name not in SHARED_SERVICES and p.config[name].get("enabled")
+                               and name not in p.services))
+
+    def _share(self) -> None:
+        # Shared clients may finish initializing after start(); pick them up each cycle
+        for p in self.profiles:
+            p.services.update({k: self.svcs[k] for k in SHARED_SERVICES if k in self.svcs})
+
+    async def _pool(self, jobs):
+        sem = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(job):
+            async with sem:
+                return await job
+
+        return await asyncio.gather(*map(run, jobs))
+
+    async def sync_all(self) -> Dict[str, DestinationResult]:
+        """One cycle for every profile; results are keyed "<profile>/<destination>"."""
+        plex = self.svcs.get("plex")
+        if plex is None or not self.profiles:
+            log.warning("Plex is not initialized; skipping.")
+            return {}
+        self._share()
+        await self.start()
+        with CYCLE_SECONDS.time():
+            queue_pages = self.profiles[0].engine.pipeline_queue_pages
+            # One queue per profile of ({profile: its new items}, page)
+            fanout = Fanout([p.name for p in self.profiles], queue_pages)
+            gate = asyncio.Semaphore(self.max_concurrency)
+
+            async def pages(p: Profile) -> AsyncIterator[Tuple[list, list]]:
+                # Every profile's watermark moves past the whole page, so an
+                # account with no new plays doesn't hold the next fetch back
+                async for work, page in fanout.batches(p.name):
+                    yield work[p.name], page
+
+            runs = []
+            for p in self.profiles:
+                run = asyncio.create_task(p.engine.deliver_pages(pages(p), gate))
+                # A profile that stopped reading (failed, or nothing to sync to) stops blocking the rest
+                run.add_done_callback(lambda t, name=p.name: fanout.detach(name))
+                runs.append(run)
+
+            marks = [p.engine.watermark.viewed_at for p in self.profiles]
+            since = None if None in marks else min(marks)
+            log.info("📥 Fetching watched history from Plex (all profiles)…")
+            fetched = new = 0
+            try:
+                async with aclosing(stream_plex_history(plex, since, self.history_page_size,
+                                                        queue_pages)) as history:
+                    async for page in history:
+                        fetched += len(page)
+                        by_account: Dict[str, list] = {}
+                        for i in page:
+                            by_account.setdefault(str(i.account_id), []).append(i)
+                        work = {p.name: p.engine.new_items(by_account.get(p.account_id, []))
+                                for p in self.profiles}
+                        todo = [i for items in work.values() for i in items]
+                        new += len(todo)
+                        await self.profiles[0].engine.resolve_and_enrich(todo)
+                        await fanout.put((work, page))
+            except asyncio.CancelledError:
+                for run in runs:
+                    run.cancel()
+                raise
+            except Exception as e:
+                log.exception(f"Plex history fetch failed: {e}")
+            await fanout.close()
+            log.info(f"✔ New Plex items fetched: {new} across {len(self.profiles)} profiles "
+                     f"({fetched - new} for other accounts or already synced)")
+
+            ended = await asyncio.gather(*runs, return_exceptions=True)
+        errors = [e for e in ended if isinstance(e, BaseException)]
+        if errors:
+            raise errors[0]
+        return {f"{p.name}/{dest}": r for p, results in zip(self.profiles, ended) for dest, r in results.items()}
+
+    async def retry_destination(self, dest: str) -> Optional[DestinationResult]:
+        """Due retries for `dest` across every profile, summed into one result."""
+        self._share()
+        results = [r for r in await self._pool(p.engine.retry_destination(dest) for p in self.profiles) if r]
+        if not results:
+            return None
+        total = DestinationResult(destination=dest)
+        for r in results:
+            total.attempted += r.attempted
+            total.succeeded += r.succeeded
+            total.failed += r.failed
+            total.skipped += r.skipped
+            total.duration = max(total.duration, r.duration)
+        return total
@@ -0,0 +1,79 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket for pacing requests to one upstream.
+
+    `rate` is tokens per second and `burst` the bucket size. `pause()` makes
+    every caller wait until the given delay has passed, which is how
+    Retry-After / exhausted rate-limit windows are honoured across all
+    in-flight workers rather than just the one that got the 429.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Block all acquirers for at least `seconds` from now."""
+        self._paused_until = max(self._paused_until, time.monotonic() + max(0.0, seconds))
+        # Start refilling from the end of the pause, not from now
+        self._tokens = 0.0
+        self._updated = self._paused_until
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class AdaptiveTokenBucket(AsyncTokenBucket):
+    """
+    Token bucket whose rate follows the upstream: halved (plus a pause) on a
+    throttle response, nudged down when responses slow past
+    `slow_latency`, and raised additively after each quick success, within
+    [min_rate, max_rate].
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float,
+                 slow_latency: float = 5.0, step: float = 0.05):
+        super().__init__(rate, burst=1)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.slow_latency = slow_latency
+        self.step = step
+
+    def on_throttled(self, retry_after: float | None = None) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.pause(retry_after if retry_after is not None else 1.0 / self.rate)
+
+    def on_success(self, latency: float) -> None:
+        if latency > self.slow_latency:
+            self.rate = max(self.min_rate, self.rate * 0.8)
+        else:
+            self.rate = min(self.max_rate, self.rate + self.step)
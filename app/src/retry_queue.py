@@ -0,0 +1,171 @@
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+log = logging.getLogger("retry")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending_writes (
+    destination     TEXT    NOT NULL,
+    item_id         TEXT    NOT NULL,
+    watched_at      INTEGER NOT NULL,
+    payload         TEXT    NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL    NOT NULL,
+    status          TEXT    NOT NULL DEFAULT 'pending',
+    last_error      TEXT,
+    created_at      REAL    NOT NULL,
+    PRIMARY KEY (destination, item_id, watched_at)
+);
+CREATE INDEX IF NOT EXISTS pending_writes_due
+    ON pending_writes (destination, status, next_attempt_at);
+"""
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if hasattr(value, "as_dict"):  # WatchEvent
+        return value.as_dict()
+    raise TypeError(f"not JSON serializable: {type(value).__name__}")
+
+
+def _decode(obj: dict):
+    if len(obj) == 1 and "$dt" in obj:
+        return datetime.fromisoformat(obj["$dt"])
+    return obj
+
+
+def _watched_ts(value) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        return int(value)
+    return 0
+
+
+class RetryQueue:
+    """
+    Durable queue of destination writes that have not been confirmed yet.
+
+    Items are added *before* a push is attempted (write-ahead), removed once
+    the destination confirms them, and otherwise rescheduled with exponential
+    backoff plus jitter. After `max_attempts` failures an item is
+    dead-lettered (kept, but no longer retried). Anything still pending when
+    the process dies is picked up again by `due()` after a restart.
+    """
+
+    def __init__(self, path: str, key_fn: Callable[[dict], Optional[str]],
+                 max_attempts: int = 8, base_delay: float = 60.0, max_delay: float = 6 * 3600,
+                 item_factory: Optional[Callable[[dict], Any]] = None):
+        self.path = Path(path)
+        self.key_fn = key_fn
+        # Rebuilds stored payloads (e.g. WatchEvent.from_dict); plain dicts by default
+        self.item_factory = item_factory
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+        for dest, counts in self.counts().items():
+            if counts.get("pending"):
+                log.info("Resuming %d pending %s writes from the retry queue", counts["pending"], dest)
+            if counts.get("dead"):
+                log.warning("%d %s writes are dead-lettered (gave up after %d attempts)",
+                            counts["dead"], dest, self.max_attempts)
+
+    def _rows(self, items: Iterable[dict]):
+        for item in items:
+            k = self.key_fn(item)
+            if k:
+                yield k, _watched_ts(item.get("watched_at")), item
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def add(self, destination: str, items: Iterable[dict]) -> None:
+        """Write-ahead: record items about to be pushed, due immediately."""
+        now = time.time()
+        rows = [(destination, k, ts, json.dumps(item, default=_encode), now, now)
+                for k, ts, item in self._rows(items)]
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO pending_writes "
+                "(destination, item_id, watched_at, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def due(self, destination: str, limit: int = 5000) -> List[Any]:
+        """Pending items whose retry time has come, oldest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT payload FROM pending_writes "
+                "WHERE destination = ? AND status = 'pending' AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (destination, time.time(), limit),
+            ).fetchall()
+        items = [json.loads(p, object_hook=_decode) for (p,) in rows]
+        return list(map(self.item_factory, items)) if self.item_factory else items
+
+    def resolve(self, destination: str, items: Iterable[dict]) -> None:
+        """Drop items the destination confirmed."""
+        keys = [(destination, k, ts) for k, ts, _ in self._rows(items)]
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM pending_writes WHERE destination = ? AND item_id = ? AND watched_at = ?",
+                keys,
+            )
+
+    def fail(self, destination: str, items: Iterable[dict], error: Optional[str] = None) -> int:
+        """Reschedule failed items with backoff; returns how many were dead-lettered."""
+        now = time.time()
+        dead = 0
+        with self._lock, self._db:
+            for k, ts, item in self._rows(items):
+                row = self._db.execute(
+                    "SELECT attempts FROM pending_writes "
+                    "WHERE destination = ? AND item_id = ? AND watched_at = ?",
+                    (destination, k, ts),
+                ).fetchone()
+                attempts = (row[0] if row else 0) + 1
+                status = "dead" if attempts >= self.max_attempts else "pending"
+                dead += status == "dead"
+                self._db.execute(
+                    "INSERT INTO pending_writes "
+                    "(destination, item_id, watched_at, payload, attempts, next_attempt_at, "
+                    " status, last_error, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (destination, item_id, watched_at) DO UPDATE SET "
+                    "attempts = excluded.attempts, next_attempt_at = excluded.next_attempt_at, "
+                    "status = excluded.status, last_error = excluded.last_error",
+                    (destination, k, ts, json.dumps(item, default=_encode), attempts,
+                     now + self._backoff(attempts), status, error, now),
+                )
+        if dead:
+            log.warning("Dead-lettered %d %s writes after %d attempts", dead, destination, self.max_attempts)
+        return dead
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT destination, status, COUNT(*) FROM pending_writes GROUP BY destination, status"
+            ).fetchall()
+        out: Dict[str, Dict[str, int]] = {}
+        for dest, status, n in rows:
+            out.setdefault(dest, {})[status] = n
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, Optional
+
+from metrics import SYNC_EVENTS, SYNC_RUNS
+
+log = logging.getLogger("scheduler")
+
+
+class SyncScheduler:
+    """
+    Decides when the SyncEngine runs, instead of a fixed sleep between cycles.
+
+    - Play events (Tautulli webhooks) call `notify()`. A burst is coalesced:
+      one incremental sync runs once no event arrived for `debounce` seconds,
+      or `max_delay` seconds after the first one at the latest. That sync
+      only fetches Plex rows past the watermark, i.e. the plays that caused
+      the events.
+    - A reconciliation pass runs every `reconcile_interval` (plus jitter) as
+      a safety net for missed events; with no event source it is the only
+      trigger, so it falls back to `general.sync_interval_minutes`.
+    - Each destination drains its own due retries on its own interval, with
+      jitter so destinations don't all hit the network at once.
+
+    Runs never overlap: the engine's watermark, ledger and retry queue are
+    only touched by one run at a time.
+    """
+
+    def __init__(self, engine, config: dict, events: bool = False,
+                 reconcile: Optional[Callable[[], Awaitable[object]]] = None):
+        self.engine = engine
+        self.cfg = config
+        self.events = events
+        self.reconcile = reconcile
+        sched = config.get("scheduler", {})
+        self.debounce = float(sched.get("debounce_seconds", 10))
+        self.max_delay = max(self.debounce, float(sched.get("max_delay_seconds", 60)))
+        self.jitter = float(sched.get("jitter_seconds", 30))
+        interval = float(config.get("general", {}).get("sync_interval_minutes", 30))
+        if events:
+            interval = float(sched.get("reconcile_interval_minutes", 360))
+        self.reconcile_interval = interval * 60
+        self.retry_interval = float(sched.get("retry_interval_minutes", 10)) * 60
+
+        self._lock = asyncio.Lock()
+        self._event = asyncio.Event()
+        self._pending = 0
+        self._first_at: Optional[float] = None
+        self._last_at = 0.0
+
+    def notify(self, payload: Optional[dict] = None) -> None:
+        """Record a play event; call from the event loop (e.g. the webhook handler)."""
+        now = asyncio.get_running_loop().time()
+        SYNC_EVENTS.inc()
+        self._pending += 1
+        self._last_at = now
+        if self._first_at is None:
+            self._first_at = now
+        self._event.set()
+
+    def _retry_interval(self, dest: str) -> float:
+        minutes = self.cfg.get(dest, {}).get("retry_interval_minutes")
+        return float(minutes) * 60 if minutes is not None else self.retry_interval
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds + random.uniform(0, self.jitter)
+
+    async def _run(self, trigger: str, fn: Callable[[], Awaitable[object]]):
+        async with self._lock:
+            SYNC_RUNS.inc(trigger=trigger)
+            try:
+                return await fn()
+            except Exception as e:
+                log.exception(f"❌ {trigger} sync failed: {e}")
+                return None
+
+    async def _sync(self, trigger: str) -> None:
+        log.info(f"▶ Running sync cycle ({trigger})…")
+        results = await self._run(trigger, self.engine.sync_all) or {}
+        failed = [d for d, r in results.items() if r.error or r.failed]
+        if failed:
+            log.warning(f"✓ Sync cycle finished (issues: {', '.join(failed)})")
+        else:
+            log.info("✓ Sync cycle finished")
+
+    async def _events_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._event.wait()
+            # Wait for the burst to go quiet, but never past max_delay
+            while True:
+                deadline = min(self._last_at + self.debounce, self._first_at + self.max_delay)
+                if loop.time() >= deadline:
+                    break
+                await asyncio.sleep(deadline - loop.time())
+            n, self._pending, self._first_at = self._pending, 0, None
+            self._event.clear()
+            log.info(f"⚡ {n} play event(s) coalesced into one sync")
+            await self._sync("webhook")
+
+    async def _reconcile_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._jittered(self.reconcile_interval))
+            await self._sync("reconcile")
+            if self.reconcile is not None:
+                await self._run("reconcile", self.reconcile)
+
+    async def _retry_loop(self, dest: str) -> None:
+        interval = self._retry_interval(dest)
+        while True:
+            await asyncio.sleep(self._jittered(interval))
+            r = await self._run("retry", lambda: self.engine.retry_destination(dest))
+            if r is not None:
+                log.info(f"🔁 {dest} retries: {r.succeeded}/{r.attempted} delivered, {r.failed} failed")
+
+    async def run(self) -> None:
+        """Initial sync, then event, reconciliation and retry loops until cancelled."""
+        await self._sync("startup")
+        loops = [self._events_loop(), self._reconcile_loop()]
+        loops += [self._retry_loop(d) for d in self.engine.destinations]
+        await asyncio.gather(*loops)
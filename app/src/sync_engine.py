@@ -1,9 +1,107 @@
 import asyncio
 import logging
-from typing import Dict, Any, List
+import os
+import time
+from collections import deque
+from contextlib import aclosing
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Any, Iterator, List, Optional, Tuple
+
+from cache import TTLCache
+from crosswalk import IdCrosswalk
+from enrichment import Enricher
+from integrations.utils import canonical_id
+from ledger import DeliveryLedger
+from metrics import CYCLE_SECONDS, ITEMS, QUEUE_DEPTH, STAGE_SECONDS, watch_cache
+from pipeline import Fanout, iter_in_thread
+from retry_queue import RetryQueue
+from watch_event import WatchEvent
+from watermark import PlexWatermark
 
 log = logging.getLogger("sync")
 
+
+def _epoch(dt) -> Optional[int]:
+    return int(dt.timestamp()) if isinstance(dt, datetime) else None
+
+
+def _item_key(item: WatchEvent):
+    return canonical_id(item), _epoch(item.watched_at)
+
+
+@dataclass
+class DestinationResult:
+    """Outcome of pushing one cycle's items to one destination."""
+    destination: str
+    attempted: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0          # already delivered in an earlier cycle
+    queued: int = 0           # held in the retry queue until the destination is up
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+# A pusher gets the undelivered items plus a callback it calls with each
+# group of items the destination confirmed, so progress is recorded even if
+# the destination later fails or times out.
+Recorder = Callable[[List[WatchEvent]], None]
+Pusher = Callable[[List[WatchEvent], Recorder], Awaitable[None]]
+
+
+def open_metadata_cache(config: Dict[str, Any]) -> TTLCache:
+    """The TMDb/TVDB lookup cache in <state_dir>/metadata_cache.db."""
+    enrich_cfg = config.get("enrichment", {})
+    state_dir = config.get("general", {}).get("state_dir", "/config/state")
+    return TTLCache(
+        os.path.join(state_dir, "metadata_cache.db"),
+        ttl=float(enrich_cfg.get("cache_ttl_hours", 168)) * 3600,
+        negative_ttl=float(enrich_cfg.get("negative_cache_ttl_hours", 24)) * 3600,
+    )
+
+
+def iter_plex_pages(plex, since: Optional[int], page_size: int = 500) -> Iterator[List[WatchEvent]]:
+    """
+    Plex history rows viewed at or after `since` (epoch seconds), or the whole
+    history when `since` is None, oldest first, one normalized page at a
+    time; meant for a worker thread, so plexapi objects never outlive their page.
+    """
+    if since is None:
+        log.info(f"No Plex watermark yet; backfilling history ({page_size} rows/page)")
+        mindate = None
+    else:
+        # Plex's filter is strictly-after; step back a second so rows already
+        # seen at the mark itself are dropped by new_items()
+        mindate = datetime.fromtimestamp(since - 1)
+    for page in plex.iter_history_pages(page_size, mindate=mindate):
+        yield list(map(WatchEvent.from_plex, page))
+
+
+async def stream_plex_history(plex, since: Optional[int], page_size: int = 500,
+                              maxsize: int = 4) -> AsyncIterator[List[WatchEvent]]:
+    """
+    The pages of iter_plex_pages, fetched in a worker thread at most
+    `maxsize` pages ahead, without rows an earlier page already returned.
+    """
+    seen_ids = set()
+    async with aclosing(iter_in_thread(lambda: iter_plex_pages(plex, since, page_size), maxsize)) as pages:
+        while True:
+            waited = time.perf_counter()
+            page = await anext(pages, None)
+            STAGE_SECONDS.observe(time.perf_counter() - waited, stage="fetch")
+            if page is None:
+                return
+            # Offset paging can return a row twice if plays land mid-fetch
+            page = [i for i in page if i.history_id is None or i.history_id not in seen_ids]
+            seen_ids.update(i.history_id for i in page)
+            yield page
+
+
+async def _one_batch(items: List[WatchEvent]) -> AsyncIterator[List[WatchEvent]]:
+    yield items
+
+
 class SyncEngine:
     """
     Central place to orchestrate sync flows between Plex and other services.
@@ -11,9 +109,11 @@ class SyncEngine:
     and provides clear TODOs for enrichment/matching.
     """
 
-    def __init__(self, services: Dict[str, Any], config: Dict[str, Any]):
+    def __init__(self, services: Dict[str, Any], config: Dict[str, Any], profile: Optional[str] = None,
+                 crosswalk: Optional[IdCrosswalk] = None, metadata_cache: Optional[TTLCache] = None):
         self.svcs = services
         self.cfg = config
+        self.profile = profile
         self.direction_spec = (self.cfg.get("general", {})
                                     .get("sync_direction", "plex->trakt,letterboxd,imdb"))
 
@@ -24,89 +124,349 @@ class SyncEngine:
         if len(parts) > 1:
             self.destinations = [d.strip().lower() for d in parts[1].split(",") if d.strip()]
 
-        log.info(f"🔁 Sync direction: {self.source} -> {', '.join(self.destinations)}")
+        log.info(f"🔁 Sync direction{f' ({profile})' if profile else ''}: "
+                 f"{self.source} -> {', '.join(self.destinations)}")
+
+        state_dir = self.cfg.get("general", {}).get("state_dir", "/config/state")
+        self.watermark = PlexWatermark(os.path.join(state_dir, "plex_watermark.json"))
+        self.history_page_size = int(self.cfg.get("plex", {}).get("history_page_size", 500))
+        # Pages buffered between pipeline stages (see _sync_from_plex)
+        self.pipeline_queue_pages = max(1, int(self.cfg.get("general", {}).get("pipeline_queue_pages", 4)))
+        self.ledger = DeliveryLedger(os.path.join(state_dir, "ledger.db"), canonical_id)
+        # Profiles share one crosswalk and metadata cache (see profiles.py)
+        self.crosswalk = crosswalk or IdCrosswalk(os.path.join(state_dir, "crosswalk.db"))
+
+        retry_cfg = self.cfg.get("retry", {})
+        self.retry_queue = RetryQueue(
+            os.path.join(state_dir, "retry_queue.db"),
+            canonical_id,
+            max_attempts=int(retry_cfg.get("max_attempts", 8)),
+            base_delay=float(retry_cfg.get("base_delay_seconds", 60)),
+            max_delay=float(retry_cfg.get("max_delay_seconds", 6 * 3600)),
+            item_factory=WatchEvent.from_dict,
+        )
 
-    async def sync_all(self):
+        # What each destination can take at all; anything else is neither
+        # pushed nor queued for retry.
+        self.accepts: Dict[str, Callable[[WatchEvent], bool]] = {
+            "trakt": lambda i: i.type in ("movie", "episode"),
+            "letterboxd": lambda i: i.type == "movie" and bool(i.title),
+            "imdb": lambda i: False,  # IMDb is a read-only (CSV export) source for now
+        }
+
+        enrich_cfg = self.cfg.get("enrichment", {})
+        self.metadata_cache = metadata_cache or open_metadata_cache(self.cfg)
+        self.enricher = Enricher(self.svcs, self.metadata_cache,
+                                 max_concurrency=int(enrich_cfg.get("max_concurrency", 8)))
+        # Kept across pushes so its adaptive pace carries over from page to page
+        self._diary_queue = None
+
+        if metadata_cache is None:
+            watch_cache("metadata", self.metadata_cache)
+        prefix = f"retry:{profile}:" if profile else "retry:"
+        for dest in self.destinations:
+            QUEUE_DEPTH.set_function(
+                lambda d=dest: self.retry_queue.counts().get(d, {}).get("pending", 0), queue=f"{prefix}{dest}")
+
+    async def sync_all(self) -> Dict[str, DestinationResult]:
         """
         Dispatch sync according to config.general.sync_direction.
         Currently supports source=plex. Extend as needed.
+        Returns a result per destination that was run.
         """
         if self.source == "plex":
-            await self._sync_from_plex()
-        else:
-            log.warning(f"Unsupported sync source: {self.source} (TODO)")
+            with CYCLE_SECONDS.time():
+                return await self._sync_from_plex()
+        log.warning(f"Unsupported sync source: {self.source} (TODO)")
+        return {}
 
-    async def _sync_from_plex(self):
+    async def _sync_from_plex(self) -> Dict[str, DestinationResult]:
         if "plex" not in self.svcs:
             log.warning("Plex is not initialized; skipping.")
-            return
+            return {}
+        return await self.deliver_pages(self._new_pages())
 
+    async def _new_pages(self) -> AsyncIterator[Tuple[List[WatchEvent], List[WatchEvent]]]:
+        """Each Plex history page past the watermark, as (its new items, resolved and enriched, the page)."""
         log.info("📥 Fetching watched history from Plex…")
-        plex_items = await self._get_plex_watched()
-        log.info(f"✔ Plex items fetched: {len(plex_items)}")
+        fetched = new = 0
+        try:
+            async with aclosing(stream_plex_history(self.svcs["plex"], self.watermark.viewed_at,
+                                                    self.history_page_size, self.pipeline_queue_pages)) as pages:
+                async for page in pages:
+                    fetched += len(page)
+                    items = self.new_items(page)
+                    new += len(items)
+                    yield await self.resolve_and_enrich(items), page
+        except Exception as e:
+            log.exception(f"Plex history fetch failed: {e}")
+        log.info(f"✔ New Plex items fetched: {new} ({fetched - new} already synced)")
+
+    async def deliver_pages(self, pages: AsyncIterator[Tuple[List[WatchEvent], List[WatchEvent]]],
+                            gate: Optional[asyncio.Semaphore] = None) -> Dict[str, DestinationResult]:
+        """
+        Push each (items, page) from `pages` to every destination as it
+        arrives, and move the watermark past a page's rows once every
+        destination is through with its items. `gate`, when given, is held
+        around each push (ProfileSync shares one across profiles).
+        """
+        # A staged pipeline, one Plex history page at a time:
+        #   fetch (worker thread) -> filter/dedupe -> resolve + enrich -> one sink per destination
+        # joined by queues of `pipeline_queue_pages` pages. A slow destination
+        # fills its queue and stalls everything upstream, so memory stays flat
+        # however long the history is, and the first page reaches the
+        # destinations while the rest is still being fetched.
+        targets = self._targets()
+        if not targets:
+            log.warning("No destination to sync to; leaving the Plex watermark where it is.")
+            return {}
+        fanout = Fanout(targets, self.pipeline_queue_pages)
+
+        def sink_ended(task: asyncio.Task, dest: str) -> None:
+            # A sink that died (e.g. a ledger error) stops blocking the others;
+            # its batch count stays put, so the watermark stops moving with it
+            if task.cancelled() or task.exception() is not None:
+                fanout.detach(dest)
+
+        def gated(push: Optional[Pusher]) -> Optional[Pusher]:
+            if push is None or gate is None:
+                return push
+
+            async def run(items: List[WatchEvent], record: Recorder) -> None:
+                async with gate:
+                    await push(items, record)
+            return run
 
-        # Optional future: enrich with TMDb/TVDB metadata
-        # plex_items = await self._enrich_items(plex_items)
+        sinks = []
+        for dest, push in targets.items():
+            queue = f"pipeline:{self.profile}:{dest}" if self.profile else f"pipeline:{dest}"
+            QUEUE_DEPTH.set_function(lambda q=fanout.queues[dest]: q.qsize(), queue=queue)
+            sink = asyncio.create_task(self._run_destination(dest, gated(push), fanout.batches(dest)))
+            sink.add_done_callback(lambda t, d=dest: sink_ended(t, d))
+            sinks.append(sink)
 
+        # Pages handed to the sinks, oldest first, until every sink is through with them
+        handed: Deque[List[WatchEvent]] = deque()
+        committed = 0
+
+        def commit() -> None:
+            nonlocal committed
+            done = []
+            while committed < fanout.completed:
+                done += handed.popleft()
+                committed += 1
+            if done:
+                # A page a sink got through is either delivered or written to the
+                # retry queue (before its push started), so a failed or timed-out
+                # destination loses nothing; a sink that could not do even that
+                # raised, and its count holds the watermark back
+                self._commit_watermark(done)
+
+        try:
+            async with aclosing(pages):
+                async for items, page in pages:
+                    await fanout.put(items)
+                    handed.append(page)
+                    commit()
+        except asyncio.CancelledError:
+            for sink in sinks:
+                sink.cancel()
+            raise
+        await fanout.close()
+
+        # Every sink finishes before the cycle ends; the watermark only covers
+        # what all of them got through, then the first sink error is raised
+        ended = await asyncio.gather(*sinks, return_exceptions=True)
+        commit()
+        errors = [e for e in ended if isinstance(e, BaseException)]
+        if errors:
+            raise errors[0]
+        results = {r.destination: r for r in ended}
+        for r in results.values():
+            self._log_result(r)
+        return results
+
+    def new_items(self, items: List[WatchEvent]) -> List[WatchEvent]:
+        """The items past this engine's Plex watermark."""
+        return [i for i in items
+                if self.watermark.is_new(_epoch(i.watched_at), i.history_id)]
+
+    async def retry_destination(self, dest: str) -> Optional[DestinationResult]:
+        """
+        Push `dest`'s retry-queue items that are due, without fetching from
+        Plex. Returns None when the destination has nothing due.
+        """
+        push = self._pushers().get(dest)
+        if push is None or dest not in self.svcs or not self.retry_queue.due(dest, limit=1):
+            return None
+        return await self._run_destination(dest, push, _one_batch([]))
+
+    def _pushers(self) -> Dict[str, Pusher]:
+        return {
+            "trakt": self._push_to_trakt,
+            "letterboxd": self._push_to_letterboxd,
+            "imdb": self._push_to_imdb,
+        }
+
+    def _targets(self) -> Dict[str, Optional[Pusher]]:
+        """
+        The configured destinations this cycle feeds, with their pushers. An
+        enabled destination whose client isn't up yet (still starting, or
+        failed to start) maps to None: its items go to the retry queue and
+        are pushed once it is.
+        """
+        pushers = self._pushers()
+        targets = {}
         for dest in self.destinations:
-            if dest == "trakt" and "trakt" in self.svcs:
-                await self._push_to_trakt(plex_items)
-            elif dest == "letterboxd" and "letterboxd" in self.svcs:
-                await self._push_to_letterboxd(plex_items)
-            elif dest == "imdb" and "imdb" in self.svcs:
-                await self._push_to_imdb(plex_items)
-            else:
+            push = pushers.get(dest)
+            if push is None or not (dest in self.svcs or self.cfg.get(dest, {}).get("enabled")):
                 log.info(f"Skipping destination '{dest}' (not enabled or unsupported yet).")
+                continue
+            if dest not in self.svcs:
+                log.warning(f"⏳ {dest} is not initialized yet; queueing its items for retry")
+                push = None
+            targets[dest] = push
+        return targets
+
+    @staticmethod
+    def _log_result(r: DestinationResult) -> None:
+        log.info(f"✔ {r.destination}: {r.succeeded}/{r.attempted} delivered, {r.failed} failed, "
+                 f"{r.skipped} already delivered, {r.queued} queued ({r.duration:.1f}s)"
+                 + (f" — {r.error}" if r.error else ""))
+
+    def _destination_timeout(self, dest: str) -> float:
+        default = self.cfg.get("general", {}).get("destination_timeout_seconds", 900)
+        return float(self.cfg.get(dest, {}).get("timeout_seconds", default))
 
-    async def _get_plex_watched(self) -> List[dict]:
+    async def _run_destination(self, dest: str, push: Optional[Pusher],
+                               batches: AsyncIterator[List[WatchEvent]]) -> DestinationResult:
         """
-        Convert Plex history objects into a normalized list of dicts:
-        {title, year, type, watched_at, guid}
+        Push each batch to `dest` as it arrives; due retries go out with the
+        first one. The timeout budgets time spent pushing, not waiting for
+        batches. After a failure or timeout, the rest of the batches go
+        straight to the retry queue, as does everything when `push` is None.
         """
-        items = []
+        result = DestinationResult(destination=dest)
+        started = time.monotonic()
+        budget = self._destination_timeout(dest)
+        due = self.retry_queue.due(dest) if push is not None else []
+        async for items in batches:
+            budget -= await self._push_batch(dest, push, items, due, result, budget)
+            due = []
+        if due:
+            # Nothing new this cycle; the retries still go out
+            await self._push_batch(dest, push, [], due, result, budget)
+        if push is None and result.queued:
+            result.error = f"not initialized; {result.queued} queued for retry"
+        result.duration = time.monotonic() - started
+        ITEMS.inc(result.succeeded, destination=dest, outcome="delivered")
+        ITEMS.inc(result.skipped, destination=dest, outcome="skipped")
+        ITEMS.inc(result.failed, destination=dest, outcome="failed")
+        return result
+
+    async def _push_batch(self, dest: str, push: Optional[Pusher], items: List[WatchEvent], due: List[WatchEvent],
+                          result: DestinationResult, budget: float) -> float:
+        """Push one batch (plus `due` retries) into `result`; returns the seconds spent pushing."""
+        delivered_keys = set()
+        pending: List[WatchEvent] = []
+        spent = 0.0
+
+        def record(delivered: List[WatchEvent]) -> None:
+            self.ledger.mark_delivered(dest, delivered)
+            self.retry_queue.resolve(dest, delivered)
+            delivered_keys.update(map(id, delivered))
+            result.succeeded += len(delivered)
+
         try:
-            # Plex API is sync; run in thread
-            history = await asyncio.to_thread(self.svcs["plex"].get_watched)
-
-            for entry in history:
-                media = entry.ratingKey if hasattr(entry, "ratingKey") else None
-                title = getattr(entry, "title", None) or getattr(entry, "grandparentTitle", None)
-                year = getattr(entry, "year", None)
-                watched_at = getattr(entry, "viewedAt", None)
-                media_type = getattr(entry, "type", None)
-
-                items.append({
-                    "title": title,
-                    "year": year,
-                    "type": media_type,
-                    "watched_at": watched_at,
-                    "guid": media
-                })
+            diff_started = time.perf_counter()
+            accepted = [i for i in items if self.accepts.get(dest, bool)(i)]
+            # Only push what this destination has not already confirmed, plus
+            # earlier failures whose backoff has expired
+            new = self.ledger.undelivered(dest, accepted)
+            result.skipped += len(accepted) - len(new)
+            # Write-ahead, so a crash mid-push leaves these to be resumed
+            self.retry_queue.add(dest, new)
+            if push is None:
+                result.queued += len(new)
+                return spent
+            pending = new
+            if due:
+                still_due = self.ledger.undelivered(dest, due)
+                if len(still_due) < len(due):
+                    keep = {_item_key(i) for i in still_due}
+                    self.retry_queue.resolve(dest, [i for i in due if _item_key(i) not in keep])
+                queued = {_item_key(i) for i in new}
+                pending = new + [i for i in still_due if _item_key(i) not in queued]
+            STAGE_SECONDS.observe(time.perf_counter() - diff_started, stage="diff", destination=dest)
+            result.attempted += len(pending)
+            if pending and result.error is None:
+                push_started = time.monotonic()
+                try:
+                    if budget <= 0:
+                        raise asyncio.TimeoutError
+                    with STAGE_SECONDS.time(stage="push", destination=dest):
+                        await asyncio.wait_for(push(pending, record), budget)
+                finally:
+                    spent = time.monotonic() - push_started
+        except asyncio.TimeoutError:
+            result.error = f"timed out after {self._destination_timeout(dest):.0f}s"
+            log.error(f"❌ {dest} push {result.error}")
         except Exception as e:
-            log.exception(f"Plex history fetch failed: {e}")
+            result.error = str(e) or type(e).__name__
+            log.exception(f"❌ {dest} push failed: {e}")
 
-        return items
+        failed = [i for i in pending if id(i) not in delivered_keys]
+        if failed:
+            self.retry_queue.fail(dest, failed, result.error or "not confirmed by destination")
+        result.failed += len(failed)
+        return spent
+
+    def _resolve_ids(self, items: List[WatchEvent]) -> None:
+        self.svcs["plex"].resolve_ids(items, self.crosswalk)
+
+    def _commit_watermark(self, items: List[WatchEvent]) -> None:
+        """Advance and persist the Plex watermark once a cycle has handled `items`."""
+        for i in items:
+            self.watermark.advance(_epoch(i.watched_at), i.history_id)
+        self.watermark.save()
 
-    async def _push_to_trakt(self, items: List[dict]):
+    async def _push_to_trakt(self, items: List[WatchEvent], record: Recorder) -> None:
         log.info("📤 Sync → Trakt (watched history)")
-        try:
-            # TODO: dedup, transform to Trakt's expected payload, call endpoints.
-            # Placeholder: ensure token is valid and log what would be sent.
-            watched = await self._sample(items, 5)
-            log.info(f"Would push {len(items)} items to Trakt (showing first {len(watched)}): {watched}")
-        except Exception as e:
-            log.exception(f"Trakt push failed: {e}")
+        trakt_cfg = self.cfg.get("trakt", {})
+        result = await self.svcs["trakt"].add_to_history(
+            items,
+            batch_size=int(trakt_cfg.get("batch_size", 100)),
+            concurrency=int(trakt_cfg.get("max_concurrency", 2)),
+            on_delivered=record,
+        )
+        log.info(f"Trakt history: {result.batches} batches ({result.failed_batches} failed), "
+                 f"added={result.added}, not_found={result.not_found}, skipped={result.skipped}")
 
-    async def _push_to_letterboxd(self, items: List[dict]):
+    async def _push_to_letterboxd(self, items: List[WatchEvent], record: Recorder) -> None:
         log.info("📤 Sync → Letterboxd (diary/logs)")
-        try:
-            films = [i for i in items if (i.get("type") == "movie" and i.get("title"))]
-            sample = await self._sample(films, 5)
-            log.info(f"Would push {len(films)} films to Letterboxd (first {len(sample)}): {sample}")
-        except Exception as e:
-            log.exception(f"Letterboxd push failed: {e}")
+        from integrations.letterboxd import DiaryPostQueue
+
+        lb = self.svcs["letterboxd"]
+        if not lb.enabled:
+            log.info("Letterboxd login not established — skipping Letterboxd sync.")
+            return
+        films = [i for i in items if i.type == "movie" and i.title]
+        if not films:
+            return
+
+        if self._diary_queue is None:
+            lb_cfg = self.cfg.get("letterboxd", {})
+            self._diary_queue = DiaryPostQueue(
+                lb,
+                workers=int(lb_cfg.get("max_concurrency", 2)),
+                rate_per_second=float(lb_cfg.get("rate_per_second", 0.5)),
+            )
+        # Dry runs post nothing, so nothing is recorded as delivered
+        stats = await self._diary_queue.run(films, on_posted=None if lb.dry_run else record)
+        log.info(f"Letterboxd diary: {stats.posted} posted, {stats.failed} failed, "
+                 f"{stats.throttled} throttled responses")
 
-    async def _push_to_imdb(self, items: List[dict]):
+    async def _push_to_imdb(self, items: List[WatchEvent], record: Recorder) -> None:
         log.info("📤 Sync → IMDb (CSV-based import is read-only; push TBD)")
         try:
             # IMDb official export is CSV → read-only source typically.
@@ -115,17 +475,41 @@ class SyncEngine:
         except Exception as e:
             log.exception(f"IMDb push failed: {e}")
 
-    async def _enrich_items(self, items: List[dict]) -> List[dict]:
+    async def resolve_and_enrich(self, items: List[WatchEvent]) -> List[WatchEvent]:
+        """Attach the ids the crosswalk knows, then look up the rest (see enrich_items)."""
+        if not items:
+            return items
+        try:
+            await asyncio.to_thread(self._resolve_ids, items)
+        except Exception as e:
+            log.exception(f"ID crosswalk lookup failed: {e}")
+        with STAGE_SECONDS.time(stage="enrich"):
+            return await self.enrich_items(items)
+
+    async def enrich_items(self, items: List[WatchEvent]) -> List[WatchEvent]:
         """
-        (Optional) Enrich with TMDb/TVDB lookups if enabled.
+        Attach TMDb/TVDB ids when those services are enabled (cached; see Enricher).
         """
-        # Example idea:
-        # if "tmdb" in self.svcs:
-        #     for item in items:
-        #         # call TMDb to attach ids/posters
-        #         pass
+        if "tmdb" not in self.svcs and "tvdb" not in self.svcs:
+            return items
+        try:
+            items = await self.enricher.enrich(items)
+        except Exception as e:
+            log.exception(f"Enrichment failed: {e}")
+            return items
+        # Remember what enrichment found so the next cycle resolves it locally
+        entries = []
+        for i in items:
+            if i.type == "movie" and i.tmdb_id:
+                entries.append(("movie", {"plex": i.guid, "tmdb": i.tmdb_id}))
+            elif i.type == "episode" and i.show_key and i.show_tvdb_id:
+                entries.append(("show", {"plex": i.show_key, "tvdb": i.show_tvdb_id}))
+        try:
+            await asyncio.to_thread(self.crosswalk.record_many, entries)
+        except Exception as e:
+            log.warning(f"Could not record enrichment ids in the crosswalk: {e}")
         return items
 
     @staticmethod
-    async def _sample(items: List[dict], n: int) -> List[dict]:
+    async def _sample(items: List[WatchEvent], n: int) -> List[WatchEvent]:
         return items[:n] if len(items) > n else items
@@ -1,9 +1,10 @@
 import os
 from typing import Dict, List
 from .trakt_client import TraktClient
-from .imdb_import import load_imdb_csv
+from .plex_api import PlexAPI
+from .imdb_import import iter_imdb_csv, load_imdb_csv
 from .letterboxd_csv import DiaryRow
-from .utils import ensure_csv, lb_uri
+from .utils import lb_uri, write_rows
 
 def sync_imdb_watchlist_to_trakt(imdb_csv_path: str) -> Dict:
     items = load_imdb_csv(imdb_csv_path)
@@ -15,16 +16,12 @@ def sync_imdb_watchlist_to_trakt(imdb_csv_path: str) -> Dict:
     return {"ok": True, "added": len(imdb_ids), "trakt": res}
 
 def export_imdb_to_letterboxd_csv(imdb_csv_path: str, out_csv_path: str) -> Dict:
-    ensure_csv(out_csv_path)
-    items = load_imdb_csv(imdb_csv_path)
-    written = 0
     from datetime import datetime
     today = datetime.utcnow().strftime("%Y-%m-%d")
-    for it in items:
-        row = DiaryRow(Date=today, Name=it.title, Year=it.year, Letterboxd_URI=lb_uri(it.imdb_id, None), Rating=None, Rewatch="")
-        from .utils import append_row
-        append_row(out_csv_path, row)
-        written += 1
+    rows = (DiaryRow(Date=today, Name=it.title, Year=it.year, Letterboxd_URI=lb_uri(it.imdb_id, None), Rating=None, Rewatch="")
+            for it in iter_imdb_csv(imdb_csv_path, fields=("imdb_id", "title", "year")))
+    # Full export: written to a temp file and swapped in, so the output is never half-written
+    written = write_rows(out_csv_path, rows, atomic=True)
     return {"ok": True, "written": written, "out": out_csv_path}
 
 def sync_plex_collections_to_trakt_lists(mapping: Dict[str,str], imdb_ids_by_collection: Dict[str, List[str]]) -> Dict:
@@ -39,3 +36,10 @@ def sync_plex_collections_to_trakt_lists(mapping: Dict[str,str], imdb_ids_by_col
         res = t.add_movies_to_list(slug=slug, imdb_ids=ids)
         results[coll] = {"added": len(ids), "trakt": res}
     return {"ok": True, "results": results}
+
+def sync_lists_to_plex_collections(library_key: str, rating_keys_by_collection: Dict[str, List[str]], remove: bool = True) -> Dict:
+    plex = PlexAPI()
+    # One listing of the section's collections serves every collection below
+    # that already exists; only creating one makes it list them again
+    results = {c: plex.sync_collection(library_key, c, keys, remove=remove) for c, keys in rating_keys_by_collection.items()}
+    return {"ok": True, "results": results, "requests": plex.request_count}
@@ -1,31 +1,52 @@
-from flask import Blueprint, request, jsonify, abort
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Callable
+
+from fastapi import APIRouter, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+
 from .config import get_settings
-from .utils import (append_row, recently_logged, lb_rating_from_10,
-                    lb_uri, iso_to_ymd)
+from .diary_queue import DiaryIngestQueue
+from .utils import lb_rating_from_10, lb_uri, iso_to_ymd
 from .letterboxd_csv import DiaryRow
 
-bp = Blueprint("tautulli", __name__)
+router = APIRouter()
 settings = get_settings()
 
-@bp.post("/webhook/tautulli")
-def receive():
+def _skip(reason: str) -> dict:
+    return {"ok": True, "skipped": reason}
+
+@router.post("/webhook/tautulli")
+async def receive(request: Request):
     # Optional shared secret header
     secret = settings.webhook_secret
     if secret and request.headers.get("X-Webhook-Secret") != secret:
-        abort(401)
+        raise HTTPException(status_code=401)
 
-    payload = request.get_json(silent=True) or {}
+    try:
+        payload = await request.json()
+    except Exception:
+        payload = None
+    if not isinstance(payload, dict):
+        payload = {}
     event = (payload.get("event") or "").lower()
     media_type = (payload.get("media_type") or "").lower()
 
     if event != "playback_stopped":
-        return jsonify({"ok": True, "skipped": "not playback_stopped"}), 200
-    if media_type not in ("movie", "video"):
-        return jsonify({"ok": True, "skipped": "not a movie"}), 200
+        return _skip("not playback_stopped")
 
-    percent = float(payload.get("percent_complete") or payload.get("progress") or 0)
+    try:
+        percent = float(payload.get("percent_complete") or payload.get("progress") or 0)
+    except (TypeError, ValueError):
+        percent = 0.0
     if percent < settings.min_percent:
-        return jsonify({"ok": True, "skipped": f"percent {percent} < {settings.min_percent}"}), 200
+        return _skip(f"percent {percent} < {settings.min_percent}")
+
+    # Any finished play (episodes too) triggers a sync; only movies go to the diary
+    if request.app.state.on_play is not None:
+        request.app.state.on_play(payload)
+    if media_type not in ("movie", "video"):
+        return _skip("not a movie")
 
     title = payload.get("title") or payload.get("full_title") or "Unknown"
     year = payload.get("year")
@@ -38,33 +59,64 @@ def receive():
     except Exception:
         rating10 = None
 
-    rating = lb_rating_from_10(rating10)
-    uri = lb_uri(imdb_id, tmdb_id)
-    date_ymd = iso_to_ymd(payload.get("stopped"))
-
-    # Dedup
-    if recently_logged(settings.csv_path, title, year, settings.dedupe_days):
-        return jsonify({"ok": True, "skipped": "dedupe window"}), 200
-
-    # Rewatch detection: if the same title+year appears earlier in CSV
-    rewatch = ""
-    try:
-        with open(settings.csv_path, encoding="utf-8") as f:
-            import csv
-            for row in csv.DictReader(f):
-                if row.get("Name") == title and (row.get("Year") or "") == (str(year) if year else ""):
-                    rewatch = "Yes"; break
-    except FileNotFoundError:
-        pass
-
+    # Dedupe and rewatch detection happen in the writer, against the diary
+    # and the rest of the batch
     row = DiaryRow(
-        Date=date_ymd,
+        Date=iso_to_ymd(payload.get("stopped")),
         Name=title,
         Year=int(year) if str(year).isdigit() else None,
-        Letterboxd_URI=uri,
-        Rating=rating,
-        Rewatch=rewatch,
+        Letterboxd_URI=lb_uri(imdb_id, tmdb_id),
+        Rating=lb_rating_from_10(rating10),
     )
-    append_row(settings.csv_path, row)
+    if not request.app.state.ingest.offer(row):
+        return JSONResponse({"ok": False, "error": "queue full"}, status_code=503,
+                            headers={"Retry-After": "1"})
+    return JSONResponse({"ok": True, "queued": row.as_csv_row()}, status_code=202)
+
+def create_app(ingest: DiaryIngestQueue | None = None, registry=None, webhook: bool = True,
+               on_play: Callable[[dict], None] | None = None) -> FastAPI:
+    """
+    HTTP app: /health, plus the Tautulli webhook when `webhook` is set (one
+    writer task drains `ingest` into the diary CSV) and /metrics when a
+    metrics `registry` is passed in. `on_play` is called with the payload of
+    every finished play, e.g. to trigger a sync.
+    """
+    if webhook:
+        ingest = ingest or DiaryIngestQueue(
+            settings.csv_path, settings.dedupe_days,
+            maxsize=settings.queue_size, batch_size=settings.batch_size,
+            flush_interval=settings.flush_interval,
+        )
+    else:
+        ingest = None
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        writer = asyncio.create_task(ingest.run()) if ingest else None
+        try:
+            yield
+        finally:
+            if writer:
+                await ingest.drain()
+                writer.cancel()
+
+    app = FastAPI(title="WatchWeave", lifespan=lifespan)
+    app.state.ingest = ingest
+    app.state.on_play = on_play
+    if ingest:
+        app.include_router(router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "queue_depth": ingest.depth if ingest else 0}
+
+    if registry is not None:
+        if ingest:
+            registry.gauge("watchweave_queue_depth", "Items waiting in internal queues",
+                           ("queue",)).set_function(lambda: ingest.depth, queue="webhook")
+
+        @app.get("/metrics")
+        async def metrics():
+            return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
-    return jsonify({"ok": True, "logged": row.as_csv_row()}), 200
+    return app
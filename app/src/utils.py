@@ -1,7 +1,10 @@
-import os, csv
+import os, csv, stat, tempfile
+from contextlib import ExitStack
 from datetime import datetime, timedelta
+from typing import Iterable
 from dateutil import parser as dtparse
 from .letterboxd_csv import HEADERS, DiaryRow
+from .diary_index import get_index
 
 def ensure_csv(path: str) -> None:
     os.makedirs(os.path.dirname(path), exist_ok=True)
@@ -9,25 +12,95 @@ def ensure_csv(path: str) -> None:
         with open(path, "w", newline="", encoding="utf-8") as f:
             csv.DictWriter(f, fieldnames=HEADERS).writeheader()
 
+class DiaryWriter:
+    """
+    Bulk diary CSV writer: one open, buffered rows, one fsync on close.
+
+        with DiaryWriter(path) as w:
+            w.write_all(rows)
+
+    By default rows are appended (header written if the file is new) and the
+    diary index is updated in place. With `atomic=True` the whole file is
+    replaced: rows go to a temp file in the same directory that is renamed
+    over `path` only if the block succeeds, so readers never see a partial
+    export.
+    """
+
+    def __init__(self, path: str, atomic: bool = False):
+        self.path = path
+        self.atomic = atomic
+        self.count = 0
+        self._stack = ExitStack()
+        self._tmp = None
+
+    def _open(self, path: str, mode: str):
+        try:
+            return open(path, mode, newline="", encoding="utf-8")
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            return open(path, mode, newline="", encoding="utf-8")
+
+    def __enter__(self) -> "DiaryWriter":
+        if self.atomic:
+            d = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(d, exist_ok=True)
+            fd, self._tmp = tempfile.mkstemp(prefix=".diary-", suffix=".csv", dir=d)
+            self._f = os.fdopen(fd, "w", newline="", encoding="utf-8")
+            self._written = None
+        else:
+            self._written = self._stack.enter_context(get_index(self.path).appending())
+            self._f = self._open(self.path, "a")
+        self._w = csv.DictWriter(self._f, fieldnames=HEADERS)
+        if self.atomic or self._f.tell() == 0:
+            self._w.writeheader()
+        return self
+
+    def write(self, row: DiaryRow | dict) -> None:
+        csv_row = row.as_csv_row() if isinstance(row, DiaryRow) else row
+        self._w.writerow(csv_row)
+        self.count += 1
+        if self._written is not None:
+            self._written.append(csv_row)
+
+    def write_all(self, rows: Iterable[DiaryRow | dict]) -> int:
+        for row in rows:
+            self.write(row)
+        return self.count
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if exc_type is None:
+                self._f.flush()
+                os.fsync(self._f.fileno())
+            self._f.close()
+            if self.atomic:
+                if exc_type is None:
+                    # mkstemp creates 0600; keep the export readable like the file it replaces
+                    try:
+                        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+                    except FileNotFoundError:
+                        mode = 0o644
+                    os.chmod(self._tmp, mode)
+                    os.replace(self._tmp, self.path)
+                    get_index(self.path).invalidate()
+                else:
+                    os.unlink(self._tmp)
+        finally:
+            self._stack.close()
+        return False
+
+def write_rows(path: str, rows: Iterable[DiaryRow | dict], atomic: bool = False) -> int:
+    """Write many diary rows in one go; returns how many were written."""
+    with DiaryWriter(path, atomic=atomic) as w:
+        return w.write_all(rows)
+
 def append_row(path: str, row: DiaryRow) -> None:
-    ensure_csv(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        csv.DictWriter(f, fieldnames=HEADERS).writerow(row.as_csv_row())
+    with DiaryWriter(path) as w:
+        w.write(row)
 
 def recently_logged(path: str, title: str, year: str | int | None, dedupe_days: int) -> bool:
-    if not os.path.exists(path):
-        return False
     cutoff = datetime.utcnow() - timedelta(days=dedupe_days)
-    with open(path, newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            if row.get("Name") == title and (row.get("Year") or "") == (str(year) if year else ""):
-                try:
-                    d = dtparse.parse(row.get("Date")).replace(tzinfo=None)
-                    if d >= cutoff:
-                        return True
-                except Exception:
-                    pass
-    return False
+    return get_index(path).logged_since(title, year, cutoff)
 
 def lb_rating_from_10(r10: float | None) -> str | None:
     if r10 is None:
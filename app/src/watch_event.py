@@ -0,0 +1,96 @@
+from dataclasses import asdict, dataclass, fields
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+
+@dataclass(slots=True)
+class WatchEvent:
+    """
+    One play, normalized from any source (Plex history, Trakt history, the
+    retry queue). Slotted, so 100k of them cost a fraction of the per-play
+    dicts they replace, and hot loops use plain attribute access.
+
+    `guid` is the Plex ratingKey and `show_key` the show's ratingKey; the
+    *_id fields are canonical external ids, show_*_id the episode's show.
+
+    Also answers the dict-style `get`/`[]` the older code paths (and tests)
+    use, so an event and a plain dict can be passed interchangeably.
+    """
+    type: Optional[str] = None
+    title: Optional[str] = None
+    year: Optional[int] = None
+    watched_at: Optional[datetime] = None
+    history_id: Any = None
+    guid: Any = None
+    plex_guid: Optional[str] = None
+    show_key: Any = None
+    show_title: Optional[str] = None
+    season: Optional[int] = None
+    episode: Optional[int] = None
+    account_id: Any = None
+    rating: Optional[float] = None
+    imdb_id: Optional[str] = None
+    tmdb_id: Optional[int] = None
+    tvdb_id: Optional[int] = None
+    trakt_id: Optional[int] = None
+    show_imdb_id: Optional[str] = None
+    show_tmdb_id: Optional[int] = None
+    show_tvdb_id: Optional[int] = None
+    show_trakt_id: Optional[int] = None
+
+    @classmethod
+    def from_plex(cls, entry) -> "WatchEvent":
+        """
+        From a plexapi history row. Reads the instance dict directly: getattr
+        on a plexapi object can trigger a lazy reload (a server round trip)
+        for attributes that happen to be None, e.g. an episode's year.
+        """
+        d = getattr(entry, "__dict__", None)
+        get = d.get if d is not None else (lambda k: getattr(entry, k, None))
+        return cls(
+            type=get("type"),
+            title=get("title") or get("grandparentTitle"),
+            year=get("year"),
+            watched_at=get("viewedAt"),
+            history_id=get("historyKey"),
+            guid=get("ratingKey"),
+            plex_guid=get("guid"),
+            show_key=get("grandparentRatingKey"),
+            show_title=get("grandparentTitle"),
+            season=get("parentIndex"),
+            episode=get("index"),
+            account_id=get("accountID"),
+            rating=get("userRating"),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WatchEvent":
+        """From a dict item; unknown keys are dropped."""
+        return cls(**{k: v for k, v in data.items() if k in FIELDS})
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The fields that are set, as a plain dict (e.g. for JSON)."""
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+    # Dict-style access
+    def get(self, key: str, default=None):
+        if key not in FIELDS:
+            return default
+        value = getattr(self, key)
+        return default if value is None else value
+
+    def __getitem__(self, key: str):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key: str, value) -> None:
+        if key not in FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key: str) -> bool:
+        return key in FIELDS and getattr(self, key) is not None
+
+
+FIELDS = frozenset(f.name for f in fields(WatchEvent))
@@ -0,0 +1,68 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional, Set
+
+log = logging.getLogger("sync")
+
+
+class PlexWatermark:
+    """
+    Persisted high-water mark for Plex history.
+
+    Stores the newest `viewedAt` (epoch seconds) that has been processed plus
+    the history row ids seen at exactly that second, so the next fetch can ask
+    Plex for rows at/after the mark and drop the ones already handled.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.viewed_at: Optional[int] = None
+        self.seen_ids: Set[str] = set()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f) or {}
+            self.viewed_at = data.get("viewed_at")
+            self.seen_ids = set(data.get("seen_ids") or [])
+            log.info("Plex history watermark loaded: viewedAt=%s", self.viewed_at)
+        except Exception as e:
+            log.error("Failed to read Plex watermark %s (%s); doing a full fetch.", self.path, e)
+            self.viewed_at = None
+            self.seen_ids = set()
+
+    @property
+    def is_empty(self) -> bool:
+        return self.viewed_at is None
+
+    def is_new(self, viewed_at: Optional[int], history_id: Optional[str]) -> bool:
+        if self.viewed_at is None or viewed_at is None:
+            return True
+        if viewed_at != self.viewed_at:
+            return viewed_at > self.viewed_at
+        return history_id is None or history_id not in self.seen_ids
+
+    def advance(self, viewed_at: Optional[int], history_id: Optional[str]) -> None:
+        if viewed_at is None:
+            return
+        if self.viewed_at is None or viewed_at > self.viewed_at:
+            self.viewed_at = viewed_at
+            self.seen_ids = set()
+        if viewed_at == self.viewed_at and history_id is not None:
+            self.seen_ids.add(history_id)
+
+    def save(self) -> None:
+        """Atomically write the mark (temp file + rename)."""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with tmp.open("w", encoding="utf-8") as f:
+                json.dump({"viewed_at": self.viewed_at, "seen_ids": sorted(self.seen_ids)}, f)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            log.error("Failed to write Plex watermark %s: %s", self.path, e)
@@ -0,0 +1,9 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Engine modules import from app/src, the webhook side from the app/ package
+for _p in (ROOT / "app" / "src", ROOT / "app"):
+    if str(_p) not in sys.path:
+        sys.path.insert(0, str(_p))
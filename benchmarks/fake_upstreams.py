@@ -0,0 +1,183 @@
+"""
+Local stand-ins for the upstream APIs, so benchmarks never touch the network
+and give the same numbers on every run. Each server adds a fixed latency per
+request and answers 429 + Retry-After above `rate` requests/second.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from integrations.plex import PlexClient
+
+from benchmarks.synthetic import plex_guids
+
+
+class _Limiter:
+    """Fixed one-second windows; close enough to how the real APIs behave."""
+
+    def __init__(self, rate: Optional[float]):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._window = 0
+        self._count = 0
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        with self._lock:
+            now = int(time.monotonic())
+            if now != self._window:
+                self._window, self._count = now, 0
+            self._count += 1
+            return self._count <= self.rate
+
+
+class FakeServer:
+    """A ThreadingHTTPServer on 127.0.0.1:<free port>, run in a daemon thread."""
+
+    routes: Dict[str, str] = {}
+
+    def __init__(self, latency: float = 0.0, rate: Optional[float] = None):
+        self.latency = latency
+        self.limiter = _Limiter(rate)
+        self.requests = 0
+        self.throttled = 0
+        self.first_request_at: Optional[float] = None  # time.perf_counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self, method: str):
+                server.requests += 1
+                if server.first_request_at is None:
+                    server.first_request_at = time.perf_counter()
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if server.latency:
+                    time.sleep(server.latency)
+                if not server.limiter.allow():
+                    server.throttled += 1
+                    return self._reply(429, b"", {"Retry-After": "1"})
+                url = urlsplit(self.path)
+                status, payload, headers = server.handle(method, url.path, parse_qs(url.query), body)
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode()
+                    headers = {"Content-Type": "application/json", **headers}
+                self._reply(status, payload, headers)
+
+            def _reply(self, status: int, payload: bytes, headers: dict):
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def handle(self, method: str, path: str, query: dict, body: bytes):
+        return 404, {}, {}
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeTrakt(FakeServer):
+    def handle(self, method, path, query, body):
+        if method == "POST" and path == "/sync/history":
+            data = json.loads(body or b"{}")
+            episodes = sum(len(s["episodes"]) for show in data.get("shows", []) for s in show["seasons"])
+            return 201, {"added": {"movies": len(data.get("movies", [])), "episodes": episodes},
+                         "not_found": {"movies": [], "episodes": []}}, {}
+        return 404, {}, {}
+
+
+class FakeTMDb(FakeServer):
+    def handle(self, method, path, query, body):
+        if path == "/3/search/movie":
+            title = (query.get("query") or [""])[0]
+            n = sum(map(ord, title)) % 100_000
+            year = (query.get("year") or [None])[0]
+            return 200, {"results": [{"id": n + 1, "title": title,
+                                      "release_date": f"{year}-01-01" if year else ""}]}, {}
+        return 200, {"results": []}, {}
+
+
+CSRF = "benchmark-csrf-token"
+
+
+class FakeLetterboxd(FakeServer):
+    def handle(self, method, path, query, body):
+        cookie = {"Set-Cookie": f"com.xk72.webparts.csrf={CSRF}; Path=/"}
+        if path == "/sign-in/" and method == "GET":
+            return 200, f'<input type="hidden" name="__csrf" value="{CSRF}">'.encode(), cookie
+        if path == "/sign-in/" and method == "POST":
+            return 200, b'<a href="/sign-out/">Sign out</a>', {
+                "Set-Cookie": "letterboxd.user.CURRENT=bench; Path=/"}
+        if path == "/settings/":
+            return 200, b"ok", {}
+        if path == "/ajax/post-entry" and method == "POST":
+            return 200, {"result": True}, {}
+        return 404, {}, {}
+
+
+class FakePlex(PlexClient):
+    """
+    PlexClient over a synthetic history instead of a server: history pages and
+    guid lookups come from memory, with `latency` seconds per request.
+    """
+
+    def __init__(self, history, latency: float = 0.0):
+        self.server_url, self.token, self.username = "fake://plex", "", ""
+        self.plex = object()
+        self.history = history
+        self.latency = latency
+        self.requests = 0
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_watched(self, mindate=None, maxresults=None):
+        self._request()
+        rows = [h for h in self.history if mindate is None or h.viewedAt > mindate]
+        return list(reversed(rows))[:maxresults]
+
+    def iter_history_pages(self, page_size: int = 500, mindate=None):
+        rows = [h for h in self.history if mindate is None or h.viewedAt > mindate]
+        for i in range(0, len(rows), page_size):
+            self._request()
+            yield rows[i:i + page_size]
+
+    def fetch_guids(self, rating_keys, chunk_size: int = 100):
+        keys = [str(k) for k in rating_keys if k]
+        out = []
+        for i in range(0, len(keys), chunk_size):
+            self._request()
+            for k in keys[i:i + chunk_size]:
+                n = int(k)
+                kind = "episode" if n >= 1_000_000 else "show" if n >= 900_000 else "movie"
+                out.append({"rating_key": k, "type": kind, "guids": plex_guids(n), "show_key": None})
+        return out
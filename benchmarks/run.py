@@ -0,0 +1,279 @@
+"""
+Benchmark runner.
+
+    python -m benchmarks.run [--sizes 1000,10000,100000] [--scenarios sync_all,recently_logged,webhook]
+                             [--latency-ms 20] [--rate 0] [--out results.json]
+
+Every (scenario, size) case runs in its own subprocess so peak RSS is per
+case. Results are one JSON document: run metadata plus, per case, item
+count, wall time, throughput, latency percentiles and peak RSS.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks import ROOT
+
+SCENARIOS = ("sync_all", "recently_logged", "webhook")
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"p50": round(pick(0.50) * 1000, 3), "p90": round(pick(0.90) * 1000, 3),
+            "p99": round(pick(0.99) * 1000, 3), "max": round(ordered[-1] * 1000, 3),
+            "mean": round(statistics.fmean(ordered) * 1000, 3)}
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+#
+# Scenarios: each returns (items, seconds, latency samples, extra fields)
+#
+async def bench_sync_all(size: int, args, workdir: str):
+    import http_pool
+    import integrations.letterboxd as letterboxd
+    import integrations.tmdb as tmdb
+    import integrations.trakt as trakt
+    from benchmarks.fake_upstreams import FakeLetterboxd, FakePlex, FakeTMDb, FakeTrakt
+    from benchmarks.synthetic import plex_history
+    from sync_engine import SyncEngine
+
+    samples: List[float] = []
+    record = http_pool.observe_http
+
+    def observe(host, status, seconds):
+        samples.append(seconds)
+        record(host, status, seconds)
+
+    http_pool.observe_http = letterboxd.observe_http = observe
+
+    latency, rate = args.latency_ms / 1000, args.rate or None
+    destinations = [d for d in args.destinations.split(",") if d]
+    with FakeTrakt(latency, rate) as fake_trakt, FakeTMDb(latency, rate) as fake_tmdb, \
+            FakeLetterboxd(latency, rate) as fake_lb:
+        trakt.API_URL = fake_trakt.url
+        trakt.POST_RATE_PER_SECOND = args.trakt_post_rate
+        tmdb.API_URL = f"{fake_tmdb.url}/3"
+        letterboxd.LOGIN_URL = f"{fake_lb.url}/sign-in/"
+        letterboxd.DIARY_POST_URL = f"{fake_lb.url}/ajax/post-entry"
+        letterboxd.SESSION_PROBE_URL = f"{fake_lb.url}/settings/"
+
+        services = {
+            "plex": FakePlex(plex_history(size), latency),
+            "trakt": trakt.TraktClient("bench", "bench", "token", "refresh"),
+            "tmdb": tmdb.TMDbClient("bench", rate_per_second=args.tmdb_rate),
+        }
+        if "letterboxd" in destinations:
+            services["letterboxd"] = letterboxd.LetterboxdClient("bench", "bench", enabled=True)
+        config = {
+            "general": {"state_dir": workdir, "sync_direction": f"plex->{','.join(destinations)}"},
+            "trakt": {"batch_size": 100, "max_concurrency": 4},
+            "letterboxd": {"max_concurrency": 2, "rate_per_second": 2.0},
+        }
+        engine = SyncEngine(services, config)
+
+        started = time.perf_counter()
+        results = await engine.sync_all()
+        seconds = time.perf_counter() - started
+
+        # Second cycle: nothing new past the watermark, everything resolved locally
+        warm_started = time.perf_counter()
+        await engine.sync_all()
+        warm = time.perf_counter() - warm_started
+        await http_pool.aclose_all()
+
+        first = fake_trakt.first_request_at
+        extra = {
+            "warm_cycle_seconds": round(warm, 4),
+            # how soon a backfill starts delivering; the pipeline pushes page by page
+            "first_trakt_write_seconds": round(first - started, 4) if first is not None else None,
+            "delivered": {d: r.succeeded for d, r in results.items()},
+            "failed": {d: r.failed for d, r in results.items()},
+            "upstream_requests": {"plex": services["plex"].requests, "trakt": fake_trakt.requests,
+                                  "tmdb": fake_tmdb.requests, "letterboxd": fake_lb.requests},
+            "throttled": fake_trakt.throttled + fake_tmdb.throttled + fake_lb.throttled,
+        }
+    return size, seconds, samples, extra
+
+
+async def bench_recently_logged(size: int, args, workdir: str):
+    from benchmarks.synthetic import write_diary
+    from src.utils import recently_logged
+
+    path = os.path.join(workdir, "diary.csv")
+    write_diary(path, size)
+    rng = random.Random(4)
+    titles = max(50, size // 2)
+
+    started = time.perf_counter()
+    recently_logged(path, "Movie 0", 1950, 3650)  # first call builds the index
+    build = time.perf_counter() - started
+
+    lookups = min(size, args.lookups)
+    samples = []
+    loop_started = time.perf_counter()
+    for _ in range(lookups):
+        m = rng.randrange(titles)
+        t0 = time.perf_counter()
+        recently_logged(path, f"Movie {m}", 1950 + m % 70, 3650)
+        samples.append(time.perf_counter() - t0)
+    seconds = time.perf_counter() - loop_started
+    return lookups, seconds, samples, {"index_build_seconds": round(build, 4), "diary_rows": size}
+
+
+async def bench_webhook(size: int, args, workdir: str):
+    import httpx
+    from benchmarks.synthetic import webhook_events
+    from src.diary_queue import DiaryIngestQueue
+    from src.tautulli_webhook import create_app
+
+    ingest = DiaryIngestQueue(os.path.join(workdir, "diary.csv"), dedupe_days=2,
+                              maxsize=args.queue_size, batch_size=500, flush_interval=0.05)
+    app = create_app(ingest=ingest)
+    # ASGITransport does not run the lifespan, so start the writer here
+    writer = asyncio.create_task(ingest.run())
+
+    samples: List[float] = []
+    rejected = 0
+    events = iter(webhook_events(size))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def sender():
+            nonlocal rejected
+            for event in events:
+                while True:
+                    t0 = time.perf_counter()
+                    r = await client.post("/webhook/tautulli", json=event)
+                    samples.append(time.perf_counter() - t0)
+                    if r.status_code != 503:
+                        break
+                    rejected += 1
+                    await asyncio.sleep(0.01)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(sender() for _ in range(args.concurrency)))
+        await ingest.drain()
+        seconds = time.perf_counter() - started
+    writer.cancel()
+    return size, seconds, samples, {"written": ingest.written, "duplicates": ingest.duplicates,
+                                    "rejected_503": rejected, "concurrency": args.concurrency}
+
+
+RUNNERS = {
+    "sync_all": bench_sync_all,
+    "recently_logged": bench_recently_logged,
+    "webhook": bench_webhook,
+}
+
+
+def run_case(scenario: str, size: int, args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="watchweave-bench-") as workdir:
+        items, seconds, samples, extra = asyncio.run(RUNNERS[scenario](size, args, workdir))
+    return {
+        "scenario": scenario,
+        "size": size,
+        "items": items,
+        "seconds": round(seconds, 4),
+        "throughput_per_s": round(items / seconds, 1) if seconds else None,
+        "latency_ms": percentiles(samples),
+        "peak_rss_mb": peak_rss_mb(),
+        **extra,
+    }
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except Exception:
+        return ""
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="WatchWeave benchmarks against local fake upstreams")
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma-separated history sizes")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="added latency per fake upstream request")
+    ap.add_argument("--rate", type=float, default=0, help="fake upstream rate limit (req/s, 0 = none)")
+    ap.add_argument("--destinations", default="trakt",
+                    help="sync_all destinations; letterboxd is paced by its client at <=2 posts/s")
+    ap.add_argument("--trakt-post-rate", type=float, default=20.0,
+                    help="Trakt client POST pacing (the real API allows 1/s)")
+    ap.add_argument("--tmdb-rate", type=float, default=40.0)
+    ap.add_argument("--lookups", type=int, default=10000, help="recently_logged lookups per case")
+    ap.add_argument("--concurrency", type=int, default=64, help="concurrent webhook senders")
+    ap.add_argument("--queue-size", type=int, default=10000)
+    ap.add_argument("--out", help="write results here instead of stdout")
+    ap.add_argument("--case", help=argparse.SUPPRESS)  # scenario:size, run in-process
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.case:
+        scenario, size = args.case.split(":")
+        print(json.dumps(run_case(scenario, int(size), args)))
+        return 0
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(RUNNERS)
+    if unknown:
+        print(f"unknown scenarios: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            print(f"▶ {scenario} size={size}", file=sys.stderr)
+            proc = subprocess.run([sys.executable, "-m", "benchmarks.run", *argv, "--case", f"{scenario}:{size}"],
+                                  cwd=ROOT, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(proc.stderr, file=sys.stderr)
+                results.append({"scenario": scenario, "size": size, "error": proc.stderr.strip()[-500:]})
+                continue
+            results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_rev": _git_rev(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "case")},
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Deterministic synthetic data: Plex history rows and Letterboxd diary CSVs."""
+import csv
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Iterator, List
+
+from src.letterboxd_csv import HEADERS, DiaryRow
+
+START = datetime(2015, 1, 1)
+
+
+def plex_history(n: int, seed: int = 1, episode_share: float = 0.4) -> List[SimpleNamespace]:
+    """
+    `n` Plex history rows (oldest first) shaped like plexapi history items:
+    a mix of movies and episodes, with rewatches, spread over ten years.
+    """
+    rng = random.Random(seed)
+    titles = max(50, n // 3)
+    shows = max(10, n // 200)
+    rows = []
+    for i in range(n):
+        viewed = START + timedelta(seconds=int(i * (10 * 365 * 86400 / max(1, n))) + rng.randint(0, 600))
+        if rng.random() < episode_share:
+            show = rng.randrange(shows)
+            season, episode = rng.randint(1, 8), rng.randint(1, 12)
+            rows.append(SimpleNamespace(
+                type="episode", title=f"Episode {season}x{episode}", year=None, viewedAt=viewed,
+                ratingKey=1_000_000 + show * 1000 + season * 100 + episode, historyKey=i + 1,
+                guid=f"plex://episode/{show:06d}{season:02d}{episode:02d}",
+                grandparentRatingKey=900_000 + show, grandparentTitle=f"Show {show}",
+                parentIndex=season, index=episode,
+            ))
+        else:
+            movie = rng.randrange(titles)
+            rows.append(SimpleNamespace(
+                type="movie", title=f"Movie {movie}", year=1950 + movie % 70, viewedAt=viewed,
+                ratingKey=100_000 + movie, historyKey=i + 1, guid=f"plex://movie/{movie:08d}",
+                grandparentRatingKey=None, grandparentTitle=None, parentIndex=None, index=None,
+            ))
+    return rows
+
+
+def plex_guids(rating_key: int) -> List[str]:
+    """External guids a Plex server would report for a synthetic item."""
+    k = int(rating_key)
+    if 100_000 <= k < 900_000 and k % 5 == 0:
+        return []  # unmatched in Plex, so enrichment has to search TMDb
+    if k >= 1_000_000:
+        return [f"tvdb://{k}"]
+    if k >= 900_000:
+        return [f"tvdb://{k - 900_000 + 70_000}"]
+    return [f"imdb://tt{k:07d}", f"tmdb://{k - 100_000 + 1}"]
+
+
+def diary_rows(n: int, seed: int = 2) -> Iterator[DiaryRow]:
+    rng = random.Random(seed)
+    titles = max(50, n // 2)
+    for i in range(n):
+        m = rng.randrange(titles)
+        day = START + timedelta(days=int(i * 3650 / max(1, n)))
+        yield DiaryRow(Date=day.strftime("%Y-%m-%d"), Name=f"Movie {m}", Year=1950 + m % 70)
+
+
+def write_diary(path: str, n: int, seed: int = 2) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=HEADERS)
+        w.writeheader()
+        for row in diary_rows(n, seed):
+            w.writerow(row.as_csv_row())
+
+
+def webhook_events(n: int, seed: int = 3) -> Iterator[dict]:
+    """Tautulli playback_stopped payloads; some repeat titles to exercise dedupe."""
+    rng = random.Random(seed)
+    for i in range(n):
+        m = rng.randrange(max(50, n // 2))
+        yield {
+            "event": "playback_stopped", "media_type": "movie", "percent_complete": 95,
+            "title": f"Movie {m}", "year": 1950 + m % 70, "imdb_id": f"tt{100_000 + m:07d}",
+            "user_rating": rng.choice([None, 6, 8, 10]), "stopped": str(1700000000 + i),
+        }
@@ -0,0 +1,35 @@
+import asyncio, os, tempfile
+from src.cache import TTLCache
+
+def test_coalesces_and_caches_misses():
+    calls = []
+
+    async def fetch_none():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return None
+
+    async def run(cache):
+        results = await asyncio.gather(*(cache.get_or_fetch("k", fetch_none) for _ in range(10)))
+        assert results == [None] * 10
+        assert await cache.get_or_fetch("k", fetch_none) is None
+
+    with tempfile.TemporaryDirectory() as d:
+        cache = TTLCache(os.path.join(d, "c.db"))
+        asyncio.run(run(cache))
+        assert len(calls) == 1
+        cache.close()
+
+def test_disk_tier_and_expiry():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "c.db")
+        cache = TTLCache(path)
+        cache.set("fresh", {"tmdb_id": 1})
+        cache.set("stale", {"tmdb_id": 2}, ttl=-1)
+        cache.close()
+
+        cache = TTLCache(path)
+        assert cache.get("fresh") == (True, {"tmdb_id": 1})
+        assert cache.get("stale") == (False, None)
+        assert cache.purge_expired() == 1
+        cache.close()
@@ -0,0 +1,37 @@
+import os, tempfile
+from src.crosswalk import IdCrosswalk
+
+def test_record_merges_and_looks_up_by_any_id():
+    with tempfile.TemporaryDirectory() as d:
+        cw = IdCrosswalk(os.path.join(d, "crosswalk.db"))
+        cw.record("movie", plex=101, plex_guid="plex://movie/abc")
+        cw.record("movie", plex=101, imdb="tt0113277", tmdb=949)
+        cw.record("movie", imdb="tt0113277", trakt=1234, tmdb=1)  # known tmdb id wins
+
+        ids = cw.lookup("movie", "trakt", 1234)
+        assert ids == {"plex": "101", "plex_guid": "plex://movie/abc",
+                       "imdb": "tt0113277", "tmdb": "949", "trakt": "1234"}
+        assert cw.lookup("show", "imdb", "tt0113277") is None
+        cw.close()
+
+        # survives a restart
+        cw = IdCrosswalk(os.path.join(d, "crosswalk.db"))
+        assert set(cw.lookup_many("movie", "plex", [101, 102])) == {"101"}
+        cw.close()
+
+def test_attach_fills_missing_ids_on_items():
+    with tempfile.TemporaryDirectory() as d:
+        cw = IdCrosswalk(os.path.join(d, "crosswalk.db"))
+        cw.record_many([
+            ("movie", {"plex": "101", "imdb": "tt0113277", "tmdb": "949"}),
+            ("show", {"plex": "500", "tvdb": "81189"}),
+        ])
+        movie = {"type": "movie", "guid": 101, "tmdb_id": 7}
+        episode = {"type": "episode", "guid": 501, "show_key": 500}
+        unknown = {"type": "movie", "guid": 999}
+
+        assert cw.attach([movie, episode, unknown]) == 2
+        assert movie == {"type": "movie", "guid": 101, "tmdb_id": 7, "imdb_id": "tt0113277"}
+        assert episode["show_tvdb_id"] == 81189
+        assert unknown == {"type": "movie", "guid": 999}
+        cw.close()
@@ -12,3 +12,43 @@ def test_append_and_headers():
             rdr = list(csv.DictReader(f))
             assert rdr[0]["Name"] == "Test Movie"
             assert rdr[0]["Year"] == "2024"
+
+def test_bulk_writer_append_and_atomic():
+    from src.utils import DiaryWriter, write_rows
+    from src.diary_index import get_index
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "nested", "out.csv")
+        rows = [DiaryRow(Date="2025-01-01", Name=f"Movie {i}", Year=2000 + i) for i in range(50)]
+        assert write_rows(path, rows) == 50
+        with DiaryWriter(path) as w:
+            w.write(DiaryRow(Date="2025-01-02", Name="Heat", Year=1995))
+        assert get_index(path).contains("Heat", 1995)
+        with open(path, newline="", encoding="utf-8") as f:
+            assert len(list(csv.DictReader(f))) == 51
+
+        # Full export replaces the file; a failed export leaves it untouched
+        try:
+            with DiaryWriter(path, atomic=True) as w:
+                w.write(DiaryRow(Date="2025-01-03", Name="Partial"))
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        assert write_rows(path, rows[:3], atomic=True) == 3
+        with open(path, newline="", encoding="utf-8") as f:
+            assert [r["Name"] for r in csv.DictReader(f)] == ["Movie 0", "Movie 1", "Movie 2"]
+        assert not get_index(path).contains("Heat", 1995)
+        assert os.listdir(os.path.dirname(path)) == ["out.csv"]
+
+def test_atomic_export_keeps_file_mode():
+    from src.utils import write_rows
+    rows = [DiaryRow(Date="2025-01-01", Name="Heat", Year=1995)]
+    with tempfile.TemporaryDirectory() as d:
+        new = os.path.join(d, "new.csv")
+        write_rows(new, rows, atomic=True)
+        assert os.stat(new).st_mode & 0o777 == 0o644
+
+        shared = os.path.join(d, "shared.csv")
+        write_rows(shared, rows)
+        os.chmod(shared, 0o664)
+        write_rows(shared, rows, atomic=True)
+        assert os.stat(shared).st_mode & 0o777 == 0o664
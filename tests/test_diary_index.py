@@ -0,0 +1,39 @@
+import os, csv, tempfile
+from datetime import datetime, timedelta
+from src.letterboxd_csv import DiaryRow, HEADERS
+from src.diary_index import DiaryIndex
+from src.utils import append_row, recently_logged
+
+def _write(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=HEADERS)
+        w.writeheader()
+        for r in rows:
+            w.writerow(r.as_csv_row())
+
+def test_lookup_and_normalization():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        _write(path, [DiaryRow(Date="2020-05-01", Name="Heat", Year=1995),
+                      DiaryRow(Date="2021-06-01", Name="Heat", Year=1995)])
+        idx = DiaryIndex(path)
+        assert idx.contains("  heat ", "1995")
+        assert not idx.contains("Heat", 1996)
+        assert idx.last_watched("Heat", 1995) == datetime(2021, 6, 1)
+
+def test_append_updates_in_place_and_external_edit_invalidates():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        append_row(path, DiaryRow(Date="2020-01-01", Name="Alien", Year=1979))
+        assert not recently_logged(path, "Alien", 1979, 2)
+
+        append_row(path, DiaryRow(Date=today, Name="Alien", Year=1979))
+        assert recently_logged(path, "Alien", 1979, 2)
+
+        # Rewritten by something else: the index must notice and rebuild
+        _write(path, [DiaryRow(Date="2020-01-01", Name="Aliens", Year=1986)])
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert not recently_logged(path, "Alien", 1979, 2)
+        assert recently_logged(path, "Aliens", 1986, (datetime.utcnow() - datetime(2019, 12, 31)).days)
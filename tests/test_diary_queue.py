@@ -0,0 +1,72 @@
+import asyncio, csv, os, tempfile
+from src.diary_queue import DiaryIngestQueue
+from src.letterboxd_csv import DiaryRow
+
+def _rows(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+async def _ingest(q, rows):
+    writer = asyncio.create_task(q.run())
+    for r in rows:
+        assert q.offer(r)
+    await q.drain()
+    writer.cancel()
+
+def test_batches_dedupe_and_rewatch():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        q = DiaryIngestQueue(path, dedupe_days=2, batch_size=50, flush_interval=0.01)
+        burst = [DiaryRow(Date="2099-01-01", Name=f"Movie {i % 100}", Year=2000) for i in range(300)]
+        asyncio.run(_ingest(q, burst))
+        rows = _rows(path)
+        assert len(rows) == 100 and q.written == 100 and q.duplicates == 200
+        assert len({r["Name"] for r in rows}) == 100
+
+def test_rewatch_outside_dedupe_window():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        q = DiaryIngestQueue(path, dedupe_days=2, flush_interval=0.01)
+        asyncio.run(_ingest(q, [DiaryRow(Date="2001-01-01", Name="Heat", Year=1995)]))
+        q = DiaryIngestQueue(path, dedupe_days=2, flush_interval=0.01)
+        asyncio.run(_ingest(q, [DiaryRow(Date="2099-01-01", Name="Heat", Year=1995)]))
+        assert [r["Rewatch"] for r in _rows(path)] == ["", "Yes"]
+
+def test_full_queue_rejects():
+    q = DiaryIngestQueue("/tmp/unused.csv", dedupe_days=2, maxsize=1)
+    assert q.offer(DiaryRow(Date="2099-01-01", Name="A"))
+    assert not q.offer(DiaryRow(Date="2099-01-01", Name="B"))
+    assert q.rejected == 1 and q.depth == 1
+
+def test_failed_write_is_retried_before_new_rows():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        q = DiaryIngestQueue(path, dedupe_days=2, flush_interval=0.01, retry_delay=0.01)
+        write, failures = q._write, []
+
+        def flaky(batch):
+            if len(failures) < 2:
+                failures.append(len(batch))
+                raise OSError("No space left on device")
+            return write(batch)
+
+        q._write = flaky
+        asyncio.run(_ingest(q, [DiaryRow(Date="2099-01-01", Name=f"Movie {i}") for i in range(5)]))
+        assert failures == [5, 5]
+        assert len(_rows(path)) == 5 and q.written == 5 and q.duplicates == 0
+
+def test_shutdown_writes_what_the_writer_did_not_get_to():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "diary.csv")
+        q = DiaryIngestQueue(path, dedupe_days=2, flush_interval=0.01)
+
+        async def stuck_writer():
+            # the writer holds a batch it cannot write; three more rows wait behind it
+            q._held = [DiaryRow(Date="2099-01-01", Name="Held")]
+            for name in ("A", "B", "C"):
+                assert q.offer(DiaryRow(Date="2099-01-01", Name=name))
+            await q.drain(timeout=0.01)
+
+        asyncio.run(stuck_writer())
+        assert [r["Name"] for r in _rows(path)] == ["Held", "A", "B", "C"]
+        assert q.depth == 0 and q.written == 4
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from src.diff import diff, match_keys
+
+T = datetime(2024, 1, 1, 20, 0)
+
+def _movie(ts, **ids):
+    return {"type": "movie", "watched_at": ts, **ids}
+
+def test_match_keys():
+    assert match_keys(_movie(T, imdb_id="tt1", tmdb_id=9)) == ("movie:imdb:tt1", "movie:tmdb:9")
+    ep = {"type": "episode", "season": 1, "episode": 2, "show_tvdb_id": 81189}
+    assert match_keys(ep) == ("episode:show_tvdb:81189:s1e2",)
+    assert match_keys({"type": "movie", "title": "No ids"}) == ()
+
+def test_plays_match_on_any_id_within_tolerance():
+    a = [_movie(T, imdb_id="tt1"), _movie(T + timedelta(days=30), imdb_id="tt1"),
+         _movie(T, tmdb_id=2), {"type": "movie"}]
+    b = [_movie(T + timedelta(seconds=30), imdb_id="tt1", tmdb_id=1),
+         _movie(T, imdb_id="tt3")]
+    d = diff(a, b)
+    assert d.matched == 1 and d.unkeyed == 1
+    assert d.only_a == [a[1], a[2]]          # the rewatch and the unknown title
+    assert d.unseen_in_b == [a[2]]           # tt1 is known to B, tmdb 2 is not
+    assert d.only_b == d.unseen_in_a == [b[1]]
+
+def test_changesets_both_directions():
+    a = [_movie(T, imdb_id="tt1"), _movie(T, imdb_id="tt2")]
+    b = [_movie(T, imdb_id="tt2"), _movie(T, imdb_id="tt3")]
+    d = diff(a, b)
+    assert d.changeset("b").add == [a[0]] and d.changeset("b").remove == []
+    assert d.changeset("a", by_play=False).add == [b[1]]
+    assert d.changeset("b", mirror=True).remove == [b[1]]
+
+def test_linear_on_large_snapshots():
+    a = [_movie(T + timedelta(hours=i), imdb_id=f"tt{i % 5000}") for i in range(50000)]
+    b = a[::2]
+    d = diff(a, b)
+    assert d.matched == 25000 and len(d.only_a) == 25000 and not d.only_b
+
+def test_rewatched_title_matches_each_play_once():
+    # one title watched 20k times: every play bisects into its bucket instead of scanning it
+    a = [_movie(T + timedelta(hours=i), imdb_id="tt1") for i in range(20000)]
+    b = [_movie(T + timedelta(hours=i, seconds=30), imdb_id="tt1") for i in reversed(range(0, 20000, 2))]
+    d = diff(a, b)
+    assert d.matched == 10000 and d.only_a == a[1::2] and not d.only_b
+
+    # untimed plays take whatever is left of the title, timed or not
+    b = [_movie(T, imdb_id="tt1"), _movie(None, imdb_id="tt1"), _movie(T, imdb_id="tt1")]
+    d = diff([_movie(T, imdb_id="tt1"), _movie(None, imdb_id="tt1"), _movie(None, imdb_id="tt1")], b)
+    assert d.matched == 3 and not d.only_b
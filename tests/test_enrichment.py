@@ -0,0 +1,28 @@
+import asyncio, os, sys
+
+# The enricher imports its modules from app/src directly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "src"))
+from cache import TTLCache  # noqa: E402
+from enrichment import Enricher  # noqa: E402
+
+class FakeTMDb:
+    def __init__(self, results):
+        self.results = results
+        self.searches = []
+
+    async def search_movie(self, query, year=None):
+        self.searches.append((query, year))
+        return self.results
+
+def test_movie_search_uses_the_year_and_caches_a_wrong_year_as_a_miss():
+    tmdb = FakeTMDb([{"id": 1, "release_date": "1998-05-01"}, {"id": 2, "release_date": "2016-03-01"}])
+    enricher = Enricher({"tmdb": tmdb}, TTLCache())
+
+    async def run():
+        assert await enricher.search_movie("Godzilla", 2016) == {"tmdb_id": 2}
+        assert await enricher.search_movie("Godzilla", 2014) is None
+        assert await enricher.search_movie("Godzilla", 2014) is None
+        assert await enricher.search_movie("Godzilla", None) == {"tmdb_id": 1}
+
+    asyncio.run(run())
+    assert tmdb.searches == [("Godzilla", 2016), ("Godzilla", 2014), ("Godzilla", None)]
@@ -0,0 +1,56 @@
+import os, tempfile
+from src.imdb_import import detect_format, iter_imdb_columns, iter_imdb_csv, load_imdb_csv
+
+RATINGS = (
+    "﻿Const,Your Rating,Date Rated,Title,URL,Title Type,IMDb Rating,Runtime (mins),Year\n"
+    "tt0113277,9,2024-01-02,Heat,https://www.imdb.com/title/tt0113277/,movie,8.3,170,1995\n"
+    "tt0903747,10,2024-02-03,Breaking Bad,https://www.imdb.com/title/tt0903747/,tvSeries,9.5,49,2008\n"
+)
+WATCHLIST = (
+    "Position,Const,Created,Modified,Description,Title,URL,Title Type,IMDb Rating,Year\n"
+    "1,tt0133093,2023-05-06,2023-05-06,,The Matrix,https://www.imdb.com/title/tt0133093/,movie,8.7,1999\n"
+)
+
+def _write(d, name, text):
+    path = os.path.join(d, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+def test_ratings_export():
+    with tempfile.TemporaryDirectory() as d:
+        path = _write(d, "ratings.csv", RATINGS)
+        items = load_imdb_csv(path)
+        assert [i.imdb_id for i in items] == ["tt0113277", "tt0903747"]
+        assert items[0].title == "Heat" and items[0].year == 1995 and items[0].rating == 9.0
+        assert items[0].date == "2024-01-02"
+        assert items[1].type == "show"
+        assert not hasattr(items[0], "__dict__")
+
+def test_watchlist_and_format_detection():
+    with tempfile.TemporaryDirectory() as d:
+        path = _write(d, "WATCHLIST.csv", WATCHLIST)
+        (item,) = iter_imdb_csv(path)
+        assert item.title == "The Matrix" and item.rating is None and item.date == "2023-05-06"
+        assert detect_format(WATCHLIST.splitlines()[0].split(","), path) == "watchlist"
+        assert detect_format(WATCHLIST.splitlines()[0].split(","), "my-list.csv") == "list"
+        assert detect_format(RATINGS.lstrip("﻿").splitlines()[0].split(",")) == "ratings"
+
+def test_projection_and_columnar_chunks():
+    with tempfile.TemporaryDirectory() as d:
+        path = _write(d, "ratings.csv", RATINGS)
+        (first, _) = iter_imdb_csv(path, fields=("imdb_id",))
+        assert first.imdb_id == "tt0113277" and first.title == "" and first.year is None
+        chunks = list(iter_imdb_columns(path, chunk_size=1, fields=("imdb_id", "year")))
+        assert chunks == [{"imdb_id": ["tt0113277"], "year": [1995]},
+                          {"imdb_id": ["tt0903747"], "year": [2008]}]
+
+def test_missing_file():
+    assert load_imdb_csv("/nonexistent/ratings.csv") == []
+
+def test_title_year_only_csv():
+    with tempfile.TemporaryDirectory() as d:
+        path = _write(d, "movies.csv", "My movies\n\nTitle,Year\nHeat,1995\nAlien,1979\n")
+        items = load_imdb_csv(path)
+        assert [(i.title, i.year, i.imdb_id) for i in items] == [("Heat", 1995, None), ("Alien", 1979, None)]
+        assert next(iter_imdb_columns(path, fields=("title",))) == {"title": ["Heat", "Alien"]}
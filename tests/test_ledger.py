@@ -0,0 +1,24 @@
+import os, tempfile
+from datetime import datetime
+from src.ledger import DeliveryLedger
+
+def _key(item):
+    return f"plex:{item['guid']}" if item.get("guid") else None
+
+def test_only_undelivered_items_are_returned():
+    with tempfile.TemporaryDirectory() as d:
+        ledger = DeliveryLedger(os.path.join(d, "ledger.db"), _key)
+        a = {"guid": 1, "watched_at": datetime(2024, 1, 1, 20, 0)}
+        b = {"guid": 2, "watched_at": datetime(2024, 1, 2, 20, 0)}
+        rewatch = {"guid": 1, "watched_at": datetime(2024, 3, 1, 20, 0)}
+        unkeyed = {"title": "No key"}
+
+        assert ledger.mark_delivered("trakt", [a]) == 1
+        assert ledger.undelivered("trakt", [a, b, rewatch, unkeyed]) == [b, rewatch, unkeyed]
+        assert ledger.undelivered("letterboxd", [a]) == [a]
+        ledger.close()
+
+        # survives a restart
+        ledger = DeliveryLedger(os.path.join(d, "ledger.db"), _key)
+        assert ledger.undelivered("trakt", [a]) == []
+        ledger.close()
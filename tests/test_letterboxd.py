@@ -0,0 +1,46 @@
+import asyncio, os, sys
+from datetime import datetime
+from types import SimpleNamespace
+
+# The integrations import their modules from app/src directly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "src"))
+from integrations.letterboxd import DiaryPostQueue  # noqa: E402
+from watch_event import WatchEvent  # noqa: E402
+
+class ExpiredClient:
+    """A Letterboxd client whose sessions are always refused."""
+    dry_run = False
+
+    def __init__(self):
+        self._session_generation = 1
+        self.logins = 0
+        self.posts = 0
+
+    def _diary_payload(self, date_str, tmdb_id=None):
+        return {"date": date_str}
+
+    def _send_diary_entry(self, payload):
+        self.posts += 1
+        return SimpleNamespace(status_code=401, headers={})
+
+    def reauthenticate(self, generation):
+        if generation == self._session_generation:
+            self.logins += 1
+            self._session_generation += 1
+        return True
+
+def test_refused_fresh_session_logs_in_once_and_fails_the_run():
+    client = ExpiredClient()
+    queue = DiaryPostQueue(client, workers=3, rate_per_second=1000, max_rate_per_second=1000)
+    items = [WatchEvent(type="movie", title=f"Film {i}", watched_at=datetime(2024, 1, 1)) for i in range(10)]
+    posted = []
+
+    stats = asyncio.run(queue.run(items, on_posted=posted.extend))
+    assert client.logins == 1
+    assert stats.failed == 10 and not posted
+    # each worker learns the fresh session is refused at most once; the rest never post
+    assert client.posts <= 3 + 3
+
+    # the next run gets its own one re-login
+    asyncio.run(queue.run(items[:1]))
+    assert client.logins == 2
@@ -0,0 +1,34 @@
+from src.metrics import Registry
+
+def test_counter_gauge_and_histogram_render():
+    reg = Registry()
+    items = reg.counter("items_total", "Items", ("destination", "outcome"))
+    items.inc(3, destination="trakt", outcome="delivered")
+    items.inc(destination="trakt", outcome="delivered")
+    depth = reg.gauge("queue_depth", "Depth", ("queue",))
+    depth.set_function(lambda: 7, queue="webhook")
+    depth.set_function(lambda: 1 / 0, queue="broken")
+    stage = reg.histogram("stage_seconds", "Stage", ("stage",), buckets=(0.1, 1))
+    stage.observe(0.05, stage="fetch")
+    stage.observe(0.5, stage="fetch")
+    stage.observe(5, stage="fetch")
+
+    text = reg.render()
+    assert "# TYPE items_total counter" in text
+    assert 'items_total{destination="trakt",outcome="delivered"} 4' in text
+    assert 'queue_depth{queue="webhook"} 7' in text and "broken" not in text
+    assert 'stage_seconds_bucket{stage="fetch",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="fetch",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="fetch"} 3' in text
+    assert 'stage_seconds_sum{stage="fetch"} 5.55' in text
+
+def test_same_name_returns_same_metric():
+    reg = Registry()
+    assert reg.counter("a_total", "A") is reg.counter("a_total", "A")
+    try:
+        reg.gauge("a_total", "A")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("type clash not detected")
@@ -0,0 +1,103 @@
+import asyncio, threading
+from src.pipeline import Fanout, iter_in_thread
+
+def test_source_runs_ahead_only_up_to_maxsize():
+    produced = []
+
+    def pages():
+        for i in range(20):
+            produced.append(i)
+            yield [i]
+
+    async def consume():
+        out = []
+        async for page in iter_in_thread(pages, maxsize=2, poll=0.01):
+            await asyncio.sleep(0.02)
+            # queued (maxsize) + this one + the one the worker is waiting to hand over
+            assert len(produced) - len(out) <= 4
+            out += page
+        return out
+
+    assert asyncio.run(consume()) == list(range(20))
+
+def test_source_errors_and_early_close():
+    def broken():
+        yield [1]
+        raise ValueError("plex down")
+
+    async def read(make_iter):
+        return [p async for p in iter_in_thread(make_iter, poll=0.01)]
+
+    try:
+        asyncio.run(read(broken))
+        assert False, "expected the source error"
+    except ValueError as e:
+        assert str(e) == "plex down"
+
+    stopped = threading.Event()
+
+    def endless():
+        try:
+            while True:
+                yield [0]
+        finally:
+            stopped.set()
+
+    async def first():
+        pages = iter_in_thread(endless, maxsize=1, poll=0.01)
+        page = await anext(pages)
+        await pages.aclose()
+        return page
+
+    assert asyncio.run(first()) == [0]
+    assert stopped.wait(1)
+
+async def _drain(fan, name):
+    async for _ in fan.batches(name):
+        pass
+
+def test_fanout_backpressure_and_completed():
+    async def run():
+        fan = Fanout(["fast", "slow"], maxsize=1)
+        seen = {"fast": [], "slow": []}
+        gate = asyncio.Event()
+
+        async def sink(name):
+            async for batch in fan.batches(name):
+                if name == "slow":
+                    await gate.wait()
+                seen[name].append(batch)
+
+        tasks = [asyncio.create_task(sink(n)) for n in seen]
+        await fan.put([1])
+        put2 = asyncio.create_task(fan.put([2]))
+        put3 = asyncio.create_task(fan.put([3]))
+        await asyncio.sleep(0.05)
+        # slow holds batch 1 and its queue has batch 2: batch 3 has to wait
+        assert not put3.done() and fan.completed == 0
+        gate.set()
+        await asyncio.gather(put2, put3)
+        await fan.close()
+        await asyncio.gather(*tasks)
+        assert seen == {"fast": [[1], [2], [3]], "slow": [[1], [2], [3]]}
+        assert fan.completed == 3
+
+        # a failed sink stops holding the producer back, but not the commit point
+        fan = Fanout(["a", "b"], maxsize=1)
+        reader = asyncio.create_task(_drain(fan, "a"))
+        await fan.put([1])
+        blocked = asyncio.create_task(fan.put([2]))
+        await asyncio.sleep(0.01)
+        assert not blocked.done()
+        fan.detach("b")
+        await asyncio.wait_for(blocked, 1)
+        await fan.close()
+        await reader
+        assert fan.done == {"a": 2, "b": 0} and fan.completed == 0
+
+        # nothing took the batches, so nothing is completed
+        fan = Fanout([])
+        await fan.put([1])
+        assert fan.completed == 0
+
+    asyncio.run(run())
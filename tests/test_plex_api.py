@@ -0,0 +1,89 @@
+from src.plex_api import PlexAPI
+
+class _Response:
+    def __init__(self, payload=None, content_type="application/json"):
+        self.payload, self.headers = payload, {"Content-Type": content_type}
+    def raise_for_status(self):
+        pass
+    def json(self):
+        return self.payload
+
+class _FakePlex:
+    """Just enough of the library endpoints: one section, collections as tags on items."""
+    def __init__(self, members):
+        self.tags = {k: {"Mirror"} for k in members}
+        self.calls = []
+    def request(self, method, url, params=None, timeout=None):
+        path = url.split("32400", 1)[1]
+        self.calls.append((method, path, params))
+        if method == "PUT":
+            for k in params["id"].split(","):
+                tags = self.tags.setdefault(k, set())
+                if "collection[0].tag.tag" in params:
+                    tags.add(params["collection[0].tag.tag"])
+                else:
+                    tags.discard(params["collection[].tag.tag-"])
+            return _Response()
+        if path == "/library/sections/1/collections":
+            have = any(self.tags.values())
+            return _Response({"MediaContainer": {"Metadata": [{"title": "Mirror", "ratingKey": "77"}] if have else []}})
+        if path == "/library/collections/77/children":
+            return _Response({"MediaContainer": {"Metadata": [{"ratingKey": k} for k, t in self.tags.items() if "Mirror" in t]}})
+        return _Response("<MediaContainer/>", "text/xml")
+
+def _api(monkeypatch, members=()):
+    monkeypatch.setenv("PLEX_TOKEN", "t")
+    api = PlexAPI()
+    assert api.session.headers["Accept"] == "application/json"
+    api.session = _FakePlex(members)
+    return api
+
+def test_sync_collection_diffs_and_bulk_edits(monkeypatch):
+    api = _api(monkeypatch, members=[str(k) for k in range(1, 101)])
+    target = [str(k) for k in range(51, 2051)]  # keep 50, add 1950, drop 50
+    res = api.sync_collection("1", "Mirror", target)
+    assert res == {"added": 1950, "removed": 50, "unchanged": 50, "requests": 5}
+    # two listings, four adds of up to 500 ids, one removal
+    assert [m for m, _, _ in api.session.calls] == ["GET", "GET"] + ["PUT"] * 5
+    assert api.request_count == 7
+    assert api.collection_members("1", "Mirror") == set(target)
+
+    # already in sync: listings only, no edits
+    before = api.request_count
+    assert api.sync_collection("1", "Mirror", target)["requests"] == 0
+    assert api.request_count == before
+
+def test_listings_cached_until_cleared(monkeypatch):
+    api = _api(monkeypatch)
+    assert api.get_collections("1") == [] and api.get_collections("1") == []
+    assert api.request_count == 1
+    api.clear_cache()
+    api.get_collections("1")
+    assert api.request_count == 2
+    try:
+        api.get_sections()  # not JSON
+        assert False, "expected a ValueError"
+    except ValueError:
+        pass
+
+def test_add_collection_to_item_keeps_its_endpoint(monkeypatch):
+    api = _api(monkeypatch)
+    assert api.add_collection_to_item("42", "Mirror") is True
+    assert api.session.calls == [("PUT", "/library/sections/all",
+                                  {"type": 1, "id": "42", "collection[0].tag.tag": "Mirror"})]
+
+def test_one_collections_listing_serves_every_existing_collection(monkeypatch):
+    api = _api(monkeypatch, members=["1", "2"])
+    api.sync_collection("1", "Mirror", ["2", "3"])
+    api.sync_collection("1", "Mirror", ["3", "4"])
+    listings = [p for m, p, _ in api.session.calls if m == "GET"]
+    # the section's collections once; the edited collection's members again after each edit
+    assert listings == ["/library/sections/1/collections"] + ["/library/collections/77/children"] * 2
+    assert api.collection_members("1", "Mirror") == {"3", "4"}
+
+    # emptying a collection deletes it, and adding to one the section didn't list creates it:
+    # either way the section is listed again
+    api.sync_collection("1", "Mirror", [])
+    assert api.find_collection("1", "Mirror") is None
+    api.edit_collection("1", ["5"], "New")
+    assert "/library/sections/1/collections" not in api._listings
@@ -0,0 +1,29 @@
+import os, tempfile
+from datetime import datetime
+from src.retry_queue import RetryQueue
+
+def _key(item):
+    return f"plex:{item['guid']}"
+
+def test_write_ahead_backoff_and_dead_letter():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "q.db")
+        q = RetryQueue(path, _key, max_attempts=2, base_delay=3600)
+        a = {"guid": 1, "watched_at": datetime(2024, 1, 1, 20, 0), "title": "A"}
+        b = {"guid": 2, "watched_at": datetime(2024, 1, 2, 20, 0), "title": "B"}
+
+        q.add("trakt", [a, b])
+        q.close()
+
+        # crash before the push finished: both are resumed after a restart
+        q = RetryQueue(path, _key, max_attempts=2, base_delay=3600)
+        assert q.due("trakt") == [a, b]
+
+        q.resolve("trakt", [a])
+        assert q.fail("trakt", [b], "boom") == 0
+        assert q.due("trakt") == []  # backing off
+        assert q.counts() == {"trakt": {"pending": 1}}
+
+        assert q.fail("trakt", [b], "boom") == 1
+        assert q.counts() == {"trakt": {"dead": 1}}
+        q.close()
@@ -0,0 +1,99 @@
+import asyncio, os, sys
+from types import SimpleNamespace
+
+# The scheduler imports its modules from app/src directly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "src"))
+from scheduler import SyncScheduler  # noqa: E402
+
+class FakeEngine:
+    destinations = ["trakt", "letterboxd"]
+
+    def __init__(self, seconds=0.0):
+        self.seconds = seconds
+        self.syncs = []
+        self.retries = []
+        self.running = self.overlap = 0
+
+    async def _busy(self):
+        self.running += 1
+        self.overlap = max(self.overlap, self.running)
+        await asyncio.sleep(self.seconds)
+        self.running -= 1
+
+    async def sync_all(self):
+        self.syncs.append(asyncio.get_running_loop().time())
+        await self._busy()
+        return {}
+
+    async def retry_destination(self, dest):
+        self.retries.append(dest)
+        await self._busy()
+        return SimpleNamespace(succeeded=0, attempted=0, failed=0)
+
+def _scheduler(engine, **sched):
+    return SyncScheduler(engine, {"scheduler": {"jitter_seconds": 0, **sched}}, events=True)
+
+async def _for(seconds, *loops):
+    tasks = [asyncio.create_task(loop) for loop in loops]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+def test_burst_of_events_is_one_sync_after_debounce():
+    async def run():
+        engine = FakeEngine()
+        s = _scheduler(engine, debounce_seconds=0.1, max_delay_seconds=5)
+        notified = []
+
+        async def burst():
+            for _ in range(5):
+                s.notify()
+                notified.append(asyncio.get_running_loop().time())
+                await asyncio.sleep(0.01)
+
+        await _for(0.3, s._events_loop(), burst())
+        assert len(engine.syncs) == 1
+        assert engine.syncs[0] >= notified[-1] + 0.1
+
+    asyncio.run(run())
+
+def test_max_delay_caps_a_steady_stream_of_events():
+    async def run():
+        engine = FakeEngine()
+        s = _scheduler(engine, debounce_seconds=0.1, max_delay_seconds=0.25)
+
+        async def stream():
+            # never quiet for a whole debounce
+            while True:
+                s.notify()
+                await asyncio.sleep(0.03)
+
+        first = asyncio.get_running_loop().time()
+        await _for(0.4, s._events_loop(), stream())
+        assert len(engine.syncs) == 1
+        assert first + 0.24 <= engine.syncs[0] < first + 0.35
+
+    asyncio.run(run())
+
+def test_runs_never_overlap():
+    async def run():
+        engine = FakeEngine(seconds=0.02)
+        s = _scheduler(engine)
+        await asyncio.gather(s._sync("webhook"), s._sync("reconcile"),
+                             *(s._run("retry", lambda d=d: engine.retry_destination(d))
+                               for d in engine.destinations))
+        assert len(engine.syncs) == 2 and len(engine.retries) == 2
+        assert engine.overlap == 1
+
+    asyncio.run(run())
+
+def test_retry_loops_drain_each_destination_on_its_interval():
+    async def run():
+        engine = FakeEngine()
+        # 0.12s between retries (0.002 minutes)
+        s = _scheduler(engine, retry_interval_minutes=0.002)
+        await _for(0.18, *(s._retry_loop(d) for d in engine.destinations))
+        assert sorted(engine.retries) == ["letterboxd", "trakt"]
+
+    asyncio.run(run())
@@ -0,0 +1,252 @@
+import asyncio, os, sqlite3, sys, tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# The engine imports its modules from app/src directly
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app", "src"))
+from sync_engine import SyncEngine  # noqa: E402
+
+START = datetime(2024, 1, 1, 20, 0)
+
+def _history(n, account=1):
+    return [SimpleNamespace(type="movie", title=f"Movie {i}", year=2000, viewedAt=START + timedelta(hours=i),
+                            historyKey=f"/status/sessions/history/{i}", ratingKey=str(100 + i), guid=None,
+                            accountID=account)
+            for i in range(n)]
+
+class FakePlex:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_history_pages(self, page_size=500, mindate=None):
+        rows = [r for r in self.rows if mindate is None or r.viewedAt > mindate]
+        for i in range(0, len(rows), page_size):
+            yield rows[i:i + page_size]
+
+    def resolve_ids(self, items, crosswalk):
+        pass
+
+class FakeTrakt:
+    def __init__(self):
+        self.pushed = []
+
+    async def add_to_history(self, items, batch_size, concurrency, on_delivered):
+        self.pushed += items
+        on_delivered(items)
+        return SimpleNamespace(batches=1, failed_batches=0, added=len(items), not_found=0, skipped=0)
+
+def _engine(d, services, queue_pages=4, **trakt):
+    return SyncEngine(services, {"general": {"state_dir": d, "sync_direction": "plex->trakt",
+                                             "pipeline_queue_pages": queue_pages},
+                                 "plex": {"history_page_size": 2}, "trakt": {"enabled": True, **trakt}})
+
+def test_destination_not_initialized_yet_gets_its_items_later():
+    with tempfile.TemporaryDirectory() as d:
+        services = {"plex": FakePlex(_history(5))}
+        engine = _engine(d, services)
+        results = asyncio.run(engine.sync_all())
+        r = results["trakt"]
+        assert r.queued == 5 and r.attempted == 0 and r.error
+        assert engine.retry_queue.counts() == {"trakt": {"pending": 5}}
+
+        # Trakt comes up: the retry timer (or the next cycle) delivers them
+        services["trakt"] = trakt = FakeTrakt()
+        r = asyncio.run(engine.retry_destination("trakt"))
+        assert r.succeeded == 5 and len(trakt.pushed) == 5
+        assert engine.retry_queue.counts() == {}
+
+def test_disabled_destination_is_skipped():
+    with tempfile.TemporaryDirectory() as d:
+        engine = _engine(d, {"plex": FakePlex(_history(3))}, enabled=False)
+        assert asyncio.run(engine.sync_all()) == {}
+        assert engine.retry_queue.counts() == {}
+        # nothing was delivered anywhere, so the plays stay ahead of the watermark
+        assert engine.watermark.viewed_at is None
+
+def test_watermark_stops_at_the_last_page_a_failed_sink_finished():
+    class FlakyTrakt(FakeTrakt):
+        async def add_to_history(self, items, **kw):
+            if self.pushed:
+                raise RuntimeError("trakt down")
+            return await super().add_to_history(items, **kw)
+
+    def broken_fail(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    with tempfile.TemporaryDirectory() as d:
+        # one page buffered, so the fetch is still running when the sink dies
+        engine = _engine(d, {"plex": FakePlex(_history(12)), "trakt": FlakyTrakt()}, queue_pages=1)
+        engine.retry_queue.fail = broken_fail
+        try:
+            asyncio.run(engine.sync_all())
+            assert False, "expected the sink's error"
+        except sqlite3.OperationalError:
+            pass
+        # pages of 2: only the first page got through the sink
+        assert engine.watermark.viewed_at == int((START + timedelta(hours=1)).timestamp())
+
+def test_watermark_follows_delivered_pages():
+    with tempfile.TemporaryDirectory() as d:
+        trakt = FakeTrakt()
+        engine = _engine(d, {"plex": FakePlex(_history(5)), "trakt": trakt})
+        assert asyncio.run(engine.sync_all())["trakt"].succeeded == 5
+        assert engine.watermark.viewed_at == int((START + timedelta(hours=4)).timestamp())
+        assert asyncio.run(engine.sync_all())["trakt"].attempted == 0
+
+def test_watermark_moves_past_a_failed_destination_only_with_its_plays_queued():
+    class DownTrakt(FakeTrakt):
+        async def add_to_history(self, items, **kw):
+            raise RuntimeError("trakt down")
+
+    class SlowTrakt(FakeTrakt):
+        async def add_to_history(self, items, **kw):
+            await asyncio.sleep(1)
+
+    for trakt in (DownTrakt(), SlowTrakt()):
+        with tempfile.TemporaryDirectory() as d:
+            engine = _engine(d, {"plex": FakePlex(_history(5)), "trakt": trakt}, timeout_seconds=0.05)
+            r = asyncio.run(engine.sync_all())["trakt"]
+            assert r.error and r.succeeded == 0
+            # the watermark moved on, but only because every play is waiting in the retry queue
+            assert engine.watermark.viewed_at == int((START + timedelta(hours=4)).timestamp())
+            assert engine.retry_queue.counts() == {"trakt": {"pending": 5}}
+
+def test_profile_login_failure_is_retried_and_nothing_is_lost(monkeypatch):
+    import profiles
+    from integrations.registry import Integration
+
+    logins = []
+
+    def build(cls, section, config):
+        logins.append(section["username"])
+        if len(logins) <= 2:
+            raise RuntimeError("trakt login failed")
+        return FakeTrakt()
+
+    trakt = Integration("trakt", "Trakt", "unused", "unused", build)
+    trakt.load = lambda: None
+    monkeypatch.setattr(profiles, "REGISTRY", {"plex": None, "trakt": trakt})
+
+    with tempfile.TemporaryDirectory() as d:
+        config = {"general": {"state_dir": d, "sync_direction": "plex->trakt"},
+                  "profiles": [{"name": "alice", "plex_account_id": 1, "trakt": {"username": "alice"}}]}
+        sync = profiles.ProfileSync({"plex": FakePlex(_history(4))}, config)
+        asyncio.run(sync.start())
+        alice = sync.profiles[0]
+        assert "trakt" not in alice.services
+
+        # still down at the start of the cycle: the plays wait in the retry queue
+        r = asyncio.run(sync.sync_all())["alice/trakt"]
+        assert r.queued == 4 and len(logins) == 2
+        assert alice.engine.retry_queue.counts() == {"trakt": {"pending": 4}}
+
+        # the next cycle logs in and delivers them
+        r = asyncio.run(sync.sync_all())["alice/trakt"]
+        assert len(logins) == 3 and r.succeeded == 4
+        assert len(alice.services["trakt"].pushed) == 4
+        assert alice.engine.retry_queue.counts() == {}
+
+def test_trakt_not_found_and_unnumbered_episodes_stay_out_of_the_ledger():
+    from integrations.trakt import TraktClient
+    from watch_event import WatchEvent
+
+    class PostlessTrakt(TraktClient):
+        def __init__(self):
+            self.payloads = []
+
+        async def _post_history_batch(self, payload):
+            self.payloads.append(payload)
+            return {"added": {"movies": 1, "episodes": 0},
+                    "not_found": {"movies": [{"ids": {"imdb": "tt0000002"}}], "shows": [], "episodes": []}}
+
+    at = START
+    found = WatchEvent(type="movie", title="Found", year=2000, watched_at=at, guid="1", imdb_id="tt0000001")
+    missing = WatchEvent(type="movie", title="Missing", year=2000, watched_at=at, guid="2", imdb_id="tt0000002")
+    unnumbered = WatchEvent(type="episode", title="Pilot", show_title="Show", watched_at=at, guid="3")
+
+    with tempfile.TemporaryDirectory() as d:
+        trakt = PostlessTrakt()
+        engine = _engine(d, {"plex": FakePlex([]), "trakt": trakt})
+        async def one_page():
+            yield [found, missing, unnumbered], []
+
+        r = asyncio.run(engine.deliver_pages(one_page()))["trakt"]
+        assert r.succeeded == 1 and r.failed == 2
+        assert "shows" not in trakt.payloads[0]
+        assert engine.ledger.undelivered("trakt", [found, missing, unnumbered]) == [missing, unnumbered]
+        assert engine.retry_queue.counts()["trakt"]
+
+def test_reconcile_pushes_only_what_the_ledger_has_not_delivered():
+    from integrations.sync_engine import run_sync_cycle
+    from watch_event import WatchEvent
+
+    class ResolvingPlex(FakePlex):
+        def resolve_ids(self, items, crosswalk):
+            for i in items:
+                i.imdb_id = f"tt{i.guid}"
+
+    class HistoryTrakt(FakeTrakt):
+        async def get_history(self):
+            return []
+
+        async def add_to_history(self, items, **kw):
+            await super().add_to_history(items, **kw)
+            return SimpleNamespace(delivered=items)
+
+    rows = _history(3)
+    with tempfile.TemporaryDirectory() as d:
+        trakt = HistoryTrakt()
+        engine = _engine(d, {"plex": ResolvingPlex(rows), "trakt": trakt})
+        # the engine delivered play 0 already; play 1 is waiting in its retry queue
+        engine.ledger.mark_delivered("trakt", [WatchEvent.from_plex(rows[0])])
+        engine.retry_queue.add("trakt", [WatchEvent.from_plex(rows[1])])
+
+        summary = asyncio.run(run_sync_cycle(engine.cfg, engine.svcs, engine.crosswalk,
+                                             engine.ledger, engine.retry_queue))
+        assert summary["plex->trakt_updated"] == 2
+        assert sorted(i.guid for i in trakt.pushed) == ["101", "102"]
+        assert engine.ledger.undelivered("trakt", list(map(WatchEvent.from_plex, rows))) == []
+        assert engine.retry_queue.counts() == {}
+
+        # nothing left to reconcile
+        asyncio.run(run_sync_cycle(engine.cfg, engine.svcs, engine.crosswalk, engine.ledger, engine.retry_queue))
+        assert len(trakt.pushed) == 2
+
+def test_profiles_stream_each_page_to_their_own_pipeline(monkeypatch):
+    import profiles
+
+    monkeypatch.setattr(profiles, "REGISTRY", {"plex": None, "trakt": None})
+    fetched = []
+
+    class CountingPlex(FakePlex):
+        def iter_history_pages(self, page_size=500, mindate=None):
+            for page in super().iter_history_pages(page_size, mindate):
+                fetched.append(len(page))
+                yield page
+
+    class WatchingTrakt(FakeTrakt):
+        async def add_to_history(self, items, **kw):
+            self.fetched_at_first_push = getattr(self, "fetched_at_first_push", len(fetched))
+            return await super().add_to_history(items, **kw)
+
+    rows = _history(40)
+    for i, row in enumerate(rows):
+        row.accountID = 1 + i % 2
+    with tempfile.TemporaryDirectory() as d:
+        config = {"general": {"state_dir": d, "sync_direction": "plex->trakt", "pipeline_queue_pages": 1},
+                  "plex": {"history_page_size": 2},
+                  "profiles": [{"name": "alice", "plex_account_id": 1, "trakt": {"username": "alice"}},
+                               {"name": "bob", "plex_account_id": 2, "trakt": {"username": "bob"}}]}
+        sync = profiles.ProfileSync({"plex": CountingPlex(rows)}, config)
+        alice, bob = sync.profiles
+        alice.services["trakt"], bob.services["trakt"] = WatchingTrakt(), WatchingTrakt()
+
+        results = asyncio.run(sync.sync_all())
+        assert results["alice/trakt"].succeeded == results["bob/trakt"].succeeded == 20
+        assert {i.account_id for i in alice.services["trakt"].pushed} == {1}
+        assert {i.account_id for i in bob.services["trakt"].pushed} == {2}
+        # delivery started while the history was still being fetched
+        assert alice.services["trakt"].fetched_at_first_push < len(fetched) == 20
+        # both watermarks moved past the whole history
+        assert alice.engine.watermark.viewed_at == bob.engine.watermark.viewed_at \
+            == int((START + timedelta(hours=39)).timestamp())
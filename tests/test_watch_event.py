@@ -0,0 +1,46 @@
+import json, sys
+from datetime import datetime
+from types import SimpleNamespace
+from src.diff import diff, match_keys
+from src.watch_event import WatchEvent
+
+T = datetime(2024, 1, 1, 20, 0)
+
+def _plex_row(**kw):
+    row = dict(type="episode", title="Pilot", year=None, viewedAt=T, historyKey=7, ratingKey=101,
+               guid="plex://episode/1", grandparentRatingKey=100, grandparentTitle="Show",
+               parentIndex=1, index=1, accountID=2)
+    row.update(kw)
+    return SimpleNamespace(**row)
+
+def test_from_plex_reads_history_row():
+    ev = WatchEvent.from_plex(_plex_row())
+    assert (ev.type, ev.guid, ev.show_key, ev.season, ev.episode, ev.account_id) == ("episode", 101, 100, 1, 1, 2)
+    assert ev.watched_at == T and ev.history_id == 7 and ev.rating is None
+    # a movie row without a title falls back to the grandparent title
+    assert WatchEvent.from_plex(_plex_row(title=None)).title == "Show"
+
+def test_dict_style_access_and_round_trip():
+    ev = WatchEvent(type="movie", title="Heat", year=1995, watched_at=T)
+    assert ev.get("title") == "Heat" and ev["year"] == 1995
+    assert ev.get("tmdb_id") is None and ev.get("nope", "x") == "x"
+    ev["tmdb_id"] = 949
+    assert ev.tmdb_id == 949 and "tmdb_id" in ev and "imdb_id" not in ev
+    try:
+        ev["nope"] = 1
+        assert False, "unknown keys are rejected"
+    except KeyError:
+        pass
+    assert WatchEvent.from_dict({**ev.as_dict(), "extra": 1}) == ev
+    json.dumps(ev.as_dict(), default=str)
+
+def test_smaller_than_dict_and_diffs_like_one():
+    d = {"type": "movie", "title": "Heat", "year": 1995, "watched_at": T, "imdb_id": "tt0113277",
+         "tmdb_id": 949, "guid": 5, "plex_guid": "plex://movie/5", "history_id": 1}
+    ev = WatchEvent.from_dict(d)
+    assert sys.getsizeof(ev) < sys.getsizeof(d)
+    assert not hasattr(ev, "__dict__")
+    assert match_keys(ev) == match_keys(d)
+
+    trakt = {"type": "movie", "imdb_id": "tt0113277", "watched_at": T}
+    assert diff([ev], [trakt]).matched == 1
@@ -1,8 +1,52 @@
-from src.main import create_app
+import asyncio, dataclasses
+import httpx
+from src import tautulli_webhook
+from src.diary_queue import DiaryIngestQueue
+from src.tautulli_webhook import create_app
+
+PLAY = {"event": "playback_stopped", "media_type": "movie", "percent_complete": 95,
+        "title": "Heat", "year": 1995, "stopped": "2024-01-01T20:00:00"}
+
+def _post(app, *payloads, headers=None):
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.post("/webhook/tautulli", json=p, headers=headers) for p in payloads]
+
+    return asyncio.run(send())
 
 def test_health():
-    app = create_app()
-    client = app.test_client()
-    r = client.get("/health")
+    async def get():
+        transport = httpx.ASGITransport(app=create_app(ingest=DiaryIngestQueue("/tmp/unused.csv", 2)))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/health")
+
+    r = asyncio.run(get())
     assert r.status_code == 200
-    assert r.json.get("status") == "ok"
+    assert r.json() == {"status": "ok", "queue_depth": 0}
+
+def test_finished_play_is_queued():
+    ingest = DiaryIngestQueue("/tmp/unused.csv", dedupe_days=2)
+    [r] = _post(create_app(ingest=ingest), PLAY)
+    assert r.status_code == 202
+    assert r.json()["queued"]["Name"] == "Heat"
+    assert ingest.depth == 1
+
+def test_full_queue_answers_503():
+    ingest = DiaryIngestQueue("/tmp/unused.csv", dedupe_days=2, maxsize=1)
+    first, second = _post(create_app(ingest=ingest), PLAY, dict(PLAY, title="Ronin"))
+    assert first.status_code == 202
+    assert second.status_code == 503 and second.headers["Retry-After"] == "1"
+    assert ingest.rejected == 1
+
+def test_secret_is_required_when_set(monkeypatch):
+    monkeypatch.setattr(tautulli_webhook, "settings",
+                        dataclasses.replace(tautulli_webhook.settings, webhook_secret="s3cret"))
+    ingest = DiaryIngestQueue("/tmp/unused.csv", dedupe_days=2)
+    app = create_app(ingest=ingest)
+    [r] = _post(app, PLAY)
+    assert r.status_code == 401
+    [r] = _post(app, PLAY, headers={"X-Webhook-Secret": "wrong"})
+    assert r.status_code == 401
+    [r] = _post(app, PLAY, headers={"X-Webhook-Secret": "s3cret"})
+    assert r.status_code == 202 and ingest.depth == 1